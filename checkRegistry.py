@@ -0,0 +1,179 @@
+"""
+Check Registry
+
+Every check of sanityChecker and what it takes to run it, in the order the
+UI lists them. The UI builds its categories and buttons from here, the batch
+and daemon take their default checks from here and runners order their checks
+with plan(). Nothing here imports Maya, so the drivers can read it as well.
+
+    scope       what a check looks at: "scene", "transform", "mesh", "meshes" or
+                "texture". transform and mesh checks report every node from
+                that node alone, so they run over slices of nodes and in
+                incremental mode only on the edited ones. meshes checks look at
+                all meshes together, like the intersections between them.
+    needs       data it reads: "snapshot", "meshArrays", "uvs", "textures", and
+                "gui" for the checks that only work in an interactive session
+    cost        relative run time, per node for every scope but "scene"
+    severity    "error" or "warning", warnings show up as WARNING not FAILED
+    fix         name of the sanityChecker function fixing it, None without one
+    mutates     whether running the check edits the scene it checks
+"""
+
+SCOPES = ("scene", "transform", "mesh", "meshes", "texture")
+NEEDS = ("snapshot", "meshArrays", "uvs", "textures", "gui")
+
+# Costs of a check nobody registered
+DEFAULT_COST = 5.0
+
+
+class Check(object):
+
+    def __init__(self, name, category, scope, needs=(), cost=1.0, severity="error",
+                 fix=False, mutates=False):
+        assert scope in SCOPES, scope
+        assert all(need in NEEDS for need in needs), needs
+        self.name = name
+        self.category = category
+        self.scope = scope
+        self.needs = tuple(needs)
+        self.cost = float(cost)
+        self.severity = severity
+        self.fix = "%s_fix" % name if fix else None
+        self.mutates = mutates
+
+    @property
+    def perNode(self):
+        """Whether the result of a node only depends on that node."""
+        return self.scope in ("transform", "mesh")
+
+    @property
+    def headless(self):
+        """Whether the batch and daemon workers can run it."""
+        return not self.mutates and "gui" not in self.needs
+
+    def weight(self, nodes):
+        """Relative run time over nodes nodes."""
+        if self.scope == "scene":
+            return self.cost
+        return self.cost * max(1, nodes)
+
+    def __repr__(self):
+        return "Check(%r, %r, cost=%g)" % (self.name, self.category, self.cost)
+
+
+CHECKS = [
+    Check('cleanUp', 'scene', 'scene', cost=5, mutates=True),
+    Check('referenceCheck', 'scene', 'scene'),
+    Check('hierarchy', 'scene', 'scene'),
+    Check('unitCheck', 'scene', 'scene'),
+    Check('animationKeys', 'scene', 'transform', cost=1, fix=True),
+    # Check('emptyGroups', 'scene', 'transform', ['snapshot']),
+    Check('layers', 'scene', 'scene', cost=2, fix=True),
+
+    Check('triangles', 'topology', 'mesh', ['meshArrays'], 2, 'warning'),
+    Check('ngons', 'topology', 'mesh', ['meshArrays'], 2, 'warning'),
+    Check('zeroAreaFaces', 'topology', 'mesh', ['meshArrays'], 3),
+    Check('zeroLengthEdges', 'topology', 'mesh', ['meshArrays'], 3),
+    Check('openEdges', 'topology', 'mesh', ['meshArrays'], 2),
+    Check('floatingVertices', 'topology', 'mesh', ['meshArrays'], 2),
+    Check('poles', 'topology', 'mesh', ['meshArrays'], 2),
+    Check('hardEdges', 'topology', 'mesh', ['meshArrays'], 2),
+    Check('lamina', 'topology', 'mesh', ['meshArrays'], 4),
+    Check('nonManifoldEdges', 'topology', 'mesh', ['meshArrays'], 2),
+    Check('starlike', 'topology', 'mesh', ['meshArrays'], 4),
+
+    Check('uncenteredPivots', 'model', 'transform', cost=1, fix=True),
+    Check('lockedChannels', 'model', 'transform', cost=2, fix=True),
+    Check('lockedHierarchy', 'model', 'scene', cost=1, fix=True),
+    Check('normals', 'model', 'mesh', cost=20, fix=True, mutates=True),
+    Check('unfrozenTransforms', 'model', 'transform', ['snapshot'], 1, fix=True),
+    Check('attributes', 'model', 'transform', ['snapshot'], 2, fix=True),
+    Check('intermediateObjects', 'model', 'transform', ['snapshot'], 1),
+    Check('vcolor', 'model', 'mesh', ['snapshot'], 1, fix=True),
+    Check('multipleShapes', 'model', 'transform', ['snapshot'], 1, fix=True),
+    Check('negativeScale', 'model', 'transform', cost=1, fix=True),
+    Check('modelHierarchy', 'model', 'transform', ['snapshot'], 1),
+    # Check('shaders', 'model', 'mesh', ['snapshot'], 2, fix=True),
+    Check('history', 'model', 'transform', ['snapshot'], 1, fix=True),
+
+    Check('findIntersections', 'intersections', 'meshes', ['meshArrays'], 30, 'warning'),
+    Check('findSelfIntersections', 'intersections', 'mesh', ['meshArrays'], 20, 'warning'),
+
+    Check('currentUv', 'uv', 'mesh', ['snapshot', 'uvs'], 1),
+    Check('multiUv', 'uv', 'mesh', ['snapshot', 'uvs'], 1),
+    Check('missingUv', 'uv', 'mesh', ['meshArrays', 'uvs'], 2),
+    Check('uvRange', 'uv', 'mesh', ['meshArrays', 'uvs'], 2),
+    Check('crossBorder', 'uv', 'mesh', ['meshArrays', 'uvs'], 4),
+    Check('selfPenetratingUv', 'uv', 'mesh', ['meshArrays', 'uvs'], 10),
+
+    Check('trailingNumbers', 'naming', 'transform', ['snapshot'], 1),
+    Check('duplicatedNames', 'naming', 'scene', cost=1),
+    Check('shapeNames', 'naming', 'transform', ['snapshot'], 1, fix=True),
+    Check('namespaces', 'naming', 'scene', cost=1, fix=True),
+
+    Check('textureSize', 'textures', 'texture', ['textures'], 5),
+    Check('imageBrightness', 'textures', 'texture', ['textures'], 8),
+    Check('textureNames', 'textures', 'texture', ['textures'], 1),
+    Check('textureTiles', 'textures', 'texture', ['textures'], 3),
+    Check('missingTextures', 'textures', 'texture', ['textures'], 2),
+
+    Check('colorSet', 'lookdev', 'mesh', cost=1, fix=True),
+    Check('unusedShaders', 'lookdev', 'scene', ['gui'], 5, fix=True, mutates=True),
+    Check('standardSurface', 'lookdev', 'mesh', ['snapshot'], 2, fix=True),
+]
+
+_BY_NAME = dict((check.name, check) for check in CHECKS)
+
+
+def get(name):
+    """Check registered as name, None when there is none."""
+    return _BY_NAME.get(name)
+
+def names(category=None):
+    return [check.name for check in CHECKS if category is None or check.category == category]
+
+def categories():
+    """Categories in the order of their first check."""
+    result = []
+    for check in CHECKS:
+        if check.category not in result:
+            result.append(check.category)
+    return result
+
+def headlessChecks():
+    """Checks the batch and daemon workers run by default."""
+    return [check.name for check in CHECKS if check.headless]
+
+def isPerNode(name):
+    check = get(name)
+    return check is not None and check.perNode
+
+def isWarning(name):
+    check = get(name)
+    return check is not None and check.severity == "warning"
+
+def weight(name, nodes):
+    check = get(name)
+    return check.weight(nodes) if check else DEFAULT_COST * max(1, nodes)
+
+def plan(names):
+    """
+    Execution order of names: checks reading the same data next to each
+    other, so what they share is built once and used while it is warm, the
+    cheapest first within every group so most results come in early, and
+    the checks editing the scene last so every other check sees the scene
+    the run started from.
+    """
+    def key(item):
+        position, name = item
+        check = get(name)
+        if check is None:
+            return (False, len(NEEDS), DEFAULT_COST, position)
+        # Checks needing nothing first, then by the first data they need
+        group = min([NEEDS.index(need) for need in check.needs] or [-1])
+        return (check.mutates, group, check.cost, position)
+    ordered = []
+    for position, name in sorted(enumerate(names), key=key):
+        if name not in ordered:
+            ordered.append(name)
+    return ordered
@@ -0,0 +1,108 @@
+"""
+Check Runner
+
+Runs checks in small slices so the caller can hand control back to its event
+loop in between: checks the registry scopes per node run over slices of
+nodes, every other check in one slice. step() runs slices until its time budget is spent and returns
+the checks that finished, so results show up while the rest still runs, and
+cancel() stops the run at the next slice boundary. The checks run in the
+order checkRegistry.plan gives them, and progress and the ETA are weighted by
+their registered cost times the number of nodes of every slice.
+
+Nothing here imports Qt or Maya, the checks come from a checker module
+providing checkSlices and runCheck, sanityChecker in practice.
+"""
+
+import time
+
+import checkRegistry
+from componentResult import mergeResults
+
+
+class CheckRunner(object):
+
+    def __init__(self, checker, commands, nodes, SLMesh, sliceSize=200):
+        self.checker = checker
+        self.commands = checkRegistry.plan(commands)
+        self.nodes = nodes
+        self.SLMesh = SLMesh
+        self.sliceSize = sliceSize
+        self.cancelled = False
+        self.current = None
+        self.started = None
+        self.elapsed = 0.0
+        self._commandIndex = 0
+        self._slices = []
+        self._items = []
+        self._message = None
+        # Unsplit checks count as one slice of the whole list
+        self.totalWeight = float(sum(checkRegistry.weight(command, len(nodes))
+                                     for command in self.commands)) or 1.0
+        self.doneWeight = 0.0
+
+    @property
+    def done(self):
+        return self.cancelled or self._commandIndex >= len(self.commands)
+
+    @property
+    def progress(self):
+        """Completed fraction of the run, from 0 to 1."""
+        return min(1.0, self.doneWeight / self.totalWeight)
+
+    @property
+    def eta(self):
+        """Seconds left at the pace so far, None until a slice is done."""
+        if not self.doneWeight:
+            return None
+        return self.elapsed / self.doneWeight * (self.totalWeight - self.doneWeight)
+
+    @property
+    def pending(self):
+        """Checks not finished yet, the running one first."""
+        return self.commands[self._commandIndex:]
+
+    def cancel(self):
+        self.cancelled = True
+
+    def step(self, seconds=0.05):
+        """
+        Runs slices for about seconds, at least one, and returns the
+        (command, items, message) of every check that finished.
+        """
+        finished = []
+        start = time.time()
+        if self.started is None:
+            self.started = start
+        while not self.done:
+            finishedCheck = self._runSlice()
+            if finishedCheck:
+                finished.append(finishedCheck)
+            if time.time() - start >= seconds:
+                break
+        # Wall time, the event loop between steps slows the run down as well
+        self.elapsed = time.time() - self.started
+        return finished
+
+    def _runSlice(self):
+        command = self.commands[self._commandIndex]
+        if self.current != command:
+            self.current = command
+            self._slices = self.checker.checkSlices(command, self.nodes, self.SLMesh,
+                                                    self.sliceSize)
+            self._items = None
+            self._message = None
+        nodes, SLMesh = self._slices.pop(0)
+        items, message = self.checker.runCheck(command, nodes, SLMesh)
+        self._items = items if self._items is None else mergeResults(self._items, items)
+        if isinstance(message, dict):
+            if not isinstance(self._message, dict):
+                self._message = {}
+            self._message.update(message)
+        elif self._message is None:
+            self._message = message
+        self.doneWeight += checkRegistry.weight(command, len(nodes))
+        if self._slices:
+            return None
+        self._commandIndex += 1
+        self.current = None
+        return (command, self._items, self._message)
@@ -0,0 +1,243 @@
+"""
+Component Result
+
+Compact result of the component checks: per node, per component type
+(f, e, vtx...) a sorted NumPy array of unique indices, and the plain items
+(nodes, attributes...) of checks that report whole nodes. Names like
+mesh.f[0:999] are only built when something asks for them, one range per
+run of consecutive indices, so a check flagging millions of faces holds a
+few arrays instead of millions of strings.
+
+Iterating a result yields its plain items then one name per range, which
+cmds.select and the other string consumers accept as they are. toJson and
+toBytes store the ranges as start/end pairs.
+"""
+
+import io
+import re
+import json
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    _STRING_TYPES = (str, unicode)
+except NameError:
+    _STRING_TYPES = (str,)
+
+_COMPONENT = re.compile(r"^(.+?)\.(\w+)\[(\d+)(?::(\d+))?\]$")
+
+
+def indexRanges(indices, keys=None):
+    """
+    (starts, ends) of the runs of consecutive values of sorted unique indices,
+    also broken wherever keys, one per index, changes.
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    if not len(indices):
+        return indices, indices
+    breaks = np.diff(indices) != 1
+    if keys is not None:
+        breaks |= np.diff(np.asarray(keys)) != 0
+    breaks = np.flatnonzero(breaks)
+    starts = indices[np.concatenate([[0], breaks + 1])]
+    ends = indices[np.concatenate([breaks, [len(indices) - 1]])]
+    return starts, ends
+
+
+def rangeNames(kind, starts, ends):
+    return ["%s[%d]" % (kind, start) if start == end else "%s[%d:%d]" % (kind, start, end)
+            for start, end in zip(starts.tolist(), ends.tolist())]
+
+
+class ComponentResult(object):
+
+    def __init__(self, items=()):
+        self._components = OrderedDict()
+        self._plain = []
+        self._ranges = {}
+        self.update(items)
+
+    def add(self, node, kind, indices):
+        """Adds component indices of a node, merged with the ones it has."""
+        indices = np.asarray(indices, dtype=np.int64)
+        if not len(indices):
+            return
+        kinds = self._components.setdefault(node, OrderedDict())
+        if kind in kinds:
+            indices = np.union1d(kinds[kind], indices)
+        elif len(indices) > 1 and not (np.diff(indices) > 0).all():
+            # Kernels already return sorted unique indices
+            indices = np.unique(indices)
+        kinds[kind] = indices
+        self._ranges.pop((node, kind), None)
+
+    def addItem(self, item):
+        """Adds one item, component names like mesh.f[3] or mesh.f[0:9] go in the arrays."""
+        match = _COMPONENT.match(item) if isinstance(item, _STRING_TYPES) else None
+        if match:
+            node, kind, start, end = match.groups()
+            self.add(node, kind, np.arange(int(start), int(end or start) + 1))
+        else:
+            self._plain.append(item)
+
+    def update(self, items):
+        """Merges another ComponentResult or a list of items in place."""
+        if isinstance(items, ComponentResult):
+            for node, kinds in items._components.items():
+                for kind, indices in kinds.items():
+                    self.add(node, kind, indices)
+            self._plain.extend(items._plain)
+        else:
+            for item in items:
+                self.addItem(item)
+        return self
+
+    # Queries
+    def nodes(self):
+        """Nodes with components, then the plain items, in order of appearance."""
+        return list(self._components) + [item for item in self._plain
+                                         if item not in self._components]
+
+    def nodeResult(self, node):
+        """ComponentResult of one node, sharing its arrays."""
+        part = ComponentResult()
+        if node in self._components:
+            part._components[node] = OrderedDict(self._components[node])
+        part._plain = [item for item in self._plain if item == node]
+        return part
+
+    def kinds(self, node):
+        return list(self._components.get(node, ()))
+
+    def indices(self, node, kind):
+        return self._components.get(node, {}).get(kind, np.zeros(0, dtype=np.int64))
+
+    def count(self, node):
+        """Number of components of a node."""
+        return sum(len(indices) for indices in self._components.get(node, {}).values())
+
+    def ranges(self, node, kind):
+        """(starts, ends) of the index runs of a node, computed once."""
+        key = (node, kind)
+        if key not in self._ranges:
+            self._ranges[key] = indexRanges(self.indices(node, kind))
+        return self._ranges[key]
+
+    def rangeCount(self, node):
+        return sum(len(self.ranges(node, kind)[0]) for kind in self.kinds(node))
+
+    def rangeNames(self, node, start=0, stop=None):
+        """Names of the ranges start to stop of a node, like f[0:999]."""
+        names = []
+        offset = 0
+        for kind in self.kinds(node):
+            starts, ends = self.ranges(node, kind)
+            first = max(start - offset, 0)
+            last = len(starts) if stop is None else min(stop - offset, len(starts))
+            if first < last:
+                names.extend(rangeNames(kind, starts[first:last], ends[first:last]))
+            offset += len(starts)
+        return names
+
+    def rangeMessages(self, node, messages):
+        """
+        (name, message) of every range of a node, the runs also split wherever
+        the message changes. messages maps a kind to {index: message}, the
+        per component messages a check returns for the node.
+        """
+        ranges = []
+        for kind in self.kinds(node):
+            indices = self.indices(node, kind)
+            kindMessages = messages.get(kind, {})
+            codes = {}
+            keys = [codes.setdefault(kindMessages.get(index, ""), len(codes))
+                    for index in indices.tolist()]
+            starts, ends = indexRanges(indices, keys)
+            ranges.extend(zip(rangeNames(kind, starts, ends),
+                              [kindMessages.get(start, "") for start in starts.tolist()]))
+        return ranges
+
+    def componentNames(self):
+        """One name per component, the expensive form of the old check results."""
+        names = list(self._plain)
+        for node, kinds in self._components.items():
+            for kind, indices in kinds.items():
+                prefix = "%s.%s[" % (node, kind)
+                names.extend(prefix + str(index) + "]" for index in indices.tolist())
+        return names
+
+    def __len__(self):
+        return len(self._plain) + sum(len(indices) for kinds in self._components.values()
+                                      for indices in kinds.values())
+
+    def __bool__(self):
+        return bool(self._plain or self._components)
+
+    __nonzero__ = __bool__
+
+    def __iter__(self):
+        for item in self._plain:
+            yield item
+        for node in self._components:
+            for name in self.rangeNames(node):
+                yield "%s.%s" % (node, name)
+
+    def __repr__(self):
+        return "ComponentResult(%d nodes, %d items)" % (len(self.nodes()), len(self))
+
+    # Serialization
+    def toJson(self):
+        """{"components": {node: {kind: [start, end, ...]}}, "items": [...]}"""
+        components = OrderedDict()
+        for node, kinds in self._components.items():
+            components[node] = OrderedDict()
+            for kind in kinds:
+                starts, ends = self.ranges(node, kind)
+                components[node][kind] = np.column_stack([starts, ends]).ravel().tolist()
+        return {"components": components, "items": [str(item) for item in self._plain]}
+
+    @classmethod
+    def fromJson(cls, data):
+        result = cls(data.get("items", ()))
+        for node, kinds in data.get("components", {}).items():
+            for kind, pairs in kinds.items():
+                pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+                lengths = pairs[:, 1] - pairs[:, 0] + 1
+                offsets = np.repeat(pairs[:, 0] - np.concatenate([[0], np.cumsum(lengths)[:-1]]),
+                                    lengths)
+                result.add(node, kind, np.arange(lengths.sum()) + offsets)
+        return result
+
+    def toBytes(self):
+        """Compressed npz of the range arrays with a JSON index."""
+        arrays = {}
+        index = {"components": [], "items": [str(item) for item in self._plain]}
+        for node, kinds in self._components.items():
+            for kind in kinds:
+                name = "r%d" % len(index["components"])
+                index["components"].append((node, kind, name))
+                starts, ends = self.ranges(node, kind)
+                arrays[name] = np.column_stack([starts, ends])
+        arrays["index"] = np.frombuffer(json.dumps(index).encode("utf-8"), dtype=np.uint8)
+        stream = io.BytesIO()
+        np.savez_compressed(stream, **arrays)
+        return stream.getvalue()
+
+    @classmethod
+    def fromBytes(cls, data):
+        arrays = np.load(io.BytesIO(data))
+        index = json.loads(arrays["index"].tobytes().decode("utf-8"))
+        components = OrderedDict()
+        for node, kind, name in index["components"]:
+            components.setdefault(node, OrderedDict())[kind] = arrays[name].ravel().tolist()
+        return cls.fromJson({"components": components, "items": index["items"]})
+
+
+def mergeResults(items, more):
+    """Items of two parts of a check run as one result."""
+    if isinstance(items, ComponentResult):
+        return items.update(more)
+    if isinstance(more, ComponentResult):
+        return ComponentResult(items).update(more)
+    return list(items) + list(more)
@@ -0,0 +1,278 @@
+"""
+Incremental Checks
+
+Re-runs the node scoped checks only on the nodes edited since the previous
+run. DirtyTracker listens to OpenMaya messages on every checked transform and
+its shapes and collects the full paths touched by attribute, connection,
+geometry, topology, rename and DAG changes, node additions and deletions.
+IncrementalResults keeps what every node scoped check reported per node, so a
+run only has to check the nodes it has no results for.
+"""
+
+import maya.api.OpenMaya as om
+
+from componentResult import ComponentResult
+
+# Attribute messages that can change a check result, evaluation is left out
+_ATTRIBUTE_CHANGES = (om.MNodeMessage.kAttributeSet |
+                      om.MNodeMessage.kConnectionMade |
+                      om.MNodeMessage.kConnectionBroken |
+                      om.MNodeMessage.kAttributeLocked |
+                      om.MNodeMessage.kAttributeUnlocked |
+                      om.MNodeMessage.kAttributeAdded |
+                      om.MNodeMessage.kAttributeRemoved |
+                      om.MNodeMessage.kAttributeRenamed |
+                      om.MNodeMessage.kAttributeArrayAdded |
+                      om.MNodeMessage.kAttributeArrayRemoved)
+
+
+def withAncestors(path):
+    """A full path and the full paths of all its parents."""
+    paths = []
+    while path:
+        paths.append(path)
+        path = path.rpartition("|")[0]
+    return paths
+
+
+def transformPaths(mobject):
+    """Full paths of the transforms a DAG node belongs to, for every instance."""
+    if mobject.isNull() or not mobject.hasFn(om.MFn.kDagNode):
+        return []
+    paths = []
+    for dagPath in om.MDagPath.getAllPathsTo(mobject):
+        if not dagPath.hasFn(om.MFn.kTransform):
+            dagPath.pop()
+        paths.append(dagPath.fullPathName())
+    return paths
+
+
+def itemPaths(items):
+    """
+    Full transform path of the node every result item names, None when it
+    does not resolve. Items are node, attribute or component names.
+    """
+    owners = {}
+    paths = []
+    for item in items:
+        owner = str(item).split(".")[0]
+        if owner not in owners:
+            selectionList = om.MSelectionList()
+            try:
+                selectionList.add(owner)
+                dagPath = selectionList.getDagPath(0)
+            except (RuntimeError, TypeError):
+                owners[owner] = None
+            else:
+                if not dagPath.hasFn(om.MFn.kTransform):
+                    dagPath.pop()
+                owners[owner] = dagPath.fullPathName()
+        paths.append(owners[owner])
+    return paths
+
+
+class DirtyTracker(object):
+    """
+    Collects the full paths of the transforms edited since the last collect.
+
+    Callbacks only record MObjectHandles, paths are resolved once in collect,
+    so dragging a vertex costs a set insertion per message.
+    """
+
+    def __init__(self):
+        self._nodeCallbacks = {}
+        self._sceneCallbacks = []
+        self._watchedPaths = set()
+        self._dirty = {}
+        self._dirtyBranches = {}
+        self._dirtyPaths = set()
+        self.sceneChanged = False
+
+    @property
+    def active(self):
+        return bool(self._sceneCallbacks)
+
+    def start(self):
+        if self._sceneCallbacks:
+            return
+        self._sceneCallbacks = [
+            om.MDGMessage.addNodeAddedCallback(self._nodeAdded, "dagNode"),
+            om.MDGMessage.addNodeRemovedCallback(self._nodeRemoved, "dagNode"),
+            om.MDagMessage.addAllDagChangesCallback(self._dagChanged),
+            om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeNew, self._sceneReset),
+            om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeOpen, self._sceneReset),
+        ]
+
+    def stop(self):
+        callbacks = list(self._sceneCallbacks)
+        for handle, ids in self._nodeCallbacks.values():
+            callbacks.extend(ids)
+        if callbacks:
+            om.MMessage.removeCallbacks(callbacks)
+        self.__init__()
+
+    def watch(self, paths):
+        """Registers the node callbacks of the transforms not watched yet."""
+        for path in paths:
+            if path in self._watchedPaths:
+                continue
+            selectionList = om.MSelectionList()
+            try:
+                selectionList.add(path)
+                dagPath = selectionList.getDagPath(0)
+            except RuntimeError:
+                continue
+            self._watchNode(dagPath.node(), False)
+            for i in range(dagPath.numberOfShapesDirectlyBelow()):
+                shapePath = om.MDagPath(dagPath)
+                shapePath.extendToShape(i)
+                self._watchNode(shapePath.node(), shapePath.hasFn(om.MFn.kMesh))
+            self._watchedPaths.add(path)
+
+    def collect(self):
+        """Full paths edited since the last collect, the set is reset."""
+        paths = self._dirtyPaths
+        for handle in self._dirty.values():
+            if handle.isValid():
+                paths.update(transformPaths(handle.object()))
+        for handle in self._dirtyBranches.values():
+            if handle.isValid():
+                for path in transformPaths(handle.object()):
+                    paths.update(withAncestors(path))
+        self._dirty = {}
+        self._dirtyBranches = {}
+        self._dirtyPaths = set()
+        return paths
+
+    def _watchNode(self, mobject, isMesh):
+        handle = om.MObjectHandle(mobject)
+        key = handle.hashCode()
+        if key in self._nodeCallbacks:
+            return
+        ids = [om.MNodeMessage.addAttributeChangedCallback(mobject, self._attributeChanged, handle),
+               om.MNodeMessage.addNameChangedCallback(mobject, self._nameChanged, handle)]
+        if isMesh:
+            # Upstream history edits only reach the shape as dirty propagation
+            ids.append(om.MNodeMessage.addNodeDirtyPlugCallback(mobject, self._nodeChanged, handle))
+            ids.append(om.MPolyMessage.addPolyTopologyChangedCallback(mobject, self._nodeChanged, handle))
+        self._nodeCallbacks[key] = (handle, ids)
+
+    def _attributeChanged(self, msg, plug, otherPlug, handle):
+        if msg & _ATTRIBUTE_CHANGES:
+            self._dirty[handle.hashCode()] = handle
+
+    def _nodeChanged(self, *args):
+        handle = args[-1]
+        self._dirty[handle.hashCode()] = handle
+
+    def _nameChanged(self, node, previousName, handle):
+        # Paths below the node changed, they are resolved again on next watch
+        self._dirty[handle.hashCode()] = handle
+        self._watchedPaths.clear()
+
+    def _nodeAdded(self, node, clientData):
+        handle = om.MObjectHandle(node)
+        self._dirtyBranches[handle.hashCode()] = handle
+
+    def _nodeRemoved(self, node, clientData):
+        handle = om.MObjectHandle(node)
+        key = handle.hashCode()
+        for path in transformPaths(node):
+            self._dirtyPaths.update(withAncestors(path))
+            self._watchedPaths.discard(path)
+        if key in self._nodeCallbacks:
+            om.MMessage.removeCallbacks(self._nodeCallbacks.pop(key)[1])
+        self._dirty.pop(key, None)
+        self._dirtyBranches.pop(key, None)
+
+    def _dagChanged(self, msgType, child, parent, clientData):
+        for dagPath in (child, parent):
+            path = dagPath.fullPathName()
+            if path:
+                self._dirtyPaths.update(withAncestors(path))
+        self._watchedPaths.clear()
+
+    def _sceneReset(self, clientData):
+        # A new scene makes every watched node and stored result meaningless,
+        # the callbacks are dropped on the next run rather than from inside one
+        self.sceneChanged = True
+
+
+class IncrementalResults(object):
+    """
+    Per check, per node results: {check: {fullPath: [(item, message)]}}.
+    A node without an entry for a check has to be checked again.
+    """
+
+    def __init__(self):
+        self._results = {}
+        self._messages = {}
+
+    def clear(self):
+        self._results.clear()
+        self._messages.clear()
+
+    def invalidate(self, paths):
+        for results in self._results.values():
+            for path in paths:
+                results.pop(path, None)
+
+    def stale(self, check, paths):
+        """Indices of the paths the check has no results for."""
+        results = self._results.get(check, {})
+        return [i for i, path in enumerate(paths) if path not in results]
+
+    def store(self, check, paths, items, message):
+        """
+        Stores the result of a run over paths. Items are filed under the
+        path of the node they belong to; items that resolve to none of the
+        paths are kept with the first one so they are still reported. A
+        ComponentResult is filed per node, its arrays untouched.
+        """
+        entries = dict((path, []) for path in paths)
+        if isinstance(items, ComponentResult):
+            # Component messages come keyed by node already
+            nodes = items.nodes()
+            for node, owner in zip(nodes, itemPaths(nodes)):
+                if not isinstance(message, dict):
+                    nodeMessage = message
+                elif node in message:
+                    nodeMessage = {node: message[node]}
+                else:
+                    nodeMessage = {}
+                entries.get(owner, entries[paths[0]]).append((items.nodeResult(node), nodeMessage))
+        else:
+            for item, owner in zip(items, itemPaths(items)):
+                itemMessage = message.get(item, "") if isinstance(message, dict) else message
+                entries.get(owner, entries[paths[0]]).append((item, itemMessage))
+        self._results.setdefault(check, {}).update(entries)
+        if not isinstance(message, dict):
+            self._messages[check] = message
+
+    def result(self, check, paths):
+        """(items, message) for paths in order, like the check would return."""
+        results = self._results.get(check, {})
+        items = []
+        messages = {}
+        components = None
+        for path in paths:
+            for item, itemMessage in results.get(path, ()):
+                if isinstance(item, ComponentResult):
+                    # Component messages are stored per node, keyed by that node
+                    components = (components or ComponentResult()).update(item)
+                    if isinstance(itemMessage, dict):
+                        messages.update(itemMessage)
+                    continue
+                items.append(item)
+                messages[item] = itemMessage
+        if components is not None:
+            components.update(items)
+            if messages:
+                return components, messages
+            return components, self._messages.get(check, "")
+        distinct = set(messages.values())
+        if len(distinct) > 1:
+            return items, messages
+        if distinct:
+            return items, distinct.pop()
+        return items, self._messages.get(check, "")
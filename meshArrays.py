@@ -0,0 +1,327 @@
+"""
+Mesh Arrays
+
+Bulk per-mesh data shared by the topology and UV checks. Every shape is read
+once per run through the MFnMesh bulk getters and kept as NumPy arrays, so a
+"Run All Checked" walks each mesh a single time no matter how many checks
+consume it.
+"""
+
+import hashlib
+
+import numpy as np
+import maya.api.OpenMaya as om
+
+import meshKernels
+import meshIntersections
+
+# Array names that belong to a UV set rather than to the mesh itself
+UV_FIELDS = ("u", "v", "uvCounts", "uvIds", "uvFaceBounds", "uvShellIds")
+
+# Raw data every array is derived from, what a content digest has to hash.
+# Arrays that are not listed are their own source.
+SOURCE_FIELDS = {
+    "faceOffsets": ("polygonCounts",),
+    "adjacency": ("polygonCounts", "polygonConnects", "edges"),
+    "edgeFaceCounts": ("polygonCounts", "polygonConnects", "edges"),
+    "vertexValence": ("edges", "numVertices"),
+    "faceAreas": ("points", "polygonCounts", "polygonConnects"),
+    "edgeLengths": ("points", "edges"),
+    "uvFaceBounds": ("u", "v", "uvCounts", "uvIds"),
+    "uvShellIds": ("uvCounts", "uvIds"),
+}
+
+
+def _lazy(func):
+    # Computes an array on first access and keeps it for the rest of the run
+    name = func.__name__
+
+    def getter(self):
+        try:
+            return self._arrays[name]
+        except KeyError:
+            value = self._arrays[name] = func(self)
+            return value
+    return property(getter, doc=func.__doc__)
+
+
+def meshShapePath(dagPath):
+    """Returns the first non intermediate mesh shape below a transform path."""
+    shapePath = om.MDagPath(dagPath)
+    if shapePath.apiType() == om.MFn.kMesh:
+        return shapePath
+    for i in range(shapePath.numberOfShapesDirectlyBelow()):
+        candidate = om.MDagPath(dagPath)
+        candidate.extendToShape(i)
+        if candidate.hasFn(om.MFn.kMesh) and \
+                not om.MFnDagNode(candidate).isIntermediateObject:
+            return candidate
+    return None
+
+
+def topologyKey(shapePath):
+    """Cheap topology signature used to key the cache."""
+    fnMesh = om.MFnMesh(shapePath)
+    return (shapePath.fullPathName(),
+            fnMesh.numVertices,
+            fnMesh.numEdges,
+            fnMesh.numPolygons,
+            fnMesh.numFaceVertices)
+
+
+class _UVData(dict):
+    # Arrays of one UV set, derived ones are computed on first access
+    def __init__(self, fnMesh, uvSet, u, v, uvCounts, uvIds):
+        dict.__init__(self, u=u, v=v, uvCounts=uvCounts, uvIds=uvIds)
+        self.fnMesh = fnMesh
+        self.uvSet = uvSet
+
+    def __missing__(self, name):
+        if name == "uvFaceBounds":
+            value = meshKernels.faceUvBounds(
+                self["u"], self["v"], self["uvCounts"], self["uvIds"])
+        elif name == "uvShellIds":
+            if self.uvSet:
+                value = np.array(self.fnMesh.getUvShellsIds(self.uvSet)[1], dtype=np.int32)
+            else:
+                value = np.zeros(0, dtype=np.int32)
+        else:
+            raise KeyError(name)
+        self[name] = value
+        return value
+
+
+class MeshArrays(object):
+    """
+    Lazily extracted NumPy arrays for one mesh.
+
+    dagPath is the path the checks were given (usually the transform) and name
+    is the string used to build component names, so results read exactly as
+    they did with the per-component iterators.
+    """
+
+    def __init__(self, dagPath, shapePath=None):
+        self.dagPath = om.MDagPath(dagPath)
+        self.shapePath = shapePath or meshShapePath(dagPath)
+        self.name = str(dagPath.getPath())
+        self.fnMesh = om.MFnMesh(self.shapePath)
+        self._arrays = {}
+        self._uvArrays = {}
+        self._digests = {}
+
+    def array(self, name, uvSet=None):
+        """Returns a named array, so consumers can be described by field names."""
+        if name in UV_FIELDS:
+            return self._uvData(uvSet)[name]
+        return getattr(self, name)
+
+    def digest(self, fields, uvSet=None):
+        """
+        Hex digest of the raw data behind the given arrays, equal for equal
+        meshes whatever their name. Derived arrays are not computed for it.
+        """
+        sources = set()
+        for field in fields:
+            sources.update(SOURCE_FIELDS.get(field, (field,)))
+        sha = hashlib.sha1()
+        for source in sorted(sources):
+            sha.update(source.encode("utf-8"))
+            sha.update(self._sourceDigest(source, uvSet))
+        return sha.hexdigest()
+
+    def _sourceDigest(self, source, uvSet):
+        if source in UV_FIELDS:
+            key = (source, uvSet or self.currentUVSet)
+        else:
+            key = (source, None)
+        if key not in self._digests:
+            if source == "numVertices":
+                data = str(self.numVertices).encode("utf-8")
+            else:
+                data = np.ascontiguousarray(self.array(source, uvSet)).tobytes()
+            self._digests[key] = hashlib.sha1(data).digest()
+        return self._digests[key]
+
+    @_lazy
+    def points(self):
+        """Object space vertex positions as an (N, 3) float64 array."""
+        points = self.fnMesh.getPoints(om.MSpace.kObject)
+        return np.array(points, dtype=np.float64).reshape(-1, 4)[:, :3]
+
+    @_lazy
+    def worldPoints(self):
+        """World space vertex positions as an (N, 3) float64 array."""
+        points = self.fnMesh.getPoints(om.MSpace.kWorld)
+        return np.array(points, dtype=np.float64).reshape(-1, 4)[:, :3]
+
+    @_lazy
+    def worldBoundingBox(self):
+        """(min, max) world space corners, from the shape bounds without reading points."""
+        boundingBox = om.MFnDagNode(self.shapePath).boundingBox
+        boundingBox.transformUsing(self.shapePath.inclusiveMatrix())
+        return (np.array(boundingBox.min, dtype=np.float64)[:3],
+                np.array(boundingBox.max, dtype=np.float64)[:3])
+
+    @_lazy
+    def worldBVH(self):
+        """meshIntersections.meshBVH of the world space points."""
+        return meshIntersections.meshBVH(
+            self.worldPoints, self.polygonCounts, self.polygonConnects)
+
+    @_lazy
+    def polygonCounts(self):
+        """Number of vertices of each face."""
+        return self._topology()[0]
+
+    @_lazy
+    def polygonConnects(self):
+        """Flat face-vertex list, polygonCounts[i] entries per face."""
+        return self._topology()[1]
+
+    @_lazy
+    def faceOffsets(self):
+        """Index of the first face-vertex of every face in polygonConnects."""
+        offsets = np.zeros(len(self.polygonCounts), dtype=np.int64)
+        np.cumsum(self.polygonCounts[:-1], out=offsets[1:])
+        return offsets
+
+    @property
+    def numVertices(self):
+        return self.fnMesh.numVertices
+
+    @_lazy
+    def edges(self):
+        """(E, 2) vertex pairs in Maya edge index order."""
+        # MFnMesh has no bulk edge getter, one tight comprehension per mesh per
+        # run is the cheapest way to read the vertex pairs
+        fnMesh = self.fnMesh
+        edges = [fnMesh.getEdgeVertices(i) for i in range(fnMesh.numEdges)]
+        return np.array(edges, dtype=np.int32).reshape(-1, 2)
+
+    @_lazy
+    def edgeSmooth(self):
+        """Smoothing flag of every edge, False for hard edges."""
+        # Only hardEdges reads it, so the other edge checks skip this loop
+        fnMesh = self.fnMesh
+        return np.array([fnMesh.isEdgeSmooth(i) for i in range(fnMesh.numEdges)], dtype=bool)
+
+    @_lazy
+    def adjacency(self):
+        """meshKernels.MeshAdjacency built from the connects and edge list."""
+        return meshKernels.buildAdjacency(
+            self.numVertices, self.polygonCounts, self.polygonConnects, self.edges)
+
+    @_lazy
+    def edgeFaceCounts(self):
+        """Number of faces using every edge."""
+        return self.adjacency.edgeFaceCounts
+
+    @_lazy
+    def vertexValence(self):
+        """Number of edges connected to every vertex."""
+        return meshKernels.vertexValence(self.edges, self.numVertices)
+
+    @_lazy
+    def faceAreas(self):
+        """Area of every face, n-gons measured over their fan triangulation."""
+        return meshKernels.faceAreas(
+            self.points, self.polygonCounts, self.polygonConnects)
+
+    @_lazy
+    def edgeLengths(self):
+        """Length of every edge in object space."""
+        return meshKernels.edgeLengths(self.points, self.edges)
+
+    @property
+    def currentUVSet(self):
+        return self.fnMesh.currentUVSetName()
+
+    @property
+    def uvSetNames(self):
+        return list(self.fnMesh.getUVSetNames())
+
+    def uvs(self, uvSet=None):
+        """(U, V) coordinate arrays of a UV set, the current one by default."""
+        data = self._uvData(uvSet)
+        return data["u"], data["v"]
+
+    def uvAssignment(self, uvSet=None):
+        """(uvCounts, uvIds) per face assignment of a UV set."""
+        data = self._uvData(uvSet)
+        return data["uvCounts"], data["uvIds"]
+
+    def uvFaceBounds(self, uvSet=None):
+        """(faces, uMin, uMax, vMin, vMax) of every mapped face of a UV set."""
+        return self._uvData(uvSet)["uvFaceBounds"]
+
+    def _uvData(self, uvSet):
+        uvSet = uvSet or self.currentUVSet
+        if uvSet not in self._uvArrays:
+            if uvSet:
+                u, v = self.fnMesh.getUVs(uvSet)
+                uvCounts, uvIds = self.fnMesh.getAssignedUVs(uvSet)
+            else:
+                # Meshes without any UV set behave like every face is unmapped
+                u, v, uvIds = [], [], []
+                uvCounts = [0] * self.fnMesh.numPolygons
+            self._uvArrays[uvSet] = _UVData(
+                self.fnMesh, uvSet, np.array(u, dtype=np.float64), np.array(v, dtype=np.float64),
+                np.array(uvCounts, dtype=np.int32), np.array(uvIds, dtype=np.int32))
+        return self._uvArrays[uvSet]
+
+    def _topology(self):
+        counts, connects = self.fnMesh.getVertices()
+        counts = np.array(counts, dtype=np.int32)
+        connects = np.array(connects, dtype=np.int32)
+        self._arrays["polygonCounts"] = counts
+        self._arrays["polygonConnects"] = connects
+        return counts, connects
+
+
+class MeshArraysCache(object):
+    """
+    Per-run cache of MeshArrays keyed by shape path and topology signature.
+
+    The UI clears it at the start of every run, so edits between runs are
+    always picked up while checks within one run share a single extraction.
+    In incremental mode only the meshes edited since the last run are
+    discarded.
+    """
+
+    def __init__(self):
+        self._meshes = {}
+
+    def clear(self):
+        self._meshes.clear()
+
+    def get(self, dagPath):
+        shapePath = meshShapePath(dagPath)
+        if shapePath is None:
+            return None
+        key = (dagPath.fullPathName(),) + topologyKey(shapePath)
+        mesh = self._meshes.get(key)
+        if mesh is None:
+            mesh = self._meshes[key] = MeshArrays(dagPath, shapePath)
+        return mesh
+
+    def discard(self, paths):
+        """Drops the meshes of the given transform full paths."""
+        paths = set(paths)
+        for key in [key for key in self._meshes if key[0] in paths]:
+            del self._meshes[key]
+
+    def getByName(self, name):
+        selectionList = om.MSelectionList()
+        try:
+            selectionList.add(name)
+            return self.get(selectionList.getDagPath(0))
+        except RuntimeError:
+            return None
+
+    def iterMeshes(self, SLMesh):
+        selIt = om.MItSelectionList(SLMesh)
+        while not selIt.isDone():
+            mesh = self.get(selIt.getDagPath())
+            if mesh is not None:
+                yield mesh
+            selIt.next()
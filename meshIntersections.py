@@ -0,0 +1,275 @@
+"""
+Mesh Intersections
+
+Pure NumPy triangle intersection engine behind the intersection checks. The
+fan triangulated faces of a mesh are sorted along a Morton curve and grouped
+into an implicit bounding volume hierarchy, two hierarchies (or one against
+itself) are traversed breadth first with whole frontiers tested at once, and
+the triangle pairs of overlapping leaves go through a batched exact
+triangle-triangle test.
+"""
+
+import numpy as np
+
+import meshKernels
+
+
+def _spreadBits(values):
+    # Spreads the low 10 bits of every value three bits apart
+    values = values.astype(np.int64) & 0x3FF
+    values = (values | (values << 16)) & 0x030000FF
+    values = (values | (values << 8)) & 0x0300F00F
+    values = (values | (values << 4)) & 0x030C30C3
+    values = (values | (values << 2)) & 0x09249249
+    return values
+
+def mortonCodes(centers):
+    """30 bit Morton code of every (N, 3) center inside their bounding box."""
+    low = centers.min(axis=0)
+    size = np.maximum(centers.max(axis=0) - low, 1e-30)
+    cells = np.clip((centers - low) / size * 1023.0, 0, 1023)
+    return (_spreadBits(cells[:, 0]) << 2) | (_spreadBits(cells[:, 1]) << 1) | \
+        _spreadBits(cells[:, 2])
+
+
+class TriangleBVH(object):
+    """
+    Implicit bounding volume hierarchy over (T, 3) triangles.
+
+    Leaves hold leafSize consecutive triangles in Morton order and every level
+    above pairs up the nodes of the level below. All nodes live in flat arrays
+    with the leaves first and the root last; nodeChildren is -1 where a node
+    has no child, which only happens for the leaves and the last node of an
+    odd sized level.
+    """
+
+    def __init__(self, points, triangles, leafSize=16):
+        self.points = np.asarray(points, dtype=np.float64)
+        self.triangles = np.asarray(triangles).reshape(-1, 3)
+        self.leafSize = leafSize
+
+        corners = self.points[self.triangles]
+        self.triangleMins = corners.min(axis=1)
+        self.triangleMaxs = corners.max(axis=1)
+        # Contiguous per axis copies, much cheaper to gather pair by pair
+        self.triangleColumns = [np.ascontiguousarray(self.triangles[:, i]) for i in range(3)]
+        self.triangleMinColumns = [np.ascontiguousarray(self.triangleMins[:, i]) for i in range(3)]
+        self.triangleMaxColumns = [np.ascontiguousarray(self.triangleMaxs[:, i]) for i in range(3)]
+        numTriangles = len(self.triangles)
+        if numTriangles:
+            order = np.argsort(mortonCodes(corners.mean(axis=1)), kind="stable")
+        else:
+            order = np.zeros(0, dtype=np.int64)
+
+        # Leaves, padded with -1 up to a full leafSize
+        numLeaves = max(-(-numTriangles // leafSize), 1)
+        self.leafTriangles = np.full(numLeaves * leafSize, -1, dtype=np.int64)
+        self.leafTriangles[:numTriangles] = order
+        self.leafTriangles = self.leafTriangles.reshape(numLeaves, leafSize)
+        self.numLeaves = numLeaves
+
+        if numTriangles:
+            starts = np.arange(0, numTriangles, leafSize)
+            mins = [np.minimum.reduceat(self.triangleMins[order], starts)]
+            maxs = [np.maximum.reduceat(self.triangleMaxs[order], starts)]
+        else:
+            mins = [np.full((1, 3), np.inf)]
+            maxs = [np.full((1, 3), -np.inf)]
+        children = [np.full((numLeaves, 2), -1, dtype=np.int64)]
+        levels = [np.zeros(numLeaves, dtype=np.int64)]
+
+        # Levels above the leaves, pairing up nodes until one root is left
+        offset = 0
+        while len(mins[-1]) > 1:
+            count = len(mins[-1])
+            first = np.arange(0, count, 2)
+            second = first + 1
+            hasSecond = second < count
+            second = np.where(hasSecond, second, first)
+            mins.append(np.minimum(mins[-1][first], mins[-1][second]))
+            maxs.append(np.maximum(maxs[-1][first], maxs[-1][second]))
+            children.append(np.column_stack(
+                (offset + first, np.where(hasSecond, offset + second, -1))))
+            levels.append(np.full(len(first), len(levels), dtype=np.int64))
+            offset += count
+
+        self.nodeMins = np.concatenate(mins)
+        self.nodeMaxs = np.concatenate(maxs)
+        self.nodeChildren = np.concatenate(children)
+        self.nodeLevels = np.concatenate(levels)
+        self.root = len(self.nodeMins) - 1
+
+
+def _nodesOverlap(bvhA, a, bvhB, b):
+    return np.all((bvhA.nodeMins[a] <= bvhB.nodeMaxs[b]) &
+                  (bvhB.nodeMins[b] <= bvhA.nodeMaxs[a]), axis=1)
+
+def overlappingLeaves(bvhA, bvhB=None):
+    """
+    Pairs of leaves (leafA, leafB) whose bounds overlap. Without bvhB the
+    hierarchy is traversed against itself and every pair is listed once,
+    with a leaf paired to itself as (leaf, leaf).
+    """
+    selfMode = bvhB is None
+    bvhB = bvhA if selfMode else bvhB
+    a = np.array([bvhA.root])
+    b = np.array([bvhB.root])
+    leavesA, leavesB = [], []
+    while len(a):
+        keep = _nodesOverlap(bvhA, a, bvhB, b)
+        a, b = a[keep], b[keep]
+        isLeafA = a < bvhA.numLeaves
+        isLeafB = b < bvhB.numLeaves
+        done = isLeafA & isLeafB
+        leavesA.append(a[done])
+        leavesB.append(b[done])
+
+        nextA, nextB = [], []
+        if selfMode:
+            # A node against itself splits into its children against
+            # themselves and against each other
+            same = (a == b) & ~done
+            children = bvhA.nodeChildren[a[same]]
+            for i, j in ((0, 0), (1, 1), (0, 1)):
+                valid = (children[:, i] >= 0) & (children[:, j] >= 0)
+                nextA.append(children[valid, i])
+                nextB.append(children[valid, j])
+            pending = (a != b) & ~done
+        else:
+            pending = ~done
+
+        # Descend the side that is not a leaf, or the higher one
+        a, b = a[pending], b[pending]
+        splitA = (a >= bvhA.numLeaves) & (
+            (b < bvhB.numLeaves) | (bvhA.nodeLevels[a] >= bvhB.nodeLevels[b]))
+        for child in (0, 1):
+            childA = bvhA.nodeChildren[a[splitA], child]
+            valid = childA >= 0
+            nextA.append(childA[valid])
+            nextB.append(b[splitA][valid])
+            childB = bvhB.nodeChildren[b[~splitA], child]
+            valid = childB >= 0
+            nextA.append(a[~splitA][valid])
+            nextB.append(childB[valid])
+        a = np.concatenate(nextA)
+        b = np.concatenate(nextB)
+    return np.concatenate(leavesA), np.concatenate(leavesB)
+
+
+def _segmentsCrossTriangles(start, end, corners, tolerance):
+    # Moller-Trumbore between P segments and P triangles, only counting
+    # crossings strictly inside both so shared edges and corners do not count
+    direction = end - start
+    edge1 = corners[:, 1] - corners[:, 0]
+    edge2 = corners[:, 2] - corners[:, 0]
+    p = np.cross(direction, edge2)
+    det = (edge1 * p).sum(axis=1)
+    valid = np.abs(det) > tolerance
+    inverse = np.where(valid, 1.0 / np.where(valid, det, 1.0), 0.0)
+    s = start - corners[:, 0]
+    u = (s * p).sum(axis=1) * inverse
+    q = np.cross(s, edge1)
+    v = (direction * q).sum(axis=1) * inverse
+    t = (edge2 * q).sum(axis=1) * inverse
+    eps = 1e-9
+    return valid & (u > eps) & (v > eps) & (u + v < 1 - eps) & (t > eps) & (t < 1 - eps)
+
+def trianglesIntersect(cornersA, cornersB, tolerance=1e-12):
+    """
+    Whether (P, 3, 3) triangles cross each other, ie. an edge of one passes
+    through the other. Coplanar overlaps are not reported.
+    """
+    hit = np.zeros(len(cornersA), dtype=bool)
+    for segments, corners in ((cornersA, cornersB), (cornersB, cornersA)):
+        for i in range(3):
+            hit |= _segmentsCrossTriangles(
+                segments[:, i], segments[:, (i + 1) % 3], corners, tolerance)
+    return hit
+
+def _leafTrianglePairs(bvhA, bvhB, leavesA, leavesB, selfMode):
+    # Every triangle pair of the given leaf pairs, with padding removed
+    size = bvhA.leafSize
+    trianglesA = np.repeat(bvhA.leafTriangles[leavesA], bvhB.leafSize, axis=1).ravel()
+    trianglesB = np.tile(bvhB.leafTriangles[leavesB], (1, size)).ravel()
+    keep = (trianglesA >= 0) & (trianglesB >= 0)
+    if selfMode:
+        sameLeaf = np.repeat(leavesA == leavesB, size * bvhB.leafSize)
+        keep &= ~sameLeaf | (trianglesA < trianglesB)
+    return trianglesA[keep], trianglesB[keep]
+
+def intersectingTriangles(bvhA, bvhB=None, chunk=1 << 14):
+    """
+    Intersecting triangle pairs between two hierarchies, or inside one when
+    bvhB is None. In self mode triangles sharing a vertex are adjacent and
+    never tested.
+    """
+    selfMode = bvhB is None
+    leavesA, leavesB = overlappingLeaves(bvhA, bvhB)
+    bvhB = bvhA if selfMode else bvhB
+    # Hierarchies whose leaves never overlap yield no chunk at all
+    foundA, foundB = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+    for start in range(0, len(leavesA), chunk):
+        a, b = _leafTrianglePairs(bvhA, bvhB, leavesA[start:start + chunk],
+                                  leavesB[start:start + chunk], selfMode)
+        keep = np.ones(len(a), dtype=bool)
+        for axis in range(3):
+            keep &= (bvhA.triangleMinColumns[axis][a] <= bvhB.triangleMaxColumns[axis][b]) & \
+                (bvhB.triangleMinColumns[axis][b] <= bvhA.triangleMaxColumns[axis][a])
+        a, b = a[keep], b[keep]
+        if selfMode:
+            shared = np.zeros(len(a), dtype=bool)
+            for i in range(3):
+                vertexA = bvhA.triangleColumns[i][a]
+                for j in range(3):
+                    shared |= vertexA == bvhA.triangleColumns[j][b]
+            a, b = a[~shared], b[~shared]
+        hit = trianglesIntersect(bvhA.points[bvhA.triangles[a]],
+                                 bvhB.points[bvhB.triangles[b]])
+        foundA.append(a[hit])
+        foundB.append(b[hit])
+    return np.concatenate(foundA), np.concatenate(foundB)
+
+def _facePairs(faceIdsA, faceIdsB, a, b):
+    if not len(a):
+        empty = np.zeros((0, 2), dtype=np.int64)
+        return empty
+    return np.unique(np.column_stack((faceIdsA[a], faceIdsB[b])), axis=0)
+
+def meshBVH(points, polygonCounts, polygonConnects, leafSize=16):
+    """(TriangleBVH, faceIds) over the fan triangulation of a mesh."""
+    triangles, faceIds = meshKernels.fanTriangles(polygonCounts, polygonConnects)
+    return TriangleBVH(points, triangles, leafSize), faceIds
+
+def intersectingFaces(pointsA, polygonCountsA, polygonConnectsA,
+                      pointsB, polygonCountsB, polygonConnectsB):
+    """(F, 2) pairs of intersecting faces (faceA, faceB) between two meshes."""
+    return intersectingMeshBVHs(meshBVH(pointsA, polygonCountsA, polygonConnectsA),
+                                meshBVH(pointsB, polygonCountsB, polygonConnectsB))
+
+def intersectingMeshBVHs(meshBVHA, meshBVHB):
+    """intersectingFaces on two prebuilt meshBVH results."""
+    (bvhA, faceIdsA), (bvhB, faceIdsB) = meshBVHA, meshBVHB
+    a, b = intersectingTriangles(bvhA, bvhB)
+    return _facePairs(faceIdsA, faceIdsB, a, b)
+
+def candidateMeshPairs(boundsMins, boundsMaxs):
+    """
+    Pairs of meshes (i, j), i < j, whose (N, 3) world bounding boxes overlap,
+    the only ones worth sending to the triangle tests.
+    """
+    first, second = meshKernels.sweepAndPrune(boundsMins, boundsMaxs)
+    order = np.lexsort((second, first))
+    return first[order], second[order]
+
+def selfIntersectingFaces(points, polygonCounts, polygonConnects):
+    """(F, 2) pairs of intersecting faces of one mesh, adjacent faces skipped."""
+    bvh, faceIds = meshBVH(points, polygonCounts, polygonConnects)
+    a, b = intersectingTriangles(bvh)
+    pairs = _facePairs(faceIds, faceIds, a, b)
+    pairs = np.sort(pairs, axis=1)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    return np.unique(pairs, axis=0) if len(pairs) else pairs
+
+def selfIntersectingFaceIds(points, polygonCounts, polygonConnects):
+    """Sorted faces of a mesh that intersect another face of the same mesh."""
+    return np.unique(selfIntersectingFaces(points, polygonCounts, polygonConnects))
@@ -0,0 +1,410 @@
+"""
+Mesh Kernels
+
+Pure NumPy kernels behind the mesh checks. They only take arrays and return
+sorted index arrays, so they run the same inside Maya, in worker processes or
+from a plain python shell.
+"""
+
+import numpy as np
+
+
+# Face classification
+def facesWithVertexCount(polygonCounts, count):
+    """Faces with exactly count vertices, eg. 3 for triangles."""
+    return np.flatnonzero(polygonCounts == count)
+
+def facesWithMoreVertices(polygonCounts, count):
+    """Faces with more than count vertices, eg. 4 for ngons."""
+    return np.flatnonzero(polygonCounts > count)
+
+def facesWithoutUVs(uvCounts):
+    """Faces without any UV assigned in the given UV set."""
+    return np.flatnonzero(uvCounts == 0)
+
+
+# Adjacency
+class MeshAdjacency(object):
+    """
+    Compact adjacency of a mesh in CSR form.
+
+    faceEdges maps every face-vertex of polygonConnects to the Maya index of
+    the edge leaving it. edgeFaces[edgeFaceOffsets[e]:edgeFaceOffsets[e + 1]]
+    are the faces using edge e and vertexEdges is laid out the same way
+    through vertexEdgeOffsets.
+    """
+
+    def __init__(self, edgeKeys, faceEdges, edgeFaceOffsets, edgeFaces,
+                 vertexEdgeOffsets, vertexEdges):
+        self.edgeKeys = edgeKeys
+        self.faceEdges = faceEdges
+        self.edgeFaceOffsets = edgeFaceOffsets
+        self.edgeFaces = edgeFaces
+        self.vertexEdgeOffsets = vertexEdgeOffsets
+        self.vertexEdges = vertexEdges
+
+    @property
+    def edgeFaceCounts(self):
+        return np.diff(self.edgeFaceOffsets)
+
+    @property
+    def vertexEdgeCounts(self):
+        return np.diff(self.vertexEdgeOffsets)
+
+def edgeKeys(edges, numVertices):
+    """Order independent int64 key of every (v0, v1) vertex pair."""
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    return edges.min(axis=1) * numVertices + edges.max(axis=1)
+
+def faceVertexPairs(polygonCounts, polygonConnects):
+    """(faceIds, v0, v1) for every face-vertex and the next one in its face."""
+    numFaceVertices = len(polygonConnects)
+    offsets = np.zeros(len(polygonCounts), dtype=np.int64)
+    np.cumsum(polygonCounts[:-1], out=offsets[1:])
+    following = np.arange(1, numFaceVertices + 1, dtype=np.int64)
+    nonEmpty = polygonCounts > 0
+    following[(offsets + polygonCounts - 1)[nonEmpty]] = offsets[nonEmpty]
+    faceIds = np.repeat(np.arange(len(polygonCounts)), polygonCounts)
+    return faceIds, polygonConnects, polygonConnects[following]
+
+def _csr(keys, values, size):
+    # Groups values by key into (offsets, values) sorted by key
+    order = np.argsort(keys, kind="stable")
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=size), out=offsets[1:])
+    return offsets, values[order]
+
+def buildAdjacency(numVertices, polygonCounts, polygonConnects, edges):
+    """Builds a MeshAdjacency from the face-vertex connects and Maya edge list."""
+    edges = np.asarray(edges).reshape(-1, 2)
+    numEdges = len(edges)
+
+    # Sorted unique edge keys, with the Maya index of every key
+    mayaKeys = edgeKeys(edges, numVertices)
+    order = np.argsort(mayaKeys, kind="stable")
+    sortedKeys = mayaKeys[order]
+
+    faceIds, v0, v1 = faceVertexPairs(polygonCounts, polygonConnects)
+    pairKeys = edgeKeys(np.column_stack((v0, v1)), numVertices)
+    found = np.searchsorted(sortedKeys, pairKeys).clip(0, max(numEdges - 1, 0))
+    faceEdges = order[found] if numEdges else np.zeros(0, dtype=np.int64)
+
+    edgeFaceOffsets, edgeFaces = _csr(faceEdges, faceIds, numEdges)
+    vertexEdgeOffsets, vertexEdges = _csr(
+        edges.ravel(), np.repeat(np.arange(numEdges), 2), numVertices)
+    return MeshAdjacency(sortedKeys, faceEdges, edgeFaceOffsets, edgeFaces,
+                         vertexEdgeOffsets, vertexEdges)
+
+
+# Edge classification
+def edgesWithFewerFaces(edgeFaceCounts, count):
+    """Edges used by less than count faces, eg. 2 for open edges."""
+    return np.flatnonzero(edgeFaceCounts < count)
+
+def edgesWithMoreFaces(edgeFaceCounts, count):
+    """Edges used by more than count faces, eg. 2 for non manifold edges."""
+    return np.flatnonzero(edgeFaceCounts > count)
+
+def hardInteriorEdges(edgeSmooth, edgeFaceCounts):
+    """Hard edges that are not on a border."""
+    return np.flatnonzero(~edgeSmooth & (edgeFaceCounts != 1))
+
+
+# Vertex valence
+def vertexValence(edges, numVertices):
+    """Number of edges connected to every vertex."""
+    return np.bincount(np.asarray(edges).ravel(), minlength=numVertices)
+
+def verticesWithValence(vertexValence, count):
+    """Vertices with exactly count edges, eg. 0 for floating vertices."""
+    return np.flatnonzero(vertexValence == count)
+
+def poleVertices(vertexValence, maxValence=5, lowValence=None):
+    """
+    Vertices with more than maxValence edges and, when lowValence is given,
+    the ones with exactly lowValence edges as well (eg. 3 for n-poles).
+    """
+    poles = vertexValence > maxValence
+    if lowValence is not None:
+        poles |= vertexValence == lowValence
+    return np.flatnonzero(poles)
+
+
+# Geometric measures
+def fanTriangles(polygonCounts, polygonConnects):
+    """
+    Fan triangulation of every face as ((T, 3) vertex ids, (T,) face ids).
+
+    Face f with n vertices becomes (v0, vi, vi+1) for i in 1..n-2.
+    """
+    offsets = np.zeros(len(polygonCounts), dtype=np.int64)
+    np.cumsum(polygonCounts[:-1], out=offsets[1:])
+    numTriangles = np.maximum(polygonCounts - 2, 0)
+    faceIds = np.repeat(np.arange(len(polygonCounts)), numTriangles)
+    triangleStarts = np.zeros(len(polygonCounts), dtype=np.int64)
+    np.cumsum(numTriangles[:-1], out=triangleStarts[1:])
+    corner = np.arange(len(faceIds)) - triangleStarts[faceIds] + 1
+    first = offsets[faceIds]
+    triangles = np.column_stack((polygonConnects[first],
+                                 polygonConnects[first + corner],
+                                 polygonConnects[first + corner + 1]))
+    return triangles, faceIds
+
+def triangleAreas(points, triangles):
+    """Area of every (T, 3) triangle."""
+    a = points[triangles[:, 0]]
+    return 0.5 * np.linalg.norm(
+        np.cross(points[triangles[:, 1]] - a, points[triangles[:, 2]] - a), axis=1)
+
+def faceAreas(points, polygonCounts, polygonConnects):
+    """Area of every face, n-gons summed over their fan triangles."""
+    triangles, faceIds = fanTriangles(polygonCounts, polygonConnects)
+    return np.bincount(faceIds, weights=triangleAreas(points, triangles),
+                       minlength=len(polygonCounts))
+
+def edgeLengths(points, edges):
+    """Length of every edge."""
+    edges = np.asarray(edges).reshape(-1, 2)
+    return np.linalg.norm(points[edges[:, 1]] - points[edges[:, 0]], axis=1)
+
+def boundingBoxSize(points):
+    """Diagonal of the bounding box, the length scale tolerances are relative to."""
+    if not len(points):
+        return 0.0
+    return float(np.linalg.norm(points.max(axis=0) - points.min(axis=0)))
+
+def facesBelowArea(faceAreas, points, tolerance):
+    """Faces smaller than tolerance times the squared bounding box diagonal."""
+    return np.flatnonzero(faceAreas < tolerance * boundingBoxSize(points) ** 2)
+
+def edgesBelowLength(edgeLengths, points, tolerance):
+    """Edges shorter than tolerance times the bounding box diagonal."""
+    return np.flatnonzero(edgeLengths < tolerance * boundingBoxSize(points))
+
+
+# UV tiles
+def faceUvBounds(u, v, uvCounts, uvIds):
+    """
+    Per face UV bounding boxes as (faces, uMin, uMax, vMin, vMax), only for
+    the faces that have UVs in the set.
+    """
+    faces = np.flatnonzero(uvCounts > 0)
+    if not len(faces):
+        empty = np.zeros(0, dtype=np.float64)
+        return faces, empty, empty, empty, empty
+    offsets = np.zeros(len(uvCounts), dtype=np.int64)
+    np.cumsum(uvCounts[:-1], out=offsets[1:])
+    starts = offsets[faces]
+    faceU = u[uvIds]
+    faceV = v[uvIds]
+    return (faces,
+            np.minimum.reduceat(faceU, starts), np.maximum.reduceat(faceU, starts),
+            np.minimum.reduceat(faceV, starts), np.maximum.reduceat(faceV, starts))
+
+def uvTileRange(minimum, maximum):
+    """
+    First and last tile touched along one axis. A face ending exactly on a
+    tile border belongs to the tile below it, so a face filling 0-1 is in
+    tile 0 only.
+    """
+    first = np.floor(minimum).astype(np.int64)
+    last = np.maximum(np.ceil(maximum).astype(np.int64) - 1, first)
+    return first, last
+
+def facesOutsideUvRange(uvFaceBounds, uMax=10.0):
+    """Faces with UVs below 0 in U or V, or past uMax in U."""
+    faces, uMin, uMaxs, vMin, vMax = uvFaceBounds
+    return faces[(uMin < 0) | (uMaxs > uMax) | (vMin < 0)]
+
+def facesCrossingTiles(uvFaceBounds):
+    """Faces whose UVs span more than one UDIM tile."""
+    faces, uMin, uMax, vMin, vMax = uvFaceBounds
+    uFirst, uLast = uvTileRange(uMin, uMax)
+    vFirst, vLast = uvTileRange(vMin, vMax)
+    return faces[(uFirst != uLast) | (vFirst != vLast)]
+
+def udimTiles(uvFaceBounds, faces):
+    """Sorted UDIM numbers touched by each of the given faces."""
+    allFaces, uMin, uMax, vMin, vMax = uvFaceBounds
+    rows = np.searchsorted(allFaces, faces)
+    uFirst, uLast = uvTileRange(uMin[rows], uMax[rows])
+    vFirst, vLast = uvTileRange(vMin[rows], vMax[rows])
+    tiles = []
+    for u0, u1, v0, v1 in zip(uFirst.tolist(), uLast.tolist(),
+                              vFirst.tolist(), vLast.tolist()):
+        tiles.append([1001 + uTile + 10 * vTile
+                      for vTile in range(v0, v1 + 1)
+                      for uTile in range(u0, u1 + 1)])
+    return tiles
+
+
+# Overlaps
+def _sortedPairs(counts, maxPairs):
+    # Pairs every sorted position i with the counts[i] positions following it,
+    # yielding blocks of about maxPairs pairs
+    total = np.cumsum(counts)
+    start = 0
+    while start < len(counts):
+        done = total[start - 1] if start else 0
+        stop = max(int(np.searchsorted(total, done + maxPairs, side="right")), start + 1)
+        blockCounts = counts[start:stop]
+        numPairs = int(blockCounts.sum())
+        if numPairs:
+            rows = np.repeat(np.arange(start, stop), blockCounts)
+            blockStarts = np.repeat(np.cumsum(blockCounts) - blockCounts, blockCounts)
+            yield rows, rows + 1 + np.arange(numPairs) - blockStarts
+        start = stop
+
+def _boxesOverlap(mins, maxs, first, second, tolerance=None):
+    # Touching boxes overlap unless a tolerance asks for a strict overlap.
+    # Axes are compared one at a time on contiguous columns, which is much
+    # cheaper than gathering whole (P, D) rows.
+    overlap = np.ones(len(first), dtype=bool)
+    for axis in range(mins.shape[1]):
+        low = np.ascontiguousarray(mins[:, axis])
+        high = np.ascontiguousarray(maxs[:, axis])
+        if tolerance is None:
+            overlap &= (low[first] <= high[second]) & (low[second] <= high[first])
+        else:
+            overlap &= (low[first] < high[second] - tolerance) & \
+                (low[second] < high[first] - tolerance)
+    return overlap
+
+def _orderedPairs(firsts, seconds):
+    if not firsts:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    first, second = np.concatenate(firsts), np.concatenate(seconds)
+    return np.minimum(first, second), np.maximum(first, second)
+
+def sweepAndPrune(mins, maxs, maxPairs=1 << 22):
+    """
+    Candidate pairs (i, j), i < j, whose axis aligned boxes overlap.
+
+    mins and maxs are (N, D) arrays. Boxes are swept along the axis where they
+    are most spread out and the other axes are tested on the candidates, which
+    are generated in blocks of about maxPairs to bound memory. Best for a few
+    thousand boxes of mixed sizes, like whole meshes.
+    """
+    mins = np.asarray(mins, dtype=np.float64).reshape(len(mins), -1)
+    maxs = np.asarray(maxs, dtype=np.float64).reshape(len(maxs), -1)
+    axis = int(np.argmax((mins + maxs).std(axis=0))) if len(mins) else 0
+    order = np.argsort(mins[:, axis], kind="stable")
+    ends = np.searchsorted(mins[order, axis], maxs[order, axis], side="right")
+    counts = np.maximum(ends - np.arange(1, len(order) + 1), 0)
+
+    firsts, seconds = [], []
+    for rows, columns in _sortedPairs(counts, maxPairs):
+        first, second = order[rows], order[columns]
+        keep = _boxesOverlap(mins, maxs, first, second)
+        firsts.append(first[keep])
+        seconds.append(second[keep])
+    return _orderedPairs(firsts, seconds)
+
+def gridPairs(mins, maxs, cellSize=None, tolerance=None, maxPairs=1 << 22):
+    """
+    Candidate pairs (i, j), i < j, whose axis aligned boxes overlap, found
+    through a uniform grid. Scales linearly with the number of boxes when they
+    are of similar size, like the triangles of one mesh.
+
+    cellSize defaults to twice the median box extent. A pair is only reported
+    from the cell holding the corner of its overlap, so it is found once. With
+    a tolerance, boxes must overlap by more than it instead of just touch.
+    """
+    mins = np.asarray(mins, dtype=np.float64).reshape(len(mins), -1)
+    maxs = np.asarray(maxs, dtype=np.float64).reshape(len(maxs), -1)
+    if len(mins) < 2:
+        return _orderedPairs([], [])
+    if cellSize is None:
+        cellSize = 2.0 * float(np.median((maxs - mins).max(axis=1)))
+    cellSize = cellSize or 1.0
+    origin = mins.min(axis=0)
+    cellMins = np.floor((mins - origin) / cellSize).astype(np.int64)
+    cellMaxs = np.floor((maxs - origin) / cellSize).astype(np.int64)
+    dims = cellMaxs.max(axis=0) + 1
+
+    # One entry per box and cell it touches
+    boxes = np.arange(len(mins))
+    cells = cellMins
+    for axis in range(mins.shape[1]):
+        extent = (cellMaxs - cellMins)[boxes, axis] + 1
+        step = np.arange(extent.sum()) - np.repeat(np.cumsum(extent) - extent, extent)
+        boxes = np.repeat(boxes, extent)
+        cells = np.repeat(cells, extent, axis=0)
+        cells[:, axis] += step
+    keys = np.ravel_multi_index(cells.T, dims)
+
+    order = np.argsort(keys, kind="stable")
+    sortedKeys = keys[order]
+    ends = np.searchsorted(sortedKeys, sortedKeys, side="right")
+    counts = ends - np.arange(1, len(order) + 1)
+
+    cellColumns = [np.ascontiguousarray(cellMins[:, axis]) for axis in range(len(dims))]
+    firsts, seconds = [], []
+    for rows, columns in _sortedPairs(counts, maxPairs):
+        first, second = boxes[order[rows]], boxes[order[columns]]
+        corner = np.zeros(len(first), dtype=np.int64)
+        for axis, column in enumerate(cellColumns):
+            corner = corner * dims[axis] + np.maximum(column[first], column[second])
+        keep = corner == sortedKeys[rows]
+        first, second = first[keep], second[keep]
+        keep = _boxesOverlap(mins, maxs, first, second, tolerance)
+        firsts.append(first[keep])
+        seconds.append(second[keep])
+    return _orderedPairs(firsts, seconds)
+
+def _separatingAxes(triangles):
+    # Edge normals of (T, 3, 2) triangles and the triangles' own extent on them
+    edges = np.roll(triangles, -1, axis=1) - triangles
+    normals = np.stack((-edges[:, :, 1], edges[:, :, 0]), axis=2)
+    projections = np.einsum("tij,tkj->tik", normals, triangles)
+    return normals, projections.min(axis=2), projections.max(axis=2)
+
+def _separated(axes, first, triangles, second, tolerance):
+    normals, low, high = axes
+    projections = np.einsum("pij,pkj->pik", normals[first], triangles[second])
+    return np.any((high[first] <= projections.min(axis=2) + tolerance) |
+                  (projections.max(axis=2) <= low[first] + tolerance), axis=1)
+
+def trianglesOverlap2D(triangles, first, second, tolerance=0.0, chunk=1 << 20):
+    """
+    Separating axis test between the (T, 3, 2) triangles first[i] and
+    second[i]. Triangles that only touch along an edge or at a corner do not
+    overlap. Pairs are tested in chunks to bound memory.
+    """
+    axes = _separatingAxes(triangles)
+    overlap = np.zeros(len(first), dtype=bool)
+    for start in range(0, len(first), chunk):
+        a = first[start:start + chunk]
+        b = second[start:start + chunk]
+        overlap[start:start + chunk] = ~(
+            _separated(axes, a, triangles, b, tolerance) |
+            _separated(axes, b, triangles, a, tolerance))
+    return overlap
+
+def overlappingUvFaces(u, v, uvCounts, uvIds, uvShellIds=None, mode="all",
+                       tolerance=1e-9):
+    """
+    Faces whose UVs overlap another face of the same mesh.
+
+    mode is "all", "intra" to only compare faces of the same UV shell or
+    "inter" to only compare faces of different shells.
+    """
+    triangles, faceIds = fanTriangles(uvCounts, uvIds)
+    uv = np.column_stack((u, v))[triangles]
+    # 2D cross product written out, np.cross of 2D vectors is deprecated
+    edge1, edge2 = uv[:, 1] - uv[:, 0], uv[:, 2] - uv[:, 0]
+    areas = np.abs(edge1[:, 0] * edge2[:, 1] - edge1[:, 1] * edge2[:, 0])
+    valid = np.flatnonzero(areas > tolerance)
+    uv, faceIds, triangles = uv[valid], faceIds[valid], triangles[valid]
+
+    first, second = gridPairs(uv.min(axis=1), uv.max(axis=1), tolerance=tolerance)
+    keep = faceIds[first] != faceIds[second]
+    if mode != "all":
+        shells = np.asarray(uvShellIds)[triangles[:, 0]]
+        sameShell = shells[first] == shells[second]
+        keep &= sameShell if mode == "intra" else ~sameShell
+    first, second = first[keep], second[keep]
+
+    overlap = trianglesOverlap2D(uv, first, second, tolerance)
+    return np.unique(np.concatenate((faceIds[first[overlap]], faceIds[second[overlap]])))
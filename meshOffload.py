@@ -0,0 +1,190 @@
+"""
+Mesh Offload
+
+Runs the pure NumPy mesh kernels in a pool of worker processes. The raw
+arrays of every mesh are exported once per run into
+multiprocessing.shared_memory blocks; workers map them zero-copy, derive what
+the kernel needs (face areas, adjacency, UV bounds...) and only send back the
+index array. Nothing here imports Maya, workers only import the kernel
+modules.
+
+Needs Python 3.8 or later for shared_memory, available() is False otherwise
+and the checks run in process.
+"""
+
+import os
+import sys
+import importlib
+
+import numpy as np
+
+import meshKernels
+
+try:
+    from multiprocessing import shared_memory
+    import multiprocessing
+except ImportError:
+    shared_memory = None
+
+
+def available():
+    return shared_memory is not None
+
+
+# Arrays a worker derives itself from the shared raw ones, like MeshArrays
+# does in process: name -> (raw sources, function of an array getter)
+DERIVED = {
+    "faceOffsets": (("polygonCounts",),
+                    lambda a: np.concatenate([[0], np.cumsum(a("polygonCounts")[:-1])])),
+    "edgeFaceCounts": (("polygonCounts", "polygonConnects", "edges", "numVertices"),
+                       lambda a: meshKernels.buildAdjacency(
+                           a("numVertices"), a("polygonCounts"), a("polygonConnects"),
+                           a("edges")).edgeFaceCounts),
+    "vertexValence": (("edges", "numVertices"),
+                      lambda a: meshKernels.vertexValence(a("edges"), a("numVertices"))),
+    "faceAreas": (("points", "polygonCounts", "polygonConnects"),
+                  lambda a: meshKernels.faceAreas(
+                      a("points"), a("polygonCounts"), a("polygonConnects"))),
+    "edgeLengths": (("points", "edges"),
+                    lambda a: meshKernels.edgeLengths(a("points"), a("edges"))),
+    "uvFaceBounds": (("u", "v", "uvCounts", "uvIds"),
+                     lambda a: meshKernels.faceUvBounds(a("u"), a("v"), a("uvCounts"), a("uvIds"))),
+}
+
+
+def rawSources(fields):
+    """Raw arrays to export for a kernel reading fields."""
+    sources = []
+    for field in fields:
+        for source in DERIVED.get(field, ((field,), None))[0]:
+            if source not in sources:
+                sources.append(source)
+    return sources
+
+
+# Worker side
+def _attach(name):
+    # Spawned workers share the resource tracker of the main process, which
+    # owns and unlinks the blocks
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def runKernel(module, name, specs, scalars, fields, params):
+    """
+    Worker task: maps the shared arrays described by specs, derives the
+    missing fields and returns the kernel result as a plain array.
+    specs maps source names to (block name, dtype, shape).
+    """
+    kernel = getattr(importlib.import_module(module), name)
+    blocks = []
+    arrays = dict(scalars)
+    try:
+        for source, (blockName, dtype, shape) in specs.items():
+            block = _attach(blockName)
+            blocks.append(block)
+            arrays[source] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+        def get(field):
+            if field not in arrays:
+                arrays[field] = DERIVED[field][1](get)
+            return arrays[field]
+
+        result = np.array(kernel(*[get(field) for field in fields], **params))
+    finally:
+        arrays.clear()
+        for block in blocks:
+            try:
+                block.close()
+            except BufferError:
+                # A view is still alive somewhere, the mapping goes with the worker
+                pass
+    return result
+
+
+# Main process side
+def _workerExecutable():
+    # Inside the Maya GUI sys.executable is Maya itself, workers need mayapy
+    if os.environ.get("MAYAPY"):
+        return os.environ["MAYAPY"]
+    executable = os.path.basename(sys.executable).lower()
+    if executable.startswith(("python", "mayapy")):
+        return sys.executable
+    mayapy = os.path.join(os.path.dirname(sys.executable),
+                          "mayapy.exe" if sys.platform == "win32" else "mayapy")
+    return mayapy if os.path.exists(mayapy) else sys.executable
+
+
+class _Done(object):
+    # Same interface as an AsyncResult for results computed in process
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class MeshOffload(object):
+    """
+    Worker pool and the shared memory blocks of the current run.
+
+    The pool is started on first use and kept warm across runs; blocks are
+    released by release(), which sanityChecker calls at the start of every
+    run.
+    """
+
+    def __init__(self, workers=None):
+        if available():
+            self.workers = workers or max(1, multiprocessing.cpu_count() - 1)
+        else:
+            self.workers = 0
+        self._pool = None
+        self._blocks = {}
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            context = multiprocessing.get_context("spawn")
+            context.set_executable(_workerExecutable())
+            self._pool = context.Pool(self.workers)
+        return self._pool
+
+    def submit(self, kernel, mesh, fields, uvSet=None, **params):
+        """Queues kernel over the arrays of a MeshArrays, returns an AsyncResult."""
+        specs = {}
+        scalars = {}
+        for source in rawSources(fields):
+            if source == "numVertices":
+                scalars[source] = mesh.numVertices
+            else:
+                specs[source] = self._export(mesh, source, uvSet)
+        return self.pool.apply_async(
+            runKernel, (kernel.__module__, kernel.__name__, specs, scalars, list(fields), params))
+
+    def run(self, kernel, mesh, fields, uvSet=None, **params):
+        """Runs kernel in process, with the same interface as submit."""
+        return _Done(kernel(*[mesh.array(field, uvSet) for field in fields], **params))
+
+    def release(self):
+        for block, spec in self._blocks.values():
+            block.close()
+            block.unlink()
+        self._blocks.clear()
+
+    def shutdown(self):
+        self.release()
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def _export(self, mesh, source, uvSet):
+        # Every raw array is copied to shared memory once per run
+        key = (id(mesh), source, uvSet or mesh.currentUVSet)
+        if key not in self._blocks:
+            array = np.ascontiguousarray(mesh.array(source, uvSet))
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self._blocks[key] = (block, (block.name, array.dtype.str, array.shape))
+        return self._blocks[key][1]
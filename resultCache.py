@@ -0,0 +1,144 @@
+"""
+Result Cache
+
+Disk backed, content addressed store for per-mesh check results. Keys are
+digests of the arrays a check reads plus the check identity, version and
+thresholds, so an unchanged mesh hits the cache whatever its name, scene or
+session. Entries are small JSON files; the least recently used ones are
+evicted once the directory grows past maxBytes.
+"""
+
+import os
+import json
+import time
+import hashlib
+
+
+def _replace(source, destination):
+    # Atomic where os.replace exists, remove and rename otherwise
+    try:
+        os.replace(source, destination)
+    except AttributeError:
+        if os.path.exists(destination):
+            os.remove(destination)
+        os.rename(source, destination)
+
+
+class ResultCache(object):
+    """
+    Content addressed results in directory/<key[:2]>/<key>.json.
+
+    Reading an entry touches its modification time, which is what the LRU
+    eviction sorts on, so several Maya sessions can share one directory.
+    """
+
+    def __init__(self, directory, maxBytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self._index = None
+        self._size = 0
+
+    @staticmethod
+    def key(*parts):
+        """Digest of the repr of parts, which must be plain values."""
+        return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key):
+        """The stored value, None on a miss."""
+        if not self.enabled:
+            return None
+        path = self.path(key)
+        try:
+            with open(path, "r") as entry:
+                value = json.load(entry)
+            now = time.time()
+            os.utime(path, (now, now))
+        except (IOError, OSError, ValueError):
+            self.misses += 1
+            return None
+        if self._index is not None and key in self._index:
+            self._index[key] = (self._index[key][0], now)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        path = self.path(key)
+        temporary = "%s.%s.tmp" % (path, os.getpid())
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(temporary, "w") as entry:
+                json.dump(value, entry, separators=(",", ":"))
+            _replace(temporary, path)
+            size = os.path.getsize(path)
+        except (IOError, OSError):
+            # A read-only or full disk only costs the cache, never the check
+            return
+        self._loadIndex()
+        previous = self._index.get(key)
+        if previous:
+            self._size -= previous[0]
+        self._index[key] = (size, time.time())
+        self._size += size
+        if self._size > self.maxBytes:
+            self.evict()
+
+    def evict(self, targetBytes=None):
+        """Removes the least recently used entries down to targetBytes."""
+        if targetBytes is None:
+            targetBytes = int(self.maxBytes * 0.9)
+        self._loadIndex()
+        for key, (size, used) in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._size <= targetBytes:
+                break
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+            del self._index[key]
+            self._size -= size
+
+    def clear(self):
+        self.evict(0)
+
+    def resetStats(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hitRate(self):
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+    def report(self):
+        lookups = self.hits + self.misses
+        if not lookups:
+            return ""
+        return "Result cache: %d/%d hits (%d%%)" % (self.hits, lookups, round(self.hitRate * 100))
+
+    def _loadIndex(self):
+        # Sizes and last use of every entry, scanned once per session
+        if self._index is not None:
+            return
+        self._index = {}
+        self._size = 0
+        if not os.path.isdir(self.directory):
+            return
+        for root, dirs, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                self._index[name[:-5]] = (stat.st_size, stat.st_mtime)
+                self._size += stat.st_size
@@ -0,0 +1,261 @@
+"""
+Results Model
+
+Item model behind the results tree of the UI: check -> node -> component
+ranges. Only the check rows exist up front; the nodes of a check are grouped
+when it is first expanded and the rows of every level are created by
+fetchMore in batches of BATCH, so the view only ever holds the rows that were
+scrolled to, whatever the size of the result. Consecutive component indices
+are shown as ranges like mesh.f[0:999], split where the message of the check
+changes when it returns one per component as {node: {kind: {index: message}}}.
+"""
+
+from PySide2 import QtCore, QtGui
+
+from componentResult import ComponentResult
+
+# Rows created per fetchMore
+BATCH = 1000
+
+STATUS_COLORS = {"SUCCESS": "#446644", "WARNING": "#FAD02C", "FAILED": "#664444",
+                 "FIXED": "#446644", "CANCELLED": "#555555"}
+TEXT_COLORS = {"SUCCESS": "#7fc97f", "WARNING": "#FAD02C", "FAILED": "#e06c6c",
+               "FIXED": "#7fc97f", "CANCELLED": "#a9b7c6"}
+
+class _Item(object):
+    # One row; children are created lazily from load(start, count)
+
+    __slots__ = ("parent", "row", "label", "count", "message", "status", "name",
+                 "children", "total", "load")
+
+    def __init__(self, parent, row, label, count=None, message="", status=None, name=None):
+        self.parent = parent
+        self.row = row
+        self.label = label
+        self.count = count
+        self.message = message
+        self.status = status
+        self.name = name
+        self.children = []
+        self.total = None
+        self.load = None
+
+
+class ResultsModel(QtCore.QAbstractItemModel):
+
+    HEADERS = ("Result", "Count", "Message")
+
+    def __init__(self, parent=None):
+        super(ResultsModel, self).__init__(parent)
+        self._root = _Item(None, 0, "")
+        self._root.total = 0
+        self._checks = []
+        self._filter = ""
+
+    # Content
+    def clear(self):
+        self.beginResetModel()
+        self._checks = []
+        self._root.children = []
+        self._root.total = 0
+        self.endResetModel()
+
+    def addCheck(self, command, status, items, message):
+        """Adds or replaces the row of a check."""
+        self._checks = [check for check in self._checks if check[0] != command]
+        self._checks.append((command, status, items, message))
+        if self._filter:
+            self._rebuild()
+            return
+        for row, item in enumerate(self._root.children):
+            if item.name == command:
+                self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+                del self._root.children[row]
+                for later in self._root.children[row:]:
+                    later.row -= 1
+                self.endRemoveRows()
+                break
+        row = len(self._root.children)
+        self.beginInsertRows(QtCore.QModelIndex(), row, row)
+        self._root.children.append(self._checkItem(row, command, status, items, message))
+        self._root.total = len(self._root.children)
+        self.endInsertRows()
+
+    def setStatus(self, command, status):
+        for index, check in enumerate(self._checks):
+            if check[0] == command:
+                self._checks[index] = (command, status) + check[2:]
+        for item in self._root.children:
+            if item.name == command:
+                item.status = status
+                self.dataChanged.emit(self.createIndex(item.row, 0, item),
+                                      self.createIndex(item.row, 2, item))
+
+    def setFilter(self, text):
+        """Only shows the checks and nodes whose name contains text."""
+        self._filter = text.lower()
+        self._rebuild()
+
+    def itemNames(self, index):
+        """Names to select for a row, node or component ranges included."""
+        item = index.internalPointer()
+        if item is None or item.parent is self._root or item.name is None and \
+                item.parent.parent is self._root:
+            return []
+        if item.parent.parent is self._root:
+            return [item.name]
+        return ["%s.%s" % (item.parent.name, item.label)]
+
+    def _rebuild(self):
+        self.beginResetModel()
+        self._root.children = []
+        for command, status, items, message in self._checks:
+            row = len(self._root.children)
+            item = self._checkItem(row, command, status, items, message)
+            if self._filter and self._filter not in command.lower():
+                # A check also matches through one of its nodes
+                result = _componentResult(items)
+                nodes = [node for node in result.nodes() if self._filter in str(node).lower()]
+                if not nodes:
+                    continue
+                self._setNodes(item, nodes, result, message)
+            self._root.children.append(item)
+        self._root.total = len(self._root.children)
+        self.endResetModel()
+
+    def _checkItem(self, row, command, status, items, message):
+        # Per node messages go on the node rows
+        item = _Item(self._root, row, command, len(items),
+                     message if items and not isinstance(message, dict) else "",
+                     status, command)
+
+        def load(start, count):
+            # Grouping waits for the first expansion of the check
+            if item.total is None:
+                result = _componentResult(items)
+                self._setNodes(item, result.nodes(), result, message)
+            return item.load(start, count) if item.load is not load else []
+        item.load = load
+        return item
+
+    def _setNodes(self, item, nodes, result, message):
+        item.total = len(nodes)
+
+        def load(start, count):
+            rows = []
+            for row, node in enumerate(nodes[start:start + count], start):
+                nodeMessage = message.get(node, "") if isinstance(message, dict) else ""
+                components = result.count(node)
+                # Component checks key their messages per component of the node
+                child = _Item(item, row, str(node), components or None,
+                              "" if isinstance(nodeMessage, dict) else nodeMessage, name=node)
+                if components:
+                    self._setComponents(child, result, nodeMessage)
+                else:
+                    child.total = 0
+                rows.append(child)
+            return rows
+        item.load = load
+
+    def _setComponents(self, item, result, messages):
+        # Only the names of the fetched ranges are ever built, unless the
+        # components have messages and the ranges are split where they change
+        if isinstance(messages, dict):
+            ranges = []
+
+            def load(start, count):
+                if not ranges:
+                    ranges.extend(result.rangeMessages(item.name, messages))
+                    item.total = len(ranges)
+                return [_Item(item, row, label, None, rangeMessage) for row, (label, rangeMessage)
+                        in enumerate(ranges[start:start + count], start)]
+        else:
+            def load(start, count):
+                item.total = result.rangeCount(item.name)
+                return [_Item(item, row, label, None) for row, label
+                        in enumerate(result.rangeNames(item.name, start, start + count), start)]
+        item.total = -1
+        item.load = load
+
+    # QAbstractItemModel
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        item = parent.internalPointer() if parent.isValid() else self._root
+        if row < len(item.children):
+            return self.createIndex(row, column, item.children[row])
+        return QtCore.QModelIndex()
+
+    def parent(self, index):
+        if not index.isValid():
+            return QtCore.QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self._root:
+            return QtCore.QModelIndex()
+        return self.createIndex(parent.row, 0, parent)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid() and parent.column() != 0:
+            return 0
+        item = parent.internalPointer() if parent.isValid() else self._root
+        return len(item.children)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return len(self.HEADERS)
+
+    def hasChildren(self, parent=QtCore.QModelIndex()):
+        item = parent.internalPointer() if parent.isValid() else self._root
+        if item.total is None:
+            return bool(item.count)
+        return item.total != 0
+
+    def canFetchMore(self, parent):
+        item = parent.internalPointer() if parent.isValid() else self._root
+        if item.load is None:
+            return False
+        return item.total is None or item.total < 0 or len(item.children) < item.total
+
+    def fetchMore(self, parent):
+        item = parent.internalPointer() if parent.isValid() else self._root
+        start = len(item.children)
+        rows = item.load(start, BATCH)
+        if not rows:
+            return
+        self.beginInsertRows(parent, start, start + len(rows) - 1)
+        item.children.extend(rows)
+        self.endInsertRows()
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = index.internalPointer()
+        column = index.column()
+        if role == QtCore.Qt.DisplayRole:
+            if column == 0:
+                if item.parent is self._root and item.status:
+                    return "%s -- %s" % (item.label, item.status)
+                return item.label
+            if column == 1:
+                return item.count
+            return item.message
+        if role == QtCore.Qt.ToolTipRole and column == 2:
+            return item.message
+        if role == QtCore.Qt.BackgroundRole and item.parent is self._root:
+            return QtGui.QColor(STATUS_COLORS.get(item.status, "#1e1d23"))
+        if role == QtCore.Qt.ForegroundRole:
+            if item.parent is self._root:
+                return QtGui.QColor("#000000" if item.status == "WARNING" else "#ffffff")
+            # Nodes and components take the colour of their check
+            check = item.parent
+            while check.parent is not self._root:
+                check = check.parent
+            return QtGui.QColor(TEXT_COLORS.get(check.status, "#a9b7c6"))
+        return None
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+
+def _componentResult(items):
+    # Lists of names from the node checks are grouped the same way
+    return items if isinstance(items, ComponentResult) else ComponentResult(items)
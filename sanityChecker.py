@@ -1,11 +1,264 @@
 import os
+import numpy as np
 import maya.mel as mel
 import maya.cmds as cmds
 import pymel.core as pm
 import maya.api.OpenMaya as om
+from meshArrays import MeshArraysCache, meshShapePath
+import meshKernels
+import meshIntersections
+from sceneSnapshot import SceneSnapshot, IDENTITY_MATRIX
+from resultCache import ResultCache
+import textureBrightness
+from textureCache import TextureCache
+from textureTiles import tilePattern, resolveTiles
+from texturePaths import DirectoryCache, unresolvedVariables
+from meshOffload import MeshOffload
+from incrementalChecks import DirtyTracker, IncrementalResults
+import checkRegistry
+from componentResult import ComponentResult
 
 version = int(cmds.about(version=True))
 
+# Shared per-run mesh data, cleared by the UI at the start of every run
+meshCache = MeshArraysCache()
+
+# Columnar view of the nodes of the current run, built by filterNodes
+snapshot = None
+
+# Per-mesh results of the array checks, shared across scenes and sessions.
+# Bump resultCacheVersion whenever a kernel changes what it reports.
+resultCache = ResultCache(os.environ.get(
+    "SANITY_CHECKER_CACHE",
+    os.path.join(os.path.expanduser("~"), ".sanityChecker", "results")))
+resultCacheVersion = 1
+
+# Texture directory listings of the current run
+directoryCache = DirectoryCache()
+
+# Header info, brightness and hashes of the textures, trusted while a file
+# keeps its modification time and size, read from the listings of the run
+textureCache = TextureCache(os.environ.get(
+    "SANITY_CHECKER_TEXTURE_CACHE",
+    os.path.join(os.path.expanduser("~"), ".sanityChecker", "textures.sqlite")),
+    directoryCache)
+
+# Offload mode runs the array kernels of meshes with at least
+# offloadMinFaces faces in worker processes over shared memory
+offloadMode = False
+offloadMinFaces = 5000
+meshOffload = MeshOffload()
+
+# Incremental mode re-runs the per node checks on the nodes edited since the
+# previous run only and reuses the stored results of every other node
+incrementalMode = False
+dirtyTracker = DirtyTracker()
+incrementalResults = IncrementalResults()
+
+# Pole thresholds, vertices with more than poleMaxValence edges are poles and
+# so are the ones with exactly poleLowValence edges when it is set (eg. 3)
+poleMaxValence = 5
+poleLowValence = None
+
+# Degenerate geometry tolerances, relative to the bounding box diagonal of each
+# mesh (squared for areas) so they hold for millimeter and kilometer assets
+zeroAreaTolerance = 1e-7
+zeroLengthTolerance = 1e-9
+
+# UV overlaps to report: "all", "intra" (inside a UV shell) or "inter" (between shells)
+uvOverlapMode = "all"
+
+
+def filterNodes(topNode=""):
+    """
+    Nodes to check and the SLMesh selection list of the ones with a mesh: the
+    selection, the descendants of topNode, or every transform in the scene.
+    Returns (None, SLMesh) when topNode does not exist. Also builds the
+    SceneSnapshot the checks of this run read from.
+    """
+    global snapshot
+    SLMesh = om.MSelectionList()
+    selection = cmds.ls(sl=True, fl=True)
+    if len(selection) > 0:
+        nodes = selection
+    elif not topNode:
+        nodes = [obj for obj in cmds.ls(transforms=True, fl=True)
+                 if obj not in {'front', 'persp', 'top', 'side'}]
+    elif cmds.objExists(topNode):
+        nodes = cmds.listRelatives(
+            topNode, allDescendents=True, typ="transform", fullPath=True) or []
+        nodes.append(topNode)
+    else:
+        snapshot = None
+        return None, SLMesh
+
+    snapshot = SceneSnapshot.build(nodes)
+    for i, node in enumerate(nodes):
+        if snapshot.hasMeshShape(i):
+            SLMesh.add(node)
+    return nodes, SLMesh
+
+def setIncremental(enabled):
+    global incrementalMode
+    incrementalMode = enabled
+    if not enabled:
+        dirtyTracker.stop()
+        incrementalResults.clear()
+
+def beginRun(list):
+    """
+    Prepares the shared caches for a run over list. Outside incremental mode
+    everything is read again; in incremental mode only what was edited since
+    the previous run is dropped.
+    """
+    resultCache.resetStats()
+    textureCache.resetStats()
+    directoryCache.clear()
+    meshOffload.release()
+    if not incrementalMode:
+        meshCache.clear()
+        return
+    if dirtyTracker.sceneChanged:
+        dirtyTracker.stop()
+        incrementalResults.clear()
+        meshCache.clear()
+    dirtyTracker.start()
+    dirty = dirtyTracker.collect()
+    incrementalResults.invalidate(dirty)
+    meshCache.discard(dirty)
+    dirtyTracker.watch(_snapshot(list).paths)
+
+def runCheck(command, list, SLMesh):
+    """
+    Runs a check like calling it directly. In incremental mode a check the
+    registry scopes per node only runs on the nodes it has no stored result for.
+    """
+    check = globals()[command]
+    if not incrementalMode or not checkRegistry.isPerNode(command):
+        return check(list, SLMesh)
+    nodeSnapshot = _snapshot(list)
+    stale = incrementalResults.stale(command, nodeSnapshot.paths)
+    if stale:
+        staleNodes = [list[i] for i in stale]
+        staleMesh = om.MSelectionList()
+        for i in stale:
+            if nodeSnapshot.hasMeshShape(i):
+                staleMesh.add(list[i])
+        items, message = check(staleNodes, staleMesh)
+        incrementalResults.store(command, [nodeSnapshot.paths[i] for i in stale],
+                                 items, message)
+    return incrementalResults.result(command, nodeSnapshot.paths)
+
+def checkSlices(command, list, SLMesh, size=200):
+    """
+    Splits a check over list in (nodes, SLMesh) slices that can run one at a
+    time: slices of size nodes for per node checks, the whole list otherwise.
+    """
+    if not checkRegistry.isPerNode(command) or len(list) <= size:
+        return [(list, SLMesh)]
+    nodeSnapshot = _snapshot(list)
+    slices = []
+    for start in range(0, len(list), size):
+        sliceMesh = om.MSelectionList()
+        for i in range(start, min(start + size, len(list))):
+            if nodeSnapshot.hasMeshShape(i):
+                sliceMesh.add(list[i])
+        slices.append((list[start:start + size], sliceMesh))
+    return slices
+
+def _snapshot(list):
+    # The snapshot of this run or of some of its nodes, a fresh one when a
+    # check is called on its own
+    if snapshot is not None:
+        if snapshot.covers(list):
+            return snapshot
+        indices = snapshot.indices(list)
+        if indices is not None:
+            return snapshot.subset(indices)
+    return SceneSnapshot.build(list)
+
+# Maya component types of the component names the checks report
+COMPONENT_TYPES = {"f": om.MFn.kMeshPolygonComponent,
+                   "e": om.MFn.kMeshEdgeComponent,
+                   "vtx": om.MFn.kMeshVertComponent,
+                   "map": om.MFn.kMeshMapComponent}
+
+def selectionList(items):
+    """
+    MSelectionList of check items, a ComponentResult or a list of names.
+    Components are added per mesh and type from their index arrays through
+    MFnSingleIndexedComponent, names that do not resolve are skipped.
+    """
+    result = items if isinstance(items, ComponentResult) else ComponentResult(items)
+    selection = om.MSelectionList()
+    for node in result.nodes():
+        kinds = result.kinds(node)
+        if not kinds or any(COMPONENT_TYPES.get(kind) is None for kind in kinds):
+            # Whole nodes, and component types a single index cannot name
+            names = [node] if not kinds else ["%s.%s" % (node, name)
+                                              for name in result.rangeNames(node)]
+            for name in names:
+                try:
+                    selection.add(name)
+                except (RuntimeError, TypeError):
+                    pass
+            continue
+        nodeSelection = om.MSelectionList()
+        try:
+            nodeSelection.add(node)
+            # Components belong to the shape, not to the transform the checks report
+            dagPath = meshShapePath(nodeSelection.getDagPath(0))
+        except (RuntimeError, TypeError):
+            continue
+        if dagPath is None:
+            continue
+        for kind in kinds:
+            fnComponent = om.MFnSingleIndexedComponent()
+            component = fnComponent.create(COMPONENT_TYPES[kind])
+            fnComponent.addElements(result.indices(node, kind).tolist())
+            selection.add((dagPath, component), mergeWithExisting=False)
+    return selection
+
+def selectItems(items):
+    """Selects check items with a single selection change."""
+    om.MGlobal.setActiveSelectionList(selectionList(items))
+
+def _uvSets(mesh):
+    return mesh.uvSetNames or [None]
+
+def _meshComponents(SLMesh, component, kernel, fields, uvSets=False, **params):
+    # Runs an array kernel on every mesh, the indices go in a ComponentResult. With
+    # uvSets the kernel runs once per UV set and the results are merged.
+    # Indices are looked up in the result cache by the mesh content first, in
+    # offload mode the big meshes are all queued before any result is read.
+    queued = []
+    for mesh in meshCache.iterMeshes(SLMesh):
+        meshUvSets = _uvSets(mesh) if uvSets else [None]
+        key = resultCache.key(kernel.__module__, kernel.__name__, resultCacheVersion,
+                              component, sorted(params.items()),
+                              [mesh.digest(fields, uvSet) for uvSet in meshUvSets])
+        indices = resultCache.get(key)
+        if indices is not None:
+            queued.append((mesh, None, [np.array(indices, dtype=np.int64)]))
+            continue
+        if offloadMode and meshOffload.workers and len(mesh.polygonCounts) >= offloadMinFaces:
+            run = meshOffload.submit
+        else:
+            run = meshOffload.run
+        queued.append((mesh, key, [run(kernel, mesh, fields, uvSet, **params)
+                                   for uvSet in meshUvSets]))
+
+    components = ComponentResult()
+    for mesh, key, results in queued:
+        if key is None:
+            indices = results[0]
+        else:
+            indices = [result.get() for result in results]
+            indices = np.unique(np.concatenate(indices)) if uvSets else indices[0]
+            resultCache.put(key, np.asarray(indices).tolist())
+        components.add(mesh.name, component, indices)
+    return components
+
 
 # Scene checks
 def cleanUp(list, SLMesh):
@@ -55,8 +308,9 @@ def animationKeys_fix(list, SLMesh):
 
 def emptyGroups(list, SLMesh):
     emptyGroups = []
-    for obj in list:
-        if cmds.objectType(obj) == "transform":
+    snapshot = _snapshot(list)
+    for i, obj in enumerate(list):
+        if snapshot.nodeTypes[i] == "transform":
             children = cmds.listRelatives(obj, ad=True)
             if children is None:
                 emptyGroups.append(obj)
@@ -83,218 +337,96 @@ def layers_fix(list, SLMesh):
 
 # Topology checks
 def triangles(list, SLMesh):
-    triangles = []
-    selIt = om.MItSelectionList(SLMesh)
-    while not selIt.isDone():
-        faceIt = om.MItMeshPolygon(selIt.getDagPath())
-        objectName = selIt.getDagPath().getPath()
-        while not faceIt.isDone():
-            numOfEdges = faceIt.getEdges()
-            if len(numOfEdges) == 3:
-                faceIndex = faceIt.index()
-                componentName = str(objectName) + '.f[' + str(faceIndex) + ']'
-                triangles.append(componentName)
-            else:
-                pass
-            if version < 2020:
-                faceIt.next(None)
-            else:
-                faceIt.next()
-        selIt.next()
+    triangles = _meshComponents(SLMesh, "f", meshKernels.facesWithVertexCount,
+                                ("polygonCounts",), count=3)
     return triangles, "is a Triangle"
 
 def ngons(list, SLMesh):
-    ngons = []
-    selIt = om.MItSelectionList(SLMesh)
-    while not selIt.isDone():
-        faceIt = om.MItMeshPolygon(selIt.getDagPath())
-        objectName = selIt.getDagPath().getPath()
-        while not faceIt.isDone():
-            numOfEdges = faceIt.getEdges()
-            if len(numOfEdges) > 4:
-                faceIndex = faceIt.index()
-                componentName = str(objectName) + '.f[' + str(faceIndex) + ']'
-                ngons.append(componentName)
-            else:
-                pass
-            if version < 2020:
-                faceIt.next(None)
-            else:
-                faceIt.next()
-        selIt.next()
+    ngons = _meshComponents(SLMesh, "f", meshKernels.facesWithMoreVertices,
+                            ("polygonCounts",), count=4)
     return ngons, "is an Ngon"
 
 def zeroAreaFaces(list, SLMesh):
-    zeroAreaFaces = []
-    selIt = om.MItSelectionList(SLMesh)
-    while not selIt.isDone():
-        faceIt = om.MItMeshPolygon(selIt.getDagPath())
-        objectName = selIt.getDagPath().getPath()
-        while not faceIt.isDone():
-            faceArea = faceIt.getArea()
-            if faceArea < 0.000001:
-                faceIndex = faceIt.index()
-                componentName = str(objectName) + '.f[' + str(faceIndex) + ']'
-                zeroAreaFaces.append(componentName)
-            else:
-                pass
-            if version < 2020:
-                faceIt.next(None)
-            else:
-                faceIt.next()
-        selIt.next()
+    zeroAreaFaces = _meshComponents(SLMesh, "f", meshKernels.facesBelowArea,
+                                    ("faceAreas", "points"),
+                                    tolerance=zeroAreaTolerance)
     return zeroAreaFaces, "is a Zero Area Face"
 
 def zeroLengthEdges(list, SLMesh):
-    zeroLengthEdges = []
-    selIt = om.MItSelectionList(SLMesh)
-    while not selIt.isDone():
-        edgeIt = om.MItMeshEdge(selIt.getDagPath())
-        objectName = selIt.getDagPath().getPath()
-        while not edgeIt.isDone():
-            if edgeIt.length() < 0.00000001:
-                componentName = str(objectName) + \
-                    '.f[' + str(edgeIt.index()) + ']'
-                zeroLengthEdges.append(componentName)
-            edgeIt.next()
-        selIt.next()
+    zeroLengthEdges = _meshComponents(SLMesh, "e", meshKernels.edgesBelowLength,
+                                      ("edgeLengths", "points"),
+                                      tolerance=zeroLengthTolerance)
     return zeroLengthEdges, "is a Zero Length Edge"
 
 def openEdges(list, SLMesh):
-    openEdges = []
-    selIt = om.MItSelectionList(SLMesh)
-    while not selIt.isDone():
-        edgeIt = om.MItMeshEdge(selIt.getDagPath())
-        objectName = selIt.getDagPath().getPath()
-        while not edgeIt.isDone():
-            if edgeIt.numConnectedFaces() < 2:
-                edgeIndex = edgeIt.index()
-                componentName = str(objectName) + '.e[' + str(edgeIndex) + ']'
-                openEdges.append(componentName)
-            else:
-                pass
-            edgeIt.next()
-        selIt.next()
+    openEdges = _meshComponents(SLMesh, "e", meshKernels.edgesWithFewerFaces,
+                                ("edgeFaceCounts",), count=2)
     return openEdges, "is an open Edge"
 
 def floatingVertices(list, SLMesh):
-    floatingVertices = []
-    selIt = om.MItSelectionList(SLMesh)
-    while not selIt.isDone():
-        vertexIt = om.MItMeshVertex(selIt.getDagPath())
-        objectName = selIt.getDagPath().getPath()
-        while not vertexIt.isDone():
-            if vertexIt.numConnectedEdges() == 0:
-                vertexIndex = vertexIt.index()
-                componentName = str(objectName) + \
-                    '.vtx[' + str(vertexIndex) + ']'
-                floatingVertices.append(componentName)
-            else:
-                pass
-            vertexIt.next()
-        selIt.next()
+    floatingVertices = _meshComponents(SLMesh, "vtx", meshKernels.verticesWithValence,
+                                       ("vertexValence",), count=0)
     return floatingVertices, "is a Floating Vertex"
 
 def poles(list, SLMesh):
-    poles = []
-    selIt = om.MItSelectionList(SLMesh)
-    while not selIt.isDone():
-        vertexIt = om.MItMeshVertex(selIt.getDagPath())
-        objectName = selIt.getDagPath().getPath()
-        while not vertexIt.isDone():
-            if vertexIt.numConnectedEdges() > 5:
-                vertexIndex = vertexIt.index()
-                componentName = str(objectName) + \
-                    '.vtx[' + str(vertexIndex) + ']'
-                poles.append(componentName)
-            else:
-                pass
-            vertexIt.next()
-        selIt.next()
+    poles = _meshComponents(SLMesh, "vtx", meshKernels.poleVertices,
+                            ("vertexValence",), maxValence=poleMaxValence,
+                            lowValence=poleLowValence)
     return poles, "is a Pole Vertex"
 
 def hardEdges(list, SLMesh):
-    hardEdges = []
-    selIt = om.MItSelectionList(SLMesh)
-    while not selIt.isDone():
-        edgeIt = om.MItMeshEdge(selIt.getDagPath())
-        objectName = selIt.getDagPath().getPath()
-        while not edgeIt.isDone():
-            if edgeIt.isSmooth == False and edgeIt.onBoundary() == False:
-                edgeIndex = edgeIt.index()
-                componentName = str(objectName) + '.e[' + str(edgeIndex) + ']'
-                hardEdges.append(componentName)
-            else:
-                pass
-            edgeIt.next()
-        selIt.next()
+    hardEdges = _meshComponents(SLMesh, "e", meshKernels.hardInteriorEdges,
+                                ("edgeSmooth", "edgeFaceCounts"))
     return hardEdges, "is a Hard Edge"
 
 def lamina(list, SLMesh):
-    selIt = om.MItSelectionList(SLMesh)
-    lamina = []
-    while not selIt.isDone():
-        faceIt = om.MItMeshPolygon(selIt.getDagPath())
-        objectName = selIt.getDagPath().getPath()
+    lamina = ComponentResult()
+    for mesh in meshCache.iterMeshes(SLMesh):
+        faceIt = om.MItMeshPolygon(mesh.dagPath)
+        faces = []
         while not faceIt.isDone():
             laminaFaces = faceIt.isLamina()
             if laminaFaces == True:
-                faceIndex = faceIt.index()
-                componentName = str(objectName) + '.f[' + str(faceIndex) + ']'
-                lamina.append(componentName)
+                faces.append(faceIt.index())
             else:
                 pass
             if version < 2020:
                 faceIt.next(None)
             else:
                 faceIt.next()
-        selIt.next()
+        lamina.add(mesh.name, "f", faces)
     return lamina, "is a Lamina Face"
 
 def nonManifoldEdges(list, SLMesh):
-    nonManifoldEdges = []
-    selIt = om.MItSelectionList(SLMesh)
-    while not selIt.isDone():
-        edgeIt = om.MItMeshEdge(selIt.getDagPath())
-        objectName = selIt.getDagPath().getPath()
-        while not edgeIt.isDone():
-            if edgeIt.numConnectedFaces() > 2:
-                edgeIndex = edgeIt.index()
-                componentName = str(objectName) + '.e[' + str(edgeIndex) + ']'
-                nonManifoldEdges.append(componentName)
-            else:
-                pass
-            edgeIt.next()
-        selIt.next()
+    nonManifoldEdges = _meshComponents(SLMesh, "e", meshKernels.edgesWithMoreFaces,
+                                       ("edgeFaceCounts",), count=2)
     return nonManifoldEdges, "is a Non Manifold Edge"
 
 def starlike(list, SLMesh):
-    starlike = []
-    selIt = om.MItSelectionList(SLMesh)
-    while not selIt.isDone():
-        polyIt = om.MItMeshPolygon(selIt.getDagPath())
-        objectName = selIt.getDagPath().getPath()
+    starlike = ComponentResult()
+    for mesh in meshCache.iterMeshes(SLMesh):
+        polyIt = om.MItMeshPolygon(mesh.dagPath)
+        faces = []
         while not polyIt.isDone():
             if polyIt.isStarlike() == False:
-                polygonIndex = polyIt.index()
-                componentName = str(objectName) + \
-                    '.e[' + str(polygonIndex) + ']'
-                starlike.append(componentName)
+                faces.append(polyIt.index())
             else:
                 pass
             if version < 2020:
                 polyIt.next(None)
             else:
                 polyIt.next()
-        selIt.next()
+        starlike.add(mesh.name, "f", faces)
     return starlike, "is a Star Face"
 
 
 #Model Check
 def uncenteredPivots(list, SLMesh):
     uncenteredPivots = []
-    for obj in list:
-        if cmds.xform(obj, q=1, ws=1, rp=1) != [0, 0, 0]:
+    snapshot = _snapshot(list)
+    for i, obj in enumerate(list):
+        pivot = snapshot.rotatePivots[i]
+        if pivot is not None and pivot != [0, 0, 0]:
             uncenteredPivots.append(obj)
     return uncenteredPivots, "pivot is not at origin"
 
@@ -306,13 +438,11 @@ def uncenteredPivots_fix(list, SLMesh):
 def lockedChannels(list, SLMesh):
     lockedChannels = []
     lockedGroups = ["stock", "meta", "root", "mesh", "base", "hi", "low", "sculpt", "hair"]
-    for obj in list:
+    snapshot = _snapshot(list)
+    for i, obj in enumerate(list):
         if obj not in lockedGroups:
-            attrs = ["tx", "ty", "tz", "rx", "ry", "rz", "sx", "sy", "sz", "v"]
-            for attr in attrs:
-                status = cmds.getAttr("%s.%s" % (obj, attr), l=True)
-                if status == True:
-                    lockedChannels.append("%s.%s" % (obj, attr))
+            for attr in snapshot.lockedChannels[i] or []:
+                lockedChannels.append("%s.%s" % (obj, attr))
     return lockedChannels, "is a locked channel"
 
 def lockedChannels_fix(list, SLMesh):
@@ -392,11 +522,10 @@ def normals_fix(list, SLMesh):
 
 def unfrozenTransforms(list, SLMesh):
     unfrozenTransforms = []
-    for obj in list:
-        translation = cmds.xform(obj, q=True, worldSpace=True, translation=True)
-        rotation = cmds.xform(obj, q=True, worldSpace=True, rotation=True)
-        scale = cmds.xform(obj, q=True, worldSpace=True, scale=True)
-        if not translation == [0.0, 0.0, 0.0] or not rotation == [0.0, 0.0, 0.0] or not scale == [1.0, 1.0, 1.0]:
+    snapshot = _snapshot(list)
+    for i, obj in enumerate(list):
+        # Zero translation and rotation with a unit scale is an identity world matrix
+        if snapshot.worldMatrices[i] != IDENTITY_MATRIX:
             unfrozenTransforms.append(obj)
     return unfrozenTransforms, "has transformations"
 
@@ -408,9 +537,9 @@ def unfrozenTransforms_fix(list, SLMesh):
 
 def attributes(list, SLMesh):
     attributes = []
-    for obj in list:
-        shapes = cmds.listRelatives(obj, shapes=True, fullPath=True)
-        if shapes and cmds.objectType(shapes[0])=="mesh":
+    snapshot = _snapshot(list)
+    for i, obj in enumerate(list):
+        if snapshot.isMesh(i):
             smoothMeshPreview = cmds.getAttr("%s.displaySmoothMesh" % obj)
             displaySubd = cmds.getAttr("%s.displaySubdComps" % obj)
             previewDivisionLevels = cmds.getAttr("%s.smoothLevel" % obj)
@@ -435,19 +564,17 @@ def attributes_fix(list, SLMesh):
 
 def intermediateObjects(list, SLMesh):
     intermediateObjects = []
-    for obj in list:
-        shape = cmds.listRelatives(obj, shapes=True, fullPath=True)
-        if shape is not None:
-            io = cmds.ls(shape, io=True)
-            if io:
-                intermediateObjects.append(obj)
+    snapshot = _snapshot(list)
+    for i, obj in enumerate(list):
+        if any(snapshot.intermediates[i]):
+            intermediateObjects.append(obj)
     return intermediateObjects, "has Intermediate Objects"
 
 def vcolor(list, SLMesh):
     vcolor = []
-    for obj in list:
-        shapes = cmds.listRelatives(obj, shapes=True, fullPath=True)
-        if shapes and cmds.objectType(shapes[0])=="mesh":
+    snapshot = _snapshot(list)
+    for i, obj in enumerate(list):
+        if snapshot.isMesh(i):
             existing_color_sets = cmds.polyColorSet(obj, q=True, acs=True)
             if not existing_color_sets:
                 vcolor.append(obj)
@@ -473,10 +600,10 @@ def vcolor_fix(list, SLMesh):
 
 def multipleShapes(list, SLMesh):
     multipleShapes = []
-    for obj in list:
-        shapes = cmds.listRelatives(obj, shapes=True, fullPath=True)
-        if shapes and cmds.objectType(shapes[0])=="mesh":
-            if len(shapes) > 1:
+    snapshot = _snapshot(list)
+    for i, obj in enumerate(list):
+        if snapshot.isMesh(i):
+            if len(snapshot.shapes[i]) > 1:
                 multipleShapes.append(obj)
     return multipleShapes, "has Multiple Shapes"
 
@@ -489,8 +616,9 @@ def multipleShapes_fix(list, SLMesh):
 
 def negativeScale(list, SLMesh):
     negativeScale = []
-    for obj in list:
-        scales = cmds.getAttr("%s.scale" % obj)[0]
+    snapshot = _snapshot(list)
+    for i, obj in enumerate(list):
+        scales = snapshot.scales[i] or []
         if [s for s in scales if s < 0]:
             negativeScale.append(obj)
     return negativeScale, "has Negative Scales"
@@ -504,21 +632,22 @@ def negativeScale_fix(list, SLMesh):
 
 def modelHierarchy(list, SLMesh):
     modelHierarchy = []
-    for obj in list:
-        shapes = cmds.listRelatives(obj, shapes=True, fullPath=True)
-        if shapes and cmds.objectType(shapes[0])=="mesh":
-            parent = cmds.listRelatives(obj, p=True)
+    snapshot = _snapshot(list)
+    for i, obj in enumerate(list):
+        if snapshot.isMesh(i):
+            parent = snapshot.parentNames[i]
             if parent:
-                if parent[0] not in ["low", "base", "hi", "sculpt"]:
+                if parent not in ["low", "base", "hi", "sculpt"]:
                     modelHierarchy.append(obj)
     return modelHierarchy, "is not parented in the Correct Model Group"
 
 def shaders(list, SLMesh):
     shaders = []
-    for obj in list:
+    snapshot = _snapshot(list)
+    for i, obj in enumerate(list):
         shadingGrps = None
-        shapes = cmds.listRelatives(obj, shapes=True, fullPath=True)
-        if shapes and cmds.objectType(shapes[0])=="mesh":
+        shapes = snapshot.shapes[i]
+        if snapshot.isMesh(i):
             if shapes is not None:
                 shadingGrps = cmds.listConnections(shapes[0], type='shadingEngine')
                 if not shadingGrps[0] == 'initialShadingGroup':
@@ -534,9 +663,10 @@ def shaders_fix(list, SLMesh):
 
 def history(list, SLMesh):
     history = []
-    for obj in list:
-        shapes = cmds.listRelatives(obj, shapes=True, fullPath=True)
-        if shapes and cmds.objectType(shapes[0])=="mesh":
+    snapshot = _snapshot(list)
+    for i, obj in enumerate(list):
+        shapes = snapshot.shapes[i]
+        if snapshot.isMesh(i):
             historySize = len(cmds.listHistory(shapes[0]))
             if historySize > 1:
                 history.append(obj)
@@ -549,159 +679,56 @@ def history_fix(list, SLMesh):
 
 
 # Intersections Check
-def findIntersections(list, SLMesh):
-    try:
-        cmds.loadPlugin("meshInfo", qt=True)
-    except:
-        return ["Error"], "meshInfo plugin could not be loaded!"
-
-    list = cmds.ls(sl=True)
-    if not list or len(list) != 2:
-        return ["Error"], "Please select 2 meshes!"
-
-    shapes = []
-    for obj in list:
-        selectedShapes = cmds.listRelatives(obj, shapes=True, fullPath=True)
-        if selectedShapes and cmds.objectType(selectedShapes[0])=="mesh":
-            shapes.append(selectedShapes[0])
-    if not len(shapes)>1:
-        cmds.select(cl=True)
-        return
-
-    sel_str = []
-    inc = 1      
-    for i in range(0, len(shapes)-1):
-        for j in range(i+1, len(shapes)):
-            vcg = VCGIntersectionFinder(shapes[i], shapes[j])
-            res = vcg.get_intersecting_selection_strings()
-            if res:
-                for r in res:
-                    sel_str.append(r) 
-        inc += 1
-    
-    cmds.select(sel_str)
-    if sel_str:
-        return ["Error"], "Intersections found!"
-    else:
-        return [], ""
-
-class VCGIntersectionFinder(object):
-    def __init__(self, mesh_a, mesh_b):
-        self._mesh_a = mesh_a
-        self._mesh_b = mesh_b
-        if not self._mesh_a:
-            err = "Invalid node passed in as mesh_a."
-            err += "\nMust be of type kMesh!"
-            raise TypeError(err)
-        if not self._mesh_b:
-            err = "Invalid node passed in as mesh_b."
-            err += "\nMust be of type kMesh!"
-            raise TypeError(err)
-
-    def get_intersecting_face_ids(self):
-        ids = cmds.meshInfo(self._mesh_a, i=self._mesh_b)
-        if not ids:
-            return None
-        cnt_a = ids[0]
-        cnt_b = ids[1]
-        face_ids_a = list()
-        face_ids_b = list()
-        it = 1
-        for i in range(cnt_a):
-            it += 1
-            face_ids_a.append(ids[it])
-        for i in range(cnt_b):
-            it += 1
-            face_ids_b.append(ids[it])
-        return (face_ids_a, face_ids_b)
-
-    def get_intersecting_selection_strings(self):
-        ids = self.get_intersecting_face_ids()
-        if not ids:
-            return []
-
-        sel = list()
-        for _id in ids[0]:
-            sel.append("%s.f[%s]" % (
-                self._mesh_a,
-                _id))
-        for _id in ids[1]:
-            sel.append("%s.f[%s]" % (
-                self._mesh_b,
-                _id))
-        return sel
-
-    def select_intersecting_faces(self):
-        sel_str = self.get_intersecting_selection_strings()
-        cmds.select(sel_str)           
+def meshIntersectionPairs(SLMesh):
+    """
+    Intersecting faces of every pair of meshes in SLMesh as
+    {(meshA.name, meshB.name): (F, 2) face pairs}. A sweep and prune over the
+    world bounding boxes picks the candidate pairs, so only meshes whose
+    boxes overlap are tested face by face.
+    """
+    meshes = list(meshCache.iterMeshes(SLMesh))
+    if len(meshes) < 2:
+        return {}
+    mins = np.array([mesh.worldBoundingBox[0] for mesh in meshes])
+    maxs = np.array([mesh.worldBoundingBox[1] for mesh in meshes])
+    results = {}
+    for i, j in zip(*meshIntersections.candidateMeshPairs(mins, maxs)):
+        meshA, meshB = meshes[i], meshes[j]
+        pairs = meshIntersections.intersectingMeshBVHs(meshA.worldBVH, meshB.worldBVH)
+        if len(pairs):
+            results[(meshA.name, meshB.name)] = pairs
+    return results
 
+def findIntersections(list, SLMesh):
+    faces = {}
+    others = {}
+    for (nameA, nameB), pairs in sorted(meshIntersectionPairs(SLMesh).items()):
+        for name, other, column in ((nameA, nameB, 0), (nameB, nameA, 1)):
+            faces.setdefault(name, []).append(pairs[:, column])
+            meshOthers = others.setdefault(name, {})
+            for face in np.unique(pairs[:, column]).tolist():
+                meshOthers.setdefault(face, []).append(other)
+
+    intersections = ComponentResult()
+    messages = {}
+    for name in sorted(faces):
+        intersections.add(name, "f", np.concatenate(faces[name]))
+        messages[name] = {"f": dict((face, "intersects %s" % ", ".join(names))
+                                    for face, names in others[name].items())}
+    return intersections, messages
 
 def findSelfIntersections(list, SLMesh):
-    try:
-        cmds.loadPlugin("meshInfo", qt=True)
-    except:
-        return ["Error"], "meshInfo plugin could not be loaded!"
-
-    list = cmds.ls(sl=True)
-    if not list or len(list) != 1:
-        return ["Error"], "Please select 1 mesh!"
-
-    shapes = []
-    for obj in list:
-        selectedShapes = cmds.listRelatives(obj, shapes=True, fullPath=True)
-        if selectedShapes and cmds.objectType(selectedShapes[0])=="mesh":
-            shapes.append(selectedShapes[0])
-    if not shapes:
-        cmds.select(cl=True)
-        return
-
-    sel_str = []      
-    for shape in shapes:
-        i = VCGSelfIntersectionFinder(shape)
-        sel_str.extend(i.get_intersecting_selection_strings())
-    cmds.select(sel_str)
-
-    if sel_str:
-        return ["Error"], "Self-Intersections found!"
-    else:
-        return [], ""
-
-class VCGSelfIntersectionFinder(object):
-    def __init__(self, in_mesh):
-        self._in_mesh = in_mesh
-        if not self._in_mesh:
-            err = "Invalid node passed in."
-            err += "\nMust be of type kMesh!"
-            raise TypeError(err)
-
-
-    def get_intersecting_face_ids(self):
-        ids = cmds.meshInfo(self._in_mesh, si=True)
-        return ids
-
-    def get_intersecting_selection_strings(self):
-        ids = self.get_intersecting_face_ids()
-        if not ids:
-            return []
-        sel = []
-        for _id in ids:
-            sel.append("%s.f[%s]" % (
-                self._in_mesh,
-                _id))
-
-        return sel
-
-    def select_intersecting_faces(self):
-        sel_str = self.get_intersecting_selection_strings()
-        cmds.select(sel_str)
+    selfIntersections = _meshComponents(SLMesh, "f", meshIntersections.selfIntersectingFaceIds,
+                                        ("points", "polygonCounts", "polygonConnects"))
+    return selfIntersections, "Self-Intersections found!"
 
 
 # UV checks
 def currentUv(list, SLMesh):
     currentUVs = []
-    for obj in list:
-        shapes = cmds.listRelatives(obj, shapes=True, fullPath=True)
-        if shapes and cmds.objectType(shapes[0])=="mesh":
+    snapshot = _snapshot(list)
+    for i, obj in enumerate(list):
+        if snapshot.isMesh(i):
             currentUVSet = cmds.polyUVSet( obj, q=True, currentUVSet=True )[0]
             if currentUVSet != "map1":
                 currentUVs.append(obj)
@@ -710,9 +737,9 @@ def currentUv(list, SLMesh):
 def multiUv(list, SLMesh):
     multiUVs = []
     uv_sets = ["map1", "custommask"]
-    for obj in list:
-        shapes = cmds.listRelatives(obj, shapes=True, fullPath=True)
-        if shapes and cmds.objectType(shapes[0])=="mesh":
+    snapshot = _snapshot(list)
+    for i, obj in enumerate(list):
+        if snapshot.isMesh(i):
             allUVSet = cmds.polyUVSet( obj, q=True, allUVSets=True )
             for uvSet in allUVSet:
                 if uvSet not in uv_sets:
@@ -720,97 +747,37 @@ def multiUv(list, SLMesh):
     return multiUVs, "Incorrect UV Set name or has only One UV Set"
 
 def missingUv(list, SLMesh):
-    missingUVs = []
-    selIt = om.MItSelectionList(SLMesh)
-    while not selIt.isDone():
-        faceIt = om.MItMeshPolygon(selIt.getDagPath())
-        objectName = selIt.getDagPath().getPath()
-        while not faceIt.isDone():
-            if faceIt.hasUVs() == False:
-                componentName = str(objectName) + \
-                    '.f[' + str(faceIt.index()) + ']'
-                missingUVs.append(componentName)
-            if version < 2020:
-                faceIt.next(None)
-            else:
-                faceIt.next()
-        selIt.next()
+    missingUVs = _meshComponents(SLMesh, "f", meshKernels.facesWithoutUVs,
+                                 ("uvCounts",))
     return missingUVs, "has no UV sets"
 
 def uvRange(list, SLMesh):
-    uvRange = []
-    selIt = om.MItSelectionList(SLMesh)
-    while not selIt.isDone():
-        faceIt = om.MItMeshPolygon(selIt.getDagPath())
-        objectName = selIt.getDagPath().getPath()
-        while not faceIt.isDone():
-            UVs = faceIt.getUVs()
-            for index, eachUVs in enumerate(UVs):
-                if index == 0:
-                    for eachUV in eachUVs:
-                        if eachUV < 0 or eachUV > 10:
-                            componentName = str(
-                                objectName) + '.f[' + str(faceIt.index()) + ']'
-                            uvRange.append(componentName)
-                            break
-                if index == 1:
-                    for eachUV in eachUVs:
-                        if eachUV < 0:
-                            componentName = str(
-                                objectName) + '.f[' + str(faceIt.index()) + ']'
-                            uvRange.append(componentName)
-                            break
-            if version < 2020:
-                faceIt.next(None)
-            else:
-                faceIt.next()
-        selIt.next()
+    uvRange = _meshComponents(SLMesh, "f", meshKernels.facesOutsideUvRange,
+                              ("uvFaceBounds",), uvSets=True)
     return uvRange, "UV Range Error"
 
 def crossBorder(list, SLMesh):
-    crossBorder = []
-    selIt = om.MItSelectionList(SLMesh)
-    while not selIt.isDone():
-        faceIt = om.MItMeshPolygon(selIt.getDagPath())
-        objectName = selIt.getDagPath().getPath()
-        while not faceIt.isDone():
-            U = None
-            V = None
-            UVs = faceIt.getUVs()
-            for index, eachUVs in enumerate(UVs):
-                if index == 0:
-                    for eachUV in eachUVs:
-                        if U == None:
-                            U = int(eachUV)
-                        if U != int(eachUV):
-                            componentName = str(
-                                objectName) + '.f[' + str(faceIt.index()) + ']'
-                            crossBorder.append(componentName)
-                if index == 1:
-                    for eachUV in eachUVs:
-                        if V == None:
-                            V = int(eachUV)
-                        if V != int(eachUV):
-                            componentName = str(
-                                objectName) + '.f[' + str(faceIt.index()) + ']'
-                            crossBorder.append(componentName)
-            if version < 2020:
-                faceIt.next(None)
-            else:
-                faceIt.next()
-        selIt.next()
-    return crossBorder, "UV's crossing Borders"
+    crossBorder = ComponentResult()
+    messages = {}
+    for mesh in meshCache.iterMeshes(SLMesh):
+        tiles = {}
+        for uvSet in _uvSets(mesh):
+            bounds = mesh.uvFaceBounds(uvSet)
+            faces = meshKernels.facesCrossingTiles(bounds)
+            for face, faceTiles in zip(faces.tolist(), meshKernels.udimTiles(bounds, faces)):
+                tiles.setdefault(face, set()).update(faceTiles)
+        if not tiles:
+            continue
+        crossBorder.add(mesh.name, "f", sorted(tiles))
+        messages[mesh.name] = {"f": dict(
+            (face, "UV's crossing Borders (%s)" % ", ".join(str(tile) for tile in sorted(faceTiles)))
+            for face, faceTiles in tiles.items())}
+    return crossBorder, messages
 
 def selfPenetratingUv(list, SLMesh):
-    selfPenetratingUVs = []
-    for obj in list:
-        shape = cmds.listRelatives(obj, shapes=True, fullPath=True)
-        convertToFaces = cmds.ls(
-            cmds.polyListComponentConversion(shape, tf=True), fl=True)
-        overlapping = (cmds.polyUVOverlap(convertToFaces, oc=True))
-        if overlapping is not None:
-            for obj in overlapping:
-                selfPenetratingUVs.append(obj)
+    selfPenetratingUVs = _meshComponents(SLMesh, "f", meshKernels.overlappingUvFaces,
+                                         ("u", "v", "uvCounts", "uvIds", "uvShellIds"),
+                                         mode=uvOverlapMode)
     return selfPenetratingUVs, "has Self-Penetrating UVs"
 
 
@@ -818,8 +785,9 @@ def selfPenetratingUv(list, SLMesh):
 def trailingNumbers(list, SLMesh):
     numbers = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9']
     trailingNumbers = []
-    for obj in list:
-        if cmds.objectType(obj)=="transform":
+    snapshot = _snapshot(list)
+    for i, obj in enumerate(list):
+        if snapshot.nodeTypes[i]=="transform":
             if obj[len(obj)-1] in numbers:
                 trailingNumbers.append(obj)
     return trailingNumbers, "No trailing numbers"
@@ -834,10 +802,11 @@ def duplicatedNames(list, SLMesh):
 
 def shapeNames(list, SLMesh):
     shapeNames = []
-    for obj in list:
+    snapshot = _snapshot(list)
+    for i, obj in enumerate(list):
         new = obj.split('|')
-        shape = cmds.listRelatives(obj, shapes=True)
-        if shape is not None:
+        shape = snapshot.shapeNames(i)
+        if shape:
             name = new[-1] + "Shape"
             if not shape[0] == name:
                 shapeNames.append(obj)
@@ -873,66 +842,210 @@ def namespaces_fix(list, SLMesh):
     return "fixed"
 
 #Texture Checks
+def _fileTextures():
+    # (file node, resolved texture path, first downstream node, tiles) of
+    # every file node, tiles holds the (udim, path) of every tile or
+    # (None, path) for a texture that is not tiled
+    nodes = []
+    for f in cmds.ls(type='file'):
+        shader = cmds.listConnections("%s.outColor" % f, d=True)
+        textureFile = cmds.getAttr("%s.fileTextureName" % f) or ""
+        pattern = tilePattern(
+            textureFile, cmds.getAttr("%s.uvTilingMode" % f),
+            cmds.getAttr("%s.computedFileTextureNamePattern" % f) or "")
+        nodes.append((f, pattern or textureFile, shader[0] if shader else None, bool(pattern)))
+    projectRoot = cmds.workspace(q=True, rootDirectory=True)
+    sourceImages = cmds.workspace(fileRuleEntry="sourceImages") or ""
+    resolved = directoryCache.resolve(
+        [path for f, path, shader, tiled in nodes if not tiled], projectRoot, sourceImages)
+    # Patterns resolve to the candidate root holding their tiles
+    tiles = resolveTiles([path for f, path, shader, tiled in nodes if tiled],
+                         projectRoot, sourceImages, directoryCache)
+    fileTextures = []
+    for f, path, shader, tiled in nodes:
+        if tiled:
+            textureFile, fileTiles = tiles[path]
+        else:
+            textureFile = resolved.get(path, "")
+            fileTiles = [(None, textureFile)] if textureFile else []
+        fileTextures.append((f, textureFile, shader, fileTiles))
+    return fileTextures
+
+def _tileMessage(problems):
+    # {udim or None: problem} of one file node as its message
+    if None in problems:
+        return problems[None]
+    return "Bad tiles: %s" % ", ".join(
+        "%d (%s)" % (udim, problems[udim]) for udim in sorted(problems))
+
 def textureSize(list, SLMesh):
     textures = []
-    files = cmds.ls(type='file')
-    for f in files:
-        shader = cmds.listConnections("%s.outColor" % f, d=True)
-        if shader:
-            textureFile = cmds.getAttr("%s.fileTextureName" % f)
-            width = cmds.getAttr("%s.outSizeX" % f)
-            height = cmds.getAttr("%s.outSizeY" % f)
-            if width != 4096 or height != 4096:
-                textures.append(shader[0])
-            elif width != 8192 or height != 8192:
-                textures.append(shader[0])
-            else:
-                textures.append(shader[0])
-    if not files:
+    messages = {}
+    fileTextures = _fileTextures()
+    infos = textureCache.infos([path for f, textureFile, shader, tiles in fileTextures if shader
+                                for udim, path in tiles])
+    for f, textureFile, shader, tiles in fileTextures:
+        if not shader:
+            continue
+        if not tiles:
+            textures.append(f)
+            messages[f] = "has no texture file"
+            continue
+        problems = {}
+        for udim, path in tiles:
+            info = infos[path]
+            if info.error:
+                problems[udim] = info.error
+            elif info.size not in [(4096, 4096), (8192, 8192)]:
+                problems[udim] = "Texture is %dx%d, not 4K or 8K" % info.size
+        if problems:
+            textures.append(f)
+            messages[f] = _tileMessage(problems)
+    if not fileTextures:
         return [None], "No Texture Files found"
     else:
-        return textures, "Texture is not 4K or 8K"
+        return textures, messages
 
 def imageBrightness(list, SLMesh):
-    try:
-        import PIL
-        from PIL import Image
-    except:
-        return ["Import Error"], "Module Image from PIL not found"
+    if textureBrightness.Image is None and textureBrightness.OpenEXR is None:
+        return ["Import Error"], "Modules Image from PIL and OpenEXR not found"
     imageBrightness = []
-    files = cmds.ls(type='file')
-    for f in files:
-        shader = cmds.listConnections("%s.outColor" % f, d=True)
-        if shader:
-            textureFile = cmds.getAttr("%s.fileTextureName" % f)
-            img = Image.open(textureFile) 
-            extrema = img.convert("L").getextrema()
-            if extrema == (0, 0):
-                imageBrightness.append(f)
-            elif extrema == (1, 1):
-                imageBrightness.append(f)
-    if not files:
+    messages = {}
+    fileTextures = _fileTextures()
+    results = textureCache.brightness([path for f, textureFile, shader, tiles in fileTextures
+                                       if shader for udim, path in tiles])
+    for f, textureFile, shader, tiles in fileTextures:
+        if not shader:
+            continue
+        if not tiles:
+            imageBrightness.append(f)
+            messages[f] = "has no texture file"
+            continue
+        problems = {}
+        for udim, path in tiles:
+            result = results[path]
+            if result.error:
+                problems[udim] = result.error
+            elif result.black or result.white:
+                problems[udim] = "is either Black or White"
+            elif result.constant and result.isFloat:
+                problems[udim] = "is a constant color (%s)" % ", ".join(
+                    "%g" % c for c in result.color)
+        if problems:
+            imageBrightness.append(f)
+            messages[f] = _tileMessage(problems)
+    if not fileTextures:
         return [None], "No Texture Files found"
     else:
-        return imageBrightness, "is either Black or White"
+        return imageBrightness, messages
+
+def textureTiles(list, SLMesh):
+    tiledNodes = []
+    messages = {}
+    # Single files have one tile without udim
+    fileTextures = [(f, textureFile, shader, tiles)
+                    for f, textureFile, shader, tiles in _fileTextures()
+                    if textureFile and not (tiles and tiles[0][0] is None)]
+    infos = textureCache.infos([path for f, textureFile, shader, tiles in fileTextures
+                                for udim, path in tiles])
+    for f, textureFile, shader, tiles in fileTextures:
+        if not tiles:
+            tiledNodes.append(f)
+            messages[f] = "No tile found for %s" % textureFile
+            continue
+        # Tiles should all share the layout of the most common one
+        layouts = {}
+        problems = {}
+        for udim, path in tiles:
+            info = infos[path]
+            if info.error:
+                problems[udim] = info.error
+            else:
+                layout = (info.format, info.size, info.channels, info.bitDepth)
+                layouts.setdefault(layout, []).append(udim)
+        describe = lambda layout: "%s %dx%d %d channels %d bits" % (
+            layout[0], layout[1][0], layout[1][1], layout[2], layout[3])
+        if layouts:
+            expected = max(layouts, key=lambda layout: len(layouts[layout]))
+            for layout, udims in layouts.items():
+                if layout != expected:
+                    for udim in udims:
+                        problems[udim] = "%s, others are %s" % (describe(layout), describe(expected))
+        if problems:
+            tiledNodes.append(f)
+            messages[f] = _tileMessage(problems)
+    if not fileTextures:
+        return [None], "No Tiled Texture Files found"
+    else:
+        return tiledNodes, messages
+
+def missingTextures(list, SLMesh):
+    missing = []
+    messages = {}
+    fileTextures = _fileTextures()
+    users = {}
+    for f, textureFile, shader, tiles in fileTextures:
+        problems = []
+        raw = cmds.getAttr("%s.fileTextureName" % f) or ""
+        variables = unresolvedVariables(raw)
+        if not textureFile:
+            problems.append("has no texture file")
+        elif variables:
+            problems.append("unresolved %s in %s" % (", ".join(variables), raw))
+        elif directoryCache.names(os.path.dirname(textureFile)) is None:
+            problems.append("directory %s not found" % os.path.dirname(textureFile))
+        elif not tiles:
+            problems.append("no tile found for %s" % textureFile)
+        else:
+            for udim, path in tiles:
+                if not directoryCache.exists(path):
+                    onDisk = directoryCache.onDisk(path)
+                    if onDisk:
+                        problems.append("case mismatch, %s is %s on disk" % (
+                            os.path.basename(path), onDisk))
+                    else:
+                        problems.append("%s not found" % path)
+        if textureFile:
+            users.setdefault(os.path.normcase(textureFile), []).append(f)
+        if problems:
+            messages[f] = problems
+    # Several file nodes reading the same texture
+    for nodes in users.values():
+        if len(nodes) > 1:
+            for f in nodes:
+                messages.setdefault(f, []).append("same texture as %s" % ", ".join(
+                    node for node in nodes if node != f))
+    for f, textureFile, shader, tiles in fileTextures:
+        if f in messages:
+            missing.append(f)
+            messages[f] = "; ".join(messages[f])
+    if not fileTextures:
+        return [None], "No Texture Files found"
+    else:
+        return missing, messages
 
 def textureNames(list, SLMesh):
     textureTypes = ["baseColor", "height", "metalness", "normal", "roughness", "emissive", "mask"]
     textures = []
-    files = cmds.ls(type='file')
-    for f in files:
-        textureFile = cmds.getAttr("%s.fileTextureName" % f)
+    fileTextures = _fileTextures()
+    infos = textureCache.infos([path for f, textureFile, shader, tiles in fileTextures
+                                for udim, path in tiles])
+    for f, textureFile, shader, tiles in fileTextures:
         textureName = os.path.basename(textureFile)
         try:
             name, udim, format = textureName.split(".")
             project, asset, object, channel = name.split("_")
+            # Tiled textures are named after every tile found, not the one stored
+            udims = [tile for tile, path in tiles if tile is not None] or [int(udim)]
             
             if channel not in textureTypes: textures.append(f)
             elif format != "exr": textures.append(f)
-            elif not ((abs(1000 - int(udim)) <= 100) or (abs(2000 - int(udim)) <= 100)): textures.append(f)
+            # The header tells the actual format, whatever the extension says
+            elif any(infos[path].format not in (None, "exr") for tile, path in tiles): textures.append(f)
+            elif not all((abs(1000 - tile) <= 100) or (abs(2000 - tile) <= 100) for tile in udims): textures.append(f)
         except:
             textures.append(f)
-    if not files:
+    if not fileTextures:
         return [None], "No Texture Files found"
     else:
         return textures, "Texture Name Format Error, Format: #[project]_[asset]_[object]_[channel].[udim].exr"
@@ -964,9 +1077,10 @@ def unusedShaders_fix(list, SLMesh):
 
 def standardSurface(list, SLMesh):
     standardSurface = []
-    for obj in list:
-        shapes = cmds.listRelatives(obj, shapes=True, fullPath=True)
-        if shapes and cmds.objectType(shapes[0])=="mesh":
+    snapshot = _snapshot(list)
+    for i, obj in enumerate(list):
+        shapes = snapshot.shapes[i]
+        if snapshot.isMesh(i):
             sgNodes = cmds.listConnections(shapes[0], type='shadingEngine')
             matMaya = cmds.listConnections(sgNodes[0] + '.surfaceShader')
             if matMaya:
@@ -15,6 +15,9 @@ import maya.OpenMayaUI as omui
 import maya.api.OpenMaya as om
 import sanityChecker
 reload(sanityChecker)
+import checkRegistry
+from checkRunner import CheckRunner
+from resultsModel import ResultsModel
 
 __location__ =  os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
 
@@ -23,29 +26,6 @@ def getMainWindow():
     mainWindow = wrapInstance(long(main_window_ptr), QtWidgets.QWidget)
     return mainWindow
 
-class Highlighter(QtGui.QSyntaxHighlighter):
-    def __init__(self, parent):
-        super(Highlighter, self).__init__(parent)
-        self.successFormat = QtGui.QTextCharFormat()
-        self.successFormat.setForeground(QtCore.Qt.green)
-        self.warningFormat = QtGui.QTextCharFormat()
-        self.warningFormat.setForeground(QtCore.Qt.yellow)
-        self.errorFormat = QtGui.QTextCharFormat()
-        self.errorFormat.setForeground(QtCore.Qt.red)
-        self.textFormat =  QtGui.QTextCharFormat()
-        self.textFormat.setForeground(QtCore.Qt.white)
-
-    def highlightBlock(self, text):
-        # uncomment this line for Python2
-        if text.endswith('SUCCESS'):
-            self.setFormat(0, len(text), self.successFormat)
-        elif text.endswith('FAILED') or text.startswith('ERROR'):
-            self.setFormat(0, len(text), self.errorFormat)
-        elif text.endswith('WARNING'):
-            self.setFormat(0, len(text), self.warningFormat)
-        elif text.find('---->'):
-            self.setFormat(0, len(text), self.textFormat)
-
 class SanityCheckerUI(QtWidgets.QMainWindow):
 
     qmw_instance = None
@@ -121,86 +101,64 @@ class SanityCheckerUI(QtWidgets.QMainWindow):
         self.reportBoxLayout.addWidget(reportLabel)
         self.report.addLayout(self.reportBoxLayout)
 
-        self.reportOutputUI = QtWidgets.QPlainTextEdit()
-        self.highlighter = Highlighter(self.reportOutputUI.document())
+        self.reportFilterUI = QtWidgets.QLineEdit("")
+        self.reportFilterUI.setPlaceholderText("Filter checks and nodes")
+        self.reportBoxLayout.addWidget(self.reportFilterUI)
+
+        # Results tree, rows are created as they are scrolled to
+        self.resultsModel = ResultsModel(self)
+        self.reportOutputUI = QtWidgets.QTreeView()
+        self.reportOutputUI.setModel(self.resultsModel)
+        self.reportOutputUI.setUniformRowHeights(True)
+        self.reportOutputUI.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        self.reportOutputUI.header().setStretchLastSection(True)
+        self.reportOutputUI.setColumnWidth(0, 260)
+        self.reportOutputUI.setColumnWidth(1, 70)
+        self.reportOutputUI.doubleClicked.connect(self.selectResultRow)
+        self.reportFilterUI.textChanged.connect(self.resultsModel.setFilter)
 
         self.reportOutputUI.setMinimumWidth(300)
         self.report.addWidget(self.reportOutputUI)
 
+        self.statusUI = QtWidgets.QLabel("")
+        self.statusUI.setWordWrap(True)
+        self.report.addWidget(self.statusUI)
+
         self.clearButton = QtWidgets.QPushButton("Clear")
         self.clearButton.setMaximumWidth(150)
-        self.clearButton.clicked.connect(partial(self.reportOutputUI.clear))
+        self.clearButton.clicked.connect(self.clearReport)
 
         self.reportBoxLayout.addWidget(self.clearButton)
 
+        # Progress of the running checks, which run in slices between Qt events
+        self.progressLayout = QtWidgets.QHBoxLayout()
+        self.report.addLayout(self.progressLayout)
+
+        self.progressBar = QtWidgets.QProgressBar()
+        self.progressBar.setRange(0, 1000)
+        self.progressBar.setTextVisible(False)
+        self.progressLabel = QtWidgets.QLabel("")
+        self.progressLabel.setMinimumWidth(150)
+        self.cancelButton = QtWidgets.QPushButton("Cancel")
+        self.cancelButton.setMaximumWidth(60)
+        self.cancelButton.setEnabled(False)
+        self.cancelButton.clicked.connect(self.cancelRun)
+
+        self.progressLayout.addWidget(self.progressBar)
+        self.progressLayout.addWidget(self.progressLabel)
+        self.progressLayout.addWidget(self.cancelButton)
+
+        self.runner = None
+        self.sliceSeconds = 0.05
+        self.runTimer = QtCore.QTimer(self)
+        self.runTimer.setInterval(0)
+        self.runTimer.timeout.connect(self.runSlices)
+
         # Adding the stretch element to the checks UI to get everything at the top
         self.resize(750, 750)
-        self.list = [
-            'cleanUp_scene_0_1',
-            'referenceCheck_scene_0_0',
-            'hierarchy_scene_0_0',
-            'unitCheck_scene_0_0',
-            'animationKeys_scene_0_1',
-            # 'emptyGroups_scene_0_0',
-            'layers_scene_0_1',
-
-            'triangles_topology_0_0',
-            'ngons_topology_0_0',
-            'zeroAreaFaces_topology_0_0',
-            'zeroLengthEdges_topology_0_0',
-            'openEdges_topology_0_0',
-            'floatingVertices_topology_0_0',
-            'poles_topology_0_0',
-            'hardEdges_topology_0_0',
-            'lamina_topology_0_0',
-            'nonManifoldEdges_topology_0_0',
-            'starlike_topology_0_0',
-
-            'uncenteredPivots_model_0_1',
-            'lockedChannels_model_0_1',
-            'lockedHierarchy_model_0_1',
-            'normals_model_0_1',
-            'unfrozenTransforms_model_0_1',
-            'attributes_model_0_1',
-            'intermediateObjects_model_0_0',
-            'vcolor_model_0_1',
-            'multipleShapes_model_0_1', 
-            'negativeScale_model_0_1',
-            'modelHierarchy_model_0_0',
-            # 'shaders_model_0_1',
-            'history_model_0_1',
-
-            'findIntersections_intersections_0_0',
-            'findSelfIntersections_intersections_0_0',
-
-            'currentUv_uv_0_0',
-            'multiUv_uv_0_0',
-            'missingUv_uv_0_0',
-            'uvRange_uv_0_0',
-            'crossBorder_uv_0_0',
-            'selfPenetratingUv_uv_0_0',
-
-            'trailingNumbers_naming_0_0',
-            'duplicatedNames_naming_0_0',
-            'shapeNames_naming_0_1',
-            'namespaces_naming_0_1',
-
-            'textureSize_textures_0_0',
-            'imageBrightness_textures_0_0',
-            'textureNames_textures_0_0',
-
-            'colorSet_lookdev_0_1',
-            'unusedShaders_lookdev_0_1',
-            'standardSurface_lookdev_0_1',
-        ]
-
-        allCategories = []
-
-        for obj in self.list:
-            number = obj.split('_')
-            allCategories.append(number[1])
-
-        self.category = ['scene', 'topology', 'model', 'intersections', 'uv', 'naming', 'textures', 'lookdev']
+        # Categories and checks come from the registry, in its order
+        self.list = checkRegistry.CHECKS
+        self.category = checkRegistry.categories()
         self.SLMesh = om.MSelectionList()
 
         self.categoryLayout = {}
@@ -244,12 +202,9 @@ class SanityCheckerUI(QtWidgets.QMainWindow):
 
         # Creates the buttons with their settings.
         for obj in self.list:
-            new = obj.split('_')
-            name = new[0]
-            category = new[1]
-            check = int(new[2])
-            fix = int(new[3])
-            
+            name = obj.name
+            category = obj.category
+
             newName = re.findall('[A-Z][^A-Z]*', name)
             if newName:
                 newName = "%s %s" % (name.replace(newName[0], "").capitalize(), newName[0])
@@ -273,7 +228,7 @@ class SanityCheckerUI(QtWidgets.QMainWindow):
             self.commandLabel[name].setMinimumWidth(120)
             self.commandCheckBox[name] = QtWidgets.QCheckBox()
 
-            self.commandCheckBox[name].setChecked(check)
+            self.commandCheckBox[name].setChecked(False)
             self.commandCheckBox[name].setMaximumWidth(20)
 
             self.commandRunButton[name] = QtWidgets.QPushButton("Run")
@@ -285,6 +240,9 @@ class SanityCheckerUI(QtWidgets.QMainWindow):
             self.errorNodesButton[name] = QtWidgets.QPushButton("Select Error Nodes")
             self.errorNodesButton[name].setEnabled(False)
             self.errorNodesButton[name].setMaximumWidth(150)
+            # Connected once, the results of the last run are looked up on click
+            self.errorNodesButton[name].clicked.connect(
+                partial(self.selectErrorNodes, name))
 
             self.commandLayout[name].addWidget(self.commandLabel[name])
             self.commandLayout[name].addWidget(self.commandCheckBox[name])
@@ -292,13 +250,13 @@ class SanityCheckerUI(QtWidgets.QMainWindow):
             self.commandLayout[name].addWidget(self.errorNodesButton[name])
 
             
-            if fix == 1:
+            if obj.fix:
                 self.commandFix[name] = ""
                 self.commandFixButton[name] = QtWidgets.QPushButton("Fix")
                 self.commandFixButton[name].setEnabled(False)
                 self.commandFixButton[name].setMaximumWidth(40)
-                # self.commandRunButton[name].clicked.connect(
-                #     partial(self.commandToRun, [eval(name + "_fix")]))
+                self.commandFixButton[name].clicked.connect(
+                    partial(self.runFix, name))
                 self.commandLayout[name].addWidget(self.commandFixButton[name])
             else:
                 self.commandLayout[name].addWidget(QtWidgets.QLabel(" "))
@@ -319,6 +277,12 @@ class SanityCheckerUI(QtWidgets.QMainWindow):
         self.unCheckButton.clicked.connect(self.checkCategory)
         self.checks.addWidget(self.unCheckButton)
 
+        # Incremental mode only re-checks the nodes edited since the last run
+        self.incrementalCheckBox = QtWidgets.QCheckBox("Incremental")
+        self.incrementalCheckBox.setChecked(sanityChecker.incrementalMode)
+        self.incrementalCheckBox.toggled.connect(sanityChecker.setIncremental)
+        self.checkButtonsLayout.addWidget(self.incrementalCheckBox)
+
         rows.addWidget(self.checkRunButton)
 
     # Definitions to manipulate the UI
@@ -334,9 +298,7 @@ class SanityCheckerUI(QtWidgets.QMainWindow):
 
     # Sets all checkboxes to True
     def checkAll(self):
-        for obj in self.list:
-            new = obj.split('_')
-            name = new[0]
+        for name in checkRegistry.names():
             self.commandCheckBox[name].setChecked(True)
 
     def toggleUI(self, obj):
@@ -350,9 +312,7 @@ class SanityCheckerUI(QtWidgets.QMainWindow):
 
     # Sets all checkboxes to False
     def uncheckAll(self):
-        for obj in self.list:
-            new = obj.split('_')
-            name = new[0]
+        for name in checkRegistry.names():
             self.commandCheckBox[name].setChecked(False)
 
         for obj in self.category:
@@ -360,9 +320,7 @@ class SanityCheckerUI(QtWidgets.QMainWindow):
 
     # Sets the checkbox to the oppositve of current state
     def invertCheck(self):
-        for obj in self.list:
-            new = obj.split('_')
-            name = new[0]
+        for name in checkRegistry.names():
             self.commandCheckBox[name].setChecked(
                 not self.commandCheckBox[name].isChecked())
 
@@ -370,14 +328,10 @@ class SanityCheckerUI(QtWidgets.QMainWindow):
         uncheckedCategoryButtons = []
         categoryButtons = []
 
-        for obj in self.list:
-            new = obj.split('_')
-            name = new[0]
-            cat = new[1]
-            if cat == category:
-                categoryButtons.append(name)
-                if self.commandCheckBox[name].isChecked():
-                    uncheckedCategoryButtons.append(name)
+        for name in checkRegistry.names(category):
+            categoryButtons.append(name)
+            if self.commandCheckBox[name].isChecked():
+                uncheckedCategoryButtons.append(name)
 
         for obj in categoryButtons:
             if len(uncheckedCategoryButtons) == len(categoryButtons):
@@ -387,121 +341,159 @@ class SanityCheckerUI(QtWidgets.QMainWindow):
 
     # Filter Nodes
     def filterNodes(self):
-        nodes = []
-        self.SLMesh.clear()
-        allUsuableNodes = []
-        allNodes = cmds.ls(transforms=True, fl=True)
-        for obj in allNodes:
-            if not obj in {'front', 'persp', 'top', 'side'}:
-                allUsuableNodes.append(obj)
-
-        selection = cmds.ls(sl=True, fl=True)
-        topNode = self.selectedTopNode_UI.text()
-        if len(selection) > 0:
-            nodes = selection
-        elif self.selectedTopNode_UI.text() == "":
-            nodes = allUsuableNodes
-        else:
-            if cmds.objExists(topNode):
-                nodes = cmds.listRelatives(
-                    topNode, allDescendents=True, typ="transform", fullPath=True)
-                if not nodes:
-                    nodes = topNode
-                nodes.append(topNode)
-            else:
-                response = "Object in Top Node doesn't exists\n"
-                self.reportOutputUI.clear()
-                self.reportOutputUI.insertPlainText(response)
-        for node in nodes:
-            shapes = cmds.listRelatives(node, shapes=True, typ="mesh", fullPath=True)
-            if shapes:
-                self.SLMesh.add(node)
+        nodes, self.SLMesh = sanityChecker.filterNodes(self.selectedTopNode_UI.text())
+        if nodes is None:
+            self.clearReport()
+            self.showStatus("Object in Top Node doesn't exists")
+            return []
         return nodes
 
     def commandToRun(self, commands):
+        if self.runner is not None:
+            return
         # Run FilterNodes
         nodes = self.filterNodes()
-        self.reportOutputUI.clear()
+        self.clearReport()
+        # Mesh arrays are shared by the checks of a run, incremental runs keep
+        # everything that was not edited since the previous one
+        sanityChecker.beginRun(nodes)
         if len(nodes) == 0:
-            self.reportOutputUI.insertPlainText("ERROR - No nodes to check\n")
+            self.showStatus("ERROR - No nodes to check")
         else:
-            for command in commands:
-                # For Each node in filterNodes, run command.
-                self.errorNodes[command], self.errorMessages[command] = getattr(sanityChecker, command)(nodes, self.SLMesh)
-                # Return error nodes
-                if self.errorNodes[command]:
-                    if command in ["triangles", "ngons", "intersections"]:
-                        self.reportOutputUI.insertPlainText("%s -- WARNING\n" % command)
-                        for obj in self.errorNodes[command]:
-                            self.reportOutputUI.insertPlainText("    ---->     %s - %s\n" % (obj, self.errorMessages[command]))
-                        self.reportOutputUI.insertPlainText("\n")
-                    
-                        self.errorNodesButton[command].setEnabled(True)
-                        self.errorNodesButton[command].clicked.connect(partial(self.selectErrorNodes, self.errorNodes[command]))
-                        self.commandLabel[command].setStyleSheet("  background-color: #FAD02C; \
-                                                                    font-size:12px; \
-                                                                    color: #000000")
-
-                    else:
-                        self.reportOutputUI.insertPlainText("%s -- FAILED\n" % command)
-                        for obj in self.errorNodes[command]:
-                            self.reportOutputUI.insertPlainText("    ---->     %s - %s\n" % (obj, self.errorMessages[command]))
-                        self.reportOutputUI.insertPlainText("\n")
-
-                        self.errorNodesButton[command].setEnabled(True)
-                        self.errorNodesButton[command].clicked.connect(
-                            partial(self.selectErrorNodes, self.errorNodes[command]))
-
-                        if self.commandFix.has_key(command):
-                            self.commandFixButton[command].setEnabled(True)
-                            self.commandFixButton[command].clicked.connect(
-                            partial(self.runFix, self.errorNodes[command], self.SLMesh, command))
-
-
-                        self.commandLabel[command].setStyleSheet("  background-color: #664444; \
-                                                                    font-size:12px")
-                else:
-                    self.commandLabel[command].setStyleSheet(
-                        "background-color: #446644; font-size:12px")
-                    self.reportOutputUI.insertPlainText("%s -- SUCCESS\n\n" % command)
-                    self.errorNodesButton[command].setEnabled(False)
-                    if self.commandFix.has_key(command):
-                        self.commandFixButton[command].setEnabled(False)
+            # Checks run a slice at a time from a timer, so Maya stays
+            # interactive and every check is reported as soon as it is done
+            self.runner = CheckRunner(sanityChecker, commands, nodes, self.SLMesh)
+            self.setRunning(True)
+            self.runTimer.start()
+
+    def runSlices(self):
+        finished = False
+        try:
+            for command, items, message in self.runner.step(self.sliceSeconds):
+                self.showResult(command, items, message)
+            self.updateProgress()
+            finished = True
+        finally:
+            if not finished or self.runner.done:
+                self.finishRun()
+
+    def updateProgress(self):
+        runner = self.runner
+        self.progressBar.setValue(int(runner.progress * 1000))
+        current = runner.pending[0] if runner.pending else ""
+        eta = runner.eta
+        if eta is None:
+            self.progressLabel.setText(current)
+        else:
+            self.progressLabel.setText("%s - %d:%02d left" % (current, int(eta) // 60, int(eta) % 60))
+
+    def cancelRun(self):
+        if self.runner is not None:
+            self.runner.cancel()
+
+    def setRunning(self, running):
+        self.checkRunButton.setEnabled(not running)
+        for name in self.commandRunButton:
+            self.commandRunButton[name].setEnabled(not running)
+        self.cancelButton.setEnabled(running)
+        self.progressBar.setValue(0)
+        self.progressLabel.setText("")
+
+    def finishRun(self):
+        self.runTimer.stop()
+        runner = self.runner
+        self.runner = None
+        self.setRunning(False)
+        if runner.cancelled:
+            self.showStatus("ERROR - Cancelled before %s" % ", ".join(runner.pending))
+        else:
+            self.progressBar.setValue(1000)
+            self.progressLabel.setText("Done in %.1fs" % runner.elapsed)
+        for cache in (sanityChecker.resultCache, sanityChecker.textureCache):
+            cacheReport = cache.report()
+            if cacheReport:
+                self.showStatus(cacheReport)
+
+    def showResult(self, command, items, message):
+        self.errorNodes[command], self.errorMessages[command] = items, message
+        # Return error nodes
+        if self.errorNodes[command]:
+            if checkRegistry.isWarning(command):
+                self.resultsModel.addCheck(command, "WARNING", items, message)
+            
+                self.errorNodesButton[command].setEnabled(True)
+                self.commandLabel[command].setStyleSheet("  background-color: #FAD02C; \
+                                                            font-size:12px; \
+                                                            color: #000000")
+
+            else:
+                self.resultsModel.addCheck(command, "FAILED", items, message)
+
+                self.errorNodesButton[command].setEnabled(True)
+
+                if self.commandFix.has_key(command):
+                    self.commandFixButton[command].setEnabled(True)
+
+
+                self.commandLabel[command].setStyleSheet("  background-color: #664444; \
+                                                            font-size:12px")
+        else:
+            self.commandLabel[command].setStyleSheet(
+                "background-color: #446644; font-size:12px")
+            self.resultsModel.addCheck(command, "SUCCESS", items, message)
+            self.errorNodesButton[command].setEnabled(False)
+            if self.commandFix.has_key(command):
+                self.commandFixButton[command].setEnabled(False)
+
+    def clearReport(self):
+        self.resultsModel.clear()
+        self.statusUI.setText("")
+
+    # Run level messages, below the results tree
+    def showStatus(self, text):
+        current = self.statusUI.text()
+        self.statusUI.setText("%s\n%s" % (current, text) if current else text)
+
+    # Selects the nodes and components of the selected result rows
+    def selectResultRow(self, index):
+        names = []
+        for row in self.reportOutputUI.selectionModel().selectedRows() or [index]:
+            names.extend(self.resultsModel.itemNames(row))
+        if names:
+            sanityChecker.selectItems(names)
 
     # Write the report to report UI.
     def sanityCheck(self):
-        self.reportOutputUI.clear()
+        self.clearReport()
         checkedCommands = []
-        for obj in self.list:
-            new = obj.split('_')
-            name = new[0]
+        for name in checkRegistry.names():
             if self.commandCheckBox[name].isChecked():
                 checkedCommands.append(name)
             else:
                 self.commandLabel[name].setStyleSheet(
                     "background-color: none;")
         if len(checkedCommands) == 0:
-            self.reportOutputUI.insertPlainText("ERROR - Nothing checked, You have to select something\n")
+            self.showStatus("ERROR - Nothing checked, You have to select something")
         else:
             self.commandToRun(checkedCommands)
 
-    def selectErrorNodes(self, list):
-        cmds.select(list)
+    def selectErrorNodes(self, command):
+        # One selection change from the index arrays, whatever the result size
+        sanityChecker.selectItems(self.errorNodes.get(command, []))
 
     # this definition needs to run the Fix
-    def runFix(self, nodes, SLMesh, command):
-        fixCommand = "%s_fix" % command
-        fixStatus = getattr(sanityChecker, fixCommand)(nodes, SLMesh)
+    def runFix(self, command):
+        fixCommand = checkRegistry.get(command).fix
+        fixStatus = getattr(sanityChecker, fixCommand)(self.errorNodes.get(command, []),
+                                                       self.SLMesh)
         if fixStatus == "fixed":
             self.commandLabel[command].setStyleSheet(
                         "background-color: #446644; font-size:12px")
-            self.reportOutputUI.clear()
-            self.reportOutputUI.insertPlainText(command + " -- SUCCESS\n\n")
+            self.resultsModel.setStatus(command, "FIXED")
             self.errorNodesButton[command].setEnabled(False)
             self.commandFixButton[command].setEnabled(False)
         else:
             self.commandLabel[command].setStyleSheet(
                         "background-color: #664444; font-size:12px")
-            self.reportOutputUI.clear()
-            self.reportOutputUI.insertPlainText(command + " -- FAILED\n\n")
+            self.resultsModel.setStatus(command, "FAILED")
             self.errorNodesButton[command].setEnabled(False)
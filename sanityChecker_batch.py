@@ -0,0 +1,268 @@
+"""
+Sanity Checker Batch
+
+Headless batch mode: runs checks from sanityChecker over many .ma/.mb files
+without Qt. The driver expands the given files and globs, splits them in
+chunks and runs every chunk in a mayapy worker process, at most --jobs at a
+time. Every worker opens its scenes one after the other, writes one JSON
+result per scene and the driver writes summary.json once all are done.
+
+    mayapy sanityChecker_batch.py "assets/**/*.mb" --jobs 32 --output results
+    mayapy sanityChecker_batch.py a.ma b.ma --checks triangles,ngons,uvRange
+
+The driver itself never imports Maya, only the workers import
+maya.standalone and sanityChecker.
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import hashlib
+import argparse
+import threading
+import subprocess
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+
+import checkRegistry
+
+# Every registered check but the ones that need a GUI session or edit the
+# scene they check
+DEFAULT_CHECKS = checkRegistry.headlessChecks()
+
+# Check statuses that do not fail a scene
+PASSING_STATUSES = ("passed", "warning")
+
+
+def expandScenes(patterns):
+    """Files matching the given paths and globs, in order and without duplicates."""
+    scenes = []
+    seen = set()
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True)) \
+                if sys.version_info[0] >= 3 else sorted(glob.glob(pattern))
+        else:
+            matches = [pattern]
+        for scene in matches:
+            scene = os.path.abspath(scene)
+            if scene.lower().endswith((".ma", ".mb")) and scene not in seen:
+                seen.add(scene)
+                scenes.append(scene)
+    return scenes
+
+
+def resultPath(outputDir, scene):
+    """JSON result of a scene, unique even for scenes sharing a file name."""
+    name = os.path.splitext(os.path.basename(scene))[0]
+    digest = hashlib.sha1(scene.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(outputDir, "%s_%s.json" % (name, digest))
+
+
+def _jsonable(value):
+    # Check results hold strings, None and the odd MObject or numpy value,
+    # component results are written as index ranges
+    if hasattr(value, "toJson"):
+        return value.toJson()
+    if isinstance(value, dict):
+        return dict((str(key), _jsonable(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return str(value)
+
+
+def _writeJson(path, data):
+    temporary = path + ".tmp"
+    with open(temporary, "w") as output:
+        json.dump(data, output, indent=1, sort_keys=True)
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(temporary, path)
+
+
+# Worker side, runs inside mayapy
+def runChecks(checker, checks, topNode="", callback=None):
+    """
+    Runs checks on the nodes of the open scene through checker, the
+    sanityChecker module or a stand-in for it, and returns their results.
+    callback(check, result) is called as soon as each check is done.
+    """
+    results = {}
+    nodes, SLMesh = checker.filterNodes(topNode)
+    if nodes is None:
+        raise RuntimeError("Top node %s doesn't exist" % topNode)
+    checker.beginRun(nodes)
+    for check in checkRegistry.plan(checks):
+        start = time.time()
+        try:
+            items, message = checker.runCheck(check, nodes, SLMesh)
+        except Exception as error:
+            results[check] = {"status": "error", "error": "%s: %s" % (type(error).__name__, error),
+                              "count": 0, "items": [], "message": ""}
+        else:
+            status = "passed" if not items else \
+                "warning" if checkRegistry.isWarning(check) else "failed"
+            results[check] = {"status": status, "count": len(items or []),
+                              "items": _jsonable(items or []), "message": _jsonable(message)}
+        results[check]["seconds"] = round(time.time() - start, 3)
+        if callback:
+            callback(check, results[check])
+    return results
+
+
+def checkScene(scene, checks, topNode="", cmds=None, checker=None, callback=None):
+    """Opens scene and returns its JSON result."""
+    start = time.time()
+    result = {"scene": scene, "checks": {}, "error": None}
+    try:
+        cmds.file(scene, open=True, force=True, prompt=False)
+        result["checks"] = runChecks(checker, checks, topNode, callback)
+    except Exception as error:
+        result["error"] = "%s: %s" % (type(error).__name__, error)
+    result["seconds"] = round(time.time() - start, 3)
+    return result
+
+
+def worker(scenes, checks, outputDir, topNode=""):
+    import maya.standalone
+    maya.standalone.initialize(name="python")
+    import maya.cmds as cmds
+    import sanityChecker
+
+    for scene in scenes:
+        result = checkScene(scene, checks, topNode, cmds, sanityChecker)
+        _writeJson(resultPath(outputDir, scene), result)
+        cmds.file(new=True, force=True)
+
+
+# Driver side, plain Python
+def _runWorker(command, timeout):
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    timer = None
+    if timeout:
+        timer = threading.Timer(timeout, process.kill)
+        timer.start()
+    try:
+        output = process.communicate()[0]
+    finally:
+        if timer:
+            timer.cancel()
+    return process.returncode, output.decode("utf-8", "replace")
+
+
+def summarize(scenes, outputDir, workerLogs):
+    """Reads back every scene result and builds the summary."""
+    summary = {"files": len(scenes), "passed": 0, "failed": 0, "errors": 0,
+               "checks": {}, "scenes": []}
+    for scene in scenes:
+        path = resultPath(outputDir, scene)
+        entry = {"scene": scene, "result": path, "failedChecks": [], "warningChecks": [],
+                 "error": None}
+        try:
+            with open(path) as resultFile:
+                result = json.load(resultFile)
+        except (IOError, OSError, ValueError):
+            result = None
+            entry["error"] = "No result written, worker output:\n%s" % \
+                workerLogs.get(scene, "")[-2000:]
+        if result is not None:
+            entry["error"] = result.get("error")
+            for check, checkResult in sorted(result["checks"].items()):
+                if checkResult["status"] == "warning":
+                    entry["warningChecks"].append(check)
+                elif checkResult["status"] not in PASSING_STATUSES:
+                    entry["failedChecks"].append(check)
+                    summary["checks"][check] = summary["checks"].get(check, 0) + 1
+        if entry["error"]:
+            entry["status"] = "error"
+            summary["errors"] += 1
+        elif entry["failedChecks"]:
+            entry["status"] = "failed"
+            summary["failed"] += 1
+        else:
+            entry["status"] = "passed"
+            summary["passed"] += 1
+        summary["scenes"].append(entry)
+    return summary
+
+
+def runBatch(scenes, checks, outputDir, jobs=None, mayapy="mayapy", topNode="",
+             chunkSize=8, timeout=None):
+    """Checks scenes with a pool of mayapy workers and writes summary.json."""
+    start = time.time()
+    if not os.path.isdir(outputDir):
+        os.makedirs(outputDir)
+    jobs = jobs or cpu_count()
+    # Small enough chunks to keep every worker busy until the end
+    chunkSize = max(1, min(chunkSize, -(-len(scenes) // jobs)))
+    chunks = [scenes[i:i + chunkSize] for i in range(0, len(scenes), chunkSize)]
+    workerLogs = {}
+
+    def runChunk(chunk):
+        command = [mayapy, os.path.abspath(__file__), "--worker",
+                   "--checks", ",".join(checks), "--output", outputDir,
+                   "--top-node", topNode] + chunk
+        returnCode, output = _runWorker(command, timeout and timeout * len(chunk))
+        for scene in chunk:
+            workerLogs[scene] = "exit code %s\n%s" % (returnCode, output)
+        return returnCode
+
+    pool = ThreadPool(jobs)
+    try:
+        pool.map(runChunk, chunks, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    summary = summarize(scenes, outputDir, workerLogs)
+    summary["checkNames"] = checks
+    summary["seconds"] = round(time.time() - start, 3)
+    _writeJson(os.path.join(outputDir, "summary.json"), summary)
+    return summary
+
+
+def parseArgs(argv=None):
+    parser = argparse.ArgumentParser(description="Run sanity checks over Maya scenes")
+    parser.add_argument("scenes", nargs="+", help=".ma/.mb files or globs")
+    parser.add_argument("--checks", default=",".join(DEFAULT_CHECKS),
+                        help="comma separated check names")
+    parser.add_argument("--output", default="sanityChecker_results",
+                        help="directory of the JSON results")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="concurrent mayapy workers, cpu count by default")
+    parser.add_argument("--mayapy", default=os.environ.get("MAYAPY", "mayapy"),
+                        help="interpreter of the workers")
+    parser.add_argument("--top-node", default="", dest="topNode",
+                        help="only check below this node")
+    parser.add_argument("--chunk-size", type=int, default=8, dest="chunkSize",
+                        help="scenes opened by one worker process")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="seconds allowed per scene")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parseArgs(argv)
+    checks = [check for check in args.checks.split(",") if check]
+    if args.worker:
+        worker(args.scenes, checks, args.output, args.topNode)
+        return 0
+    scenes = expandScenes(args.scenes)
+    if not scenes:
+        sys.stderr.write("No .ma/.mb files found\n")
+        return 2
+    summary = runBatch(scenes, checks, args.output, args.jobs, args.mayapy,
+                       args.topNode, args.chunkSize, args.timeout)
+    sys.stdout.write("%d files: %d passed, %d failed, %d errors in %.1fs\n" % (
+        summary["files"], summary["passed"], summary["failed"], summary["errors"],
+        summary["seconds"]))
+    return 1 if summary["failed"] or summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,477 @@
+"""
+Sanity Checker Daemon
+
+Long lived check server keeping N warm mayapy workers with sanityChecker
+already imported, so a job only pays for opening its scene and checking it.
+Clients submit jobs (scene path and check names) over a local socket or
+named pipe and receive every check result as soon as it is done, followed by
+the whole scene result. Workers get a fresh scene before every job and are
+replaced after --max-jobs jobs to bound memory growth, or as soon as a job
+runs longer than --job-timeout seconds, which then fails.
+
+    python sanityChecker_daemon.py --serve --workers 8
+    python sanityChecker_daemon.py --submit a.mb b.mb --checks triangles,uvRange
+    python sanityChecker_daemon.py --stats
+
+Workers talk JSON lines over their stdin and stdout, which is the only place
+Maya is imported.
+
+Connections are authenticated with a random key the first --serve writes to
+~/.sanityChecker/daemon.key (SANITY_CHECKER_KEY_FILE), readable by its owner
+only; clients read it from there. SANITY_CHECKER_AUTHKEY overrides it.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import binascii
+import threading
+import subprocess
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
+
+from sanityChecker_batch import DEFAULT_CHECKS, PASSING_STATUSES, checkScene
+
+DEFAULT_ADDRESS = "localhost:47200"
+
+# Connections unpickle what they receive, so the key is a secret: a random one
+# written on the first --serve to a file only its owner can read, unless
+# SANITY_CHECKER_AUTHKEY gives one
+KEY_FILE = os.environ.get("SANITY_CHECKER_KEY_FILE", os.path.join(
+    os.path.expanduser("~"), ".sanityChecker", "daemon.key"))
+
+
+def loadAuthkey(create=False, path=None):
+    """
+    Key of the daemon. With create a new random key is written to path when
+    there is none yet, otherwise a missing key file is an error.
+    """
+    if os.environ.get("SANITY_CHECKER_AUTHKEY"):
+        return os.environ["SANITY_CHECKER_AUTHKEY"].encode("utf-8")
+    path = path or KEY_FILE
+    if create and not os.path.exists(path):
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        try:
+            descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except OSError:
+            # Another daemon wrote it first
+            pass
+        else:
+            with os.fdopen(descriptor, "w") as keyFile:
+                keyFile.write(binascii.hexlify(os.urandom(32)).decode("ascii"))
+    try:
+        with open(path) as keyFile:
+            key = keyFile.read().strip()
+    except (IOError, OSError):
+        raise RuntimeError("No daemon key in %s, start the daemon with --serve first "
+                           "or set SANITY_CHECKER_AUTHKEY" % path)
+    if not key:
+        raise RuntimeError("Daemon key file %s is empty" % path)
+    return key.encode("utf-8")
+
+
+def parseAddress(address):
+    """host:port for a TCP socket, anything else is a unix socket or pipe name."""
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit():
+        return (host, int(port))
+    return address
+
+
+# Worker side, runs inside mayapy
+def worker():
+    # Maya writes to stdout as well, keep the real one for the protocol only
+    protocol = os.fdopen(os.dup(1), "w")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    def send(message):
+        protocol.write(json.dumps(message) + "\n")
+        protocol.flush()
+
+    import maya.standalone
+    maya.standalone.initialize(name="python")
+    import maya.cmds as cmds
+    import sanityChecker
+    send({"type": "ready", "pid": os.getpid()})
+
+    for line in iter(sys.stdin.readline, ""):
+        job = json.loads(line)
+
+        def streamResult(check, result):
+            send({"type": "result", "id": job["id"], "check": check, "result": result})
+
+        cmds.file(new=True, force=True)
+        result = checkScene(job["scene"], job["checks"], job.get("topNode", ""),
+                            cmds, sanityChecker, streamResult)
+        send({"type": "done", "id": job["id"], "result": result})
+
+
+# Daemon side, plain Python
+class Job(object):
+
+    def __init__(self, jobId, scene, checks, topNode, reply):
+        self.id = jobId
+        self.scene = scene
+        self.checks = checks
+        self.topNode = topNode
+        self.reply = reply
+        self.submitted = time.time()
+
+    def request(self):
+        return {"id": self.id, "scene": self.scene, "checks": self.checks,
+                "topNode": self.topNode}
+
+
+class WorkerProcess(object):
+    """One mayapy worker and its counters."""
+
+    def __init__(self, mayapy):
+        self.process = subprocess.Popen(
+            [mayapy, os.path.abspath(__file__), "--worker"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, universal_newlines=True)
+        self.started = time.time()
+        self.jobs = 0
+        ready = self.receive()
+        if not ready or ready.get("type") != "ready":
+            self.stop()
+            raise RuntimeError("Worker failed to start")
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def send(self, message):
+        self.process.stdin.write(json.dumps(message) + "\n")
+        self.process.stdin.flush()
+
+    def receive(self):
+        line = self.process.stdout.readline()
+        return json.loads(line) if line else None
+
+    def kill(self):
+        self.process.kill()
+
+    def stop(self):
+        try:
+            self.process.stdin.close()
+            self.process.wait()
+        except (IOError, OSError):
+            self.process.kill()
+
+
+class CheckDaemon(object):
+    """
+    Accepts jobs on address and runs them on a number of warm mayapy processes,
+    each replaced after maxJobsPerWorker jobs. A worker still busy with a job
+    after jobTimeout seconds is killed and replaced, and the job fails.
+    """
+
+    def __init__(self, address, workers=4, mayapy="mayapy", maxJobsPerWorker=50,
+                 authkey=None, jobTimeout=None):
+        self.address = address
+        self.workers = workers
+        self.mayapy = mayapy
+        self.maxJobsPerWorker = maxJobsPerWorker
+        self.jobTimeout = jobTimeout
+        self.authkey = authkey or loadAuthkey(create=True)
+        self.queue = Queue()
+        self.started = time.time()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.recycled = 0
+        self.timedOut = 0
+        self.workerStats = {}
+        self._lock = threading.Lock()
+        self._closing = False
+        self._threads = []
+        self._listener = None
+
+    def serve(self):
+        for slot in range(self.workers):
+            thread = threading.Thread(target=self._runWorker, args=(slot,))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        self._listener = Listener(self.address, authkey=self.authkey)
+        while not self._closing:
+            try:
+                connection = self._listener.accept()
+            except (IOError, OSError, EOFError, AuthenticationError):
+                if self._closing:
+                    break
+                continue
+            thread = threading.Thread(target=self._handleClient, args=(connection,))
+            thread.daemon = True
+            thread.start()
+        for thread in self._threads:
+            thread.join()
+
+    def shutdown(self):
+        self._closing = True
+        for slot in range(self.workers):
+            self.queue.put(None)
+        try:
+            # Unblocks accept
+            Client(self.address, authkey=self.authkey).close()
+        except (IOError, OSError, EOFError):
+            pass
+        self._listener.close()
+
+    def stats(self):
+        with self._lock:
+            return {"type": "stats",
+                    "queueDepth": self.queue.qsize(),
+                    "submitted": self.submitted,
+                    "completed": self.completed,
+                    "failed": self.failed,
+                    "recycled": self.recycled,
+                    "timedOut": self.timedOut,
+                    "uptime": round(time.time() - self.started, 1),
+                    "workers": dict((str(slot), dict(stats))
+                                    for slot, stats in self.workerStats.items())}
+
+    def _handleClient(self, connection):
+        sendLock = threading.Lock()
+
+        def reply(message):
+            with sendLock:
+                try:
+                    connection.send(message)
+                except (IOError, OSError, EOFError):
+                    # The client went away, its jobs still run
+                    pass
+
+        try:
+            while True:
+                request = connection.recv()
+                kind = request.get("type")
+                if kind == "submit" and not os.path.isabs(request.get("scene") or ""):
+                    # The daemon's working directory means nothing to the client
+                    reply({"type": "error", "scene": request.get("scene"),
+                           "error": "Scene path %r is not absolute" % request.get("scene")})
+                elif kind == "submit":
+                    with self._lock:
+                        self.submitted += 1
+                        jobId = self.submitted
+                    self.queue.put(Job(jobId, os.path.normpath(request["scene"]),
+                                       request.get("checks") or DEFAULT_CHECKS,
+                                       request.get("topNode", ""), reply))
+                    reply({"type": "queued", "id": jobId, "queueDepth": self.queue.qsize()})
+                elif kind == "stats":
+                    reply(self.stats())
+                elif kind == "shutdown":
+                    reply({"type": "shutdown"})
+                    self.shutdown()
+                    break
+                else:
+                    reply({"type": "error", "error": "Unknown request %r" % kind})
+        except (IOError, OSError, EOFError):
+            pass
+
+    def _startWorker(self, stats):
+        # A new worker for a slot, None when it failed to start
+        try:
+            process = WorkerProcess(self.mayapy)
+        except (RuntimeError, OSError):
+            process = None
+        with self._lock:
+            stats["pid"] = process.pid if process else None
+        return process
+
+    def _runWorker(self, slot):
+        process = None
+        stats = {"pid": None, "jobs": 0, "jobsPerMinute": 0.0, "busySeconds": 0.0,
+                 "processJobs": 0}
+        with self._lock:
+            self.workerStats[slot] = stats
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            if process is None or not process.alive():
+                try:
+                    process = WorkerProcess(self.mayapy)
+                except (RuntimeError, OSError) as error:
+                    process = None
+                    with self._lock:
+                        stats["pid"] = None
+                    self._finish(job, {"scene": job.scene, "checks": {},
+                                       "error": "Worker failed to start: %s" % error})
+                    continue
+                with self._lock:
+                    stats["pid"] = process.pid
+
+            start = time.time()
+            result = None
+            timedOut = threading.Event()
+            timer = None
+            if self.jobTimeout:
+                def kill(process=process):
+                    timedOut.set()
+                    process.kill()
+                timer = threading.Timer(self.jobTimeout, kill)
+                timer.daemon = True
+                timer.start()
+            try:
+                process.send(job.request())
+                while True:
+                    message = process.receive()
+                    if message is None:
+                        break
+                    if message["type"] == "result":
+                        job.reply(message)
+                    elif message["type"] == "done":
+                        result = message["result"]
+                        break
+            except (IOError, OSError, ValueError):
+                pass
+            finally:
+                if timer:
+                    timer.cancel()
+            if result is None:
+                if timedOut.is_set():
+                    error = "Timed out after %gs" % self.jobTimeout
+                    with self._lock:
+                        self.timedOut += 1
+                else:
+                    error = "Worker crashed"
+                result = {"scene": job.scene, "checks": {}, "error": error}
+                # Replaced right away so the next job still finds a warm worker
+                process.stop()
+                process = self._startWorker(stats)
+            else:
+                process.jobs += 1
+
+            with self._lock:
+                stats["jobs"] += 1
+                stats["busySeconds"] = round(stats["busySeconds"] + time.time() - start, 3)
+                stats["jobsPerMinute"] = round(60.0 * stats["jobs"] / (time.time() - self.started), 2)
+                stats["processJobs"] = process.jobs if process else 0
+            self._finish(job, result)
+            if process and process.jobs >= self.maxJobsPerWorker:
+                # Recycle now so the next job still finds a warm worker
+                process.stop()
+                with self._lock:
+                    self.recycled += 1
+                process = self._startWorker(stats)
+        if process:
+            process.stop()
+
+    def _finish(self, job, result):
+        with self._lock:
+            self.completed += 1
+            failed = result.get("error") or any(
+                check["status"] not in PASSING_STATUSES
+                for check in result["checks"].values())
+            if failed:
+                self.failed += 1
+        job.reply({"type": "done", "id": job.id, "result": result,
+                   "seconds": round(time.time() - job.submitted, 3)})
+
+
+# Client side
+def submit(scenes, checks=None, topNode="", address=DEFAULT_ADDRESS, authkey=None):
+    """
+    Submits scenes, relative to the current directory, and yields every
+    message the daemon streams back.
+    """
+    connection = Client(parseAddress(address), authkey=authkey or loadAuthkey())
+    try:
+        for scene in scenes:
+            connection.send({"type": "submit", "scene": os.path.abspath(scene),
+                             "checks": checks, "topNode": topNode})
+        # A fast job can stream results before the later jobs are even queued
+        queued = set()
+        done = set()
+        rejected = 0
+        while len(queued) + rejected < len(scenes) or queued - done:
+            message = connection.recv()
+            if message["type"] == "queued":
+                queued.add(message["id"])
+                continue
+            if message["type"] == "error":
+                rejected += 1
+            if message["type"] == "done":
+                done.add(message["id"])
+            yield message
+    finally:
+        connection.close()
+
+
+def request(kind, address=DEFAULT_ADDRESS, authkey=None):
+    connection = Client(parseAddress(address), authkey=authkey or loadAuthkey())
+    try:
+        connection.send({"type": kind})
+        return connection.recv()
+    finally:
+        connection.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm mayapy check daemon")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--serve", action="store_true", help="run the daemon")
+    mode.add_argument("--submit", nargs="+", metavar="SCENE", help="submit scenes")
+    mode.add_argument("--stats", action="store_true", help="print daemon stats")
+    mode.add_argument("--shutdown", action="store_true", help="stop the daemon")
+    mode.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--address", default=os.environ.get("SANITY_CHECKER_ADDRESS", DEFAULT_ADDRESS),
+                        help="host:port, unix socket path or named pipe")
+    parser.add_argument("--workers", type=int, default=4, help="warm mayapy workers")
+    parser.add_argument("--max-jobs", type=int, default=50, dest="maxJobs",
+                        help="jobs before a worker is replaced")
+    parser.add_argument("--job-timeout", type=float, default=None, dest="jobTimeout",
+                        help="seconds a job may run before its worker is killed")
+    parser.add_argument("--mayapy", default=os.environ.get("MAYAPY", "mayapy"),
+                        help="interpreter of the workers")
+    parser.add_argument("--checks", default="", help="comma separated check names")
+    parser.add_argument("--top-node", default="", dest="topNode",
+                        help="only check below this node")
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        worker()
+    elif args.serve:
+        CheckDaemon(parseAddress(args.address), args.workers, args.mayapy, args.maxJobs,
+                    jobTimeout=args.jobTimeout).serve()
+    elif args.submit:
+        checks = [check for check in args.checks.split(",") if check] or None
+        failed = False
+        for message in submit(args.submit, checks, args.topNode, args.address):
+            if message["type"] == "error":
+                failed = True
+                sys.stdout.write("%s: %s\n" % (message.get("scene"), message["error"]))
+            elif message["type"] == "result":
+                sys.stdout.write("%s %s: %s\n" % (message["id"], message["check"],
+                                                  message["result"]["status"]))
+            elif message["type"] == "done":
+                result = message["result"]
+                failed = failed or bool(result["error"]) or any(
+                    check["status"] not in PASSING_STATUSES
+                    for check in result["checks"].values())
+                sys.stdout.write("%s %s done in %ss%s\n" % (
+                    message["id"], result["scene"], message["seconds"],
+                    " - %s" % result["error"] if result["error"] else ""))
+        return 1 if failed else 0
+    else:
+        sys.stdout.write(json.dumps(request("stats" if args.stats else "shutdown", args.address),
+                                    indent=1, sort_keys=True) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Scene Snapshot
+
+Columnar view of the transforms a run checks, built with a handful of batched
+commands instead of a listRelatives / objectType round-trip per object and
+per check. Every list is parallel to names, the node strings the checks were
+given and report back.
+
+The Maya queries come from a backend, MayaBackend by default, so a snapshot can
+be built outside Maya from any object providing ls, listRelatives and
+transforms.
+"""
+
+IDENTITY_MATRIX = [1.0, 0.0, 0.0, 0.0,
+                   0.0, 1.0, 0.0, 0.0,
+                   0.0, 0.0, 1.0, 0.0,
+                   0.0, 0.0, 0.0, 1.0]
+
+CHANNELS = ["tx", "ty", "tz", "rx", "ry", "rz", "sx", "sy", "sz", "v"]
+
+
+def _parentPath(path):
+    return path.rpartition("|")[0]
+
+def _shortName(path):
+    return path.rpartition("|")[2]
+
+
+class MayaBackend(object):
+    """
+    maya.cmds for the listings. transforms reads the world matrix, world rotate
+    pivot, scale and channel locks of every path in one pass over a single
+    MSelectionList: maya.cmds has no multi-object query for these, xform and
+    getAttr only answer for their first node.
+    """
+
+    def __init__(self):
+        import maya.cmds as cmds
+        import maya.api.OpenMaya as om
+        self.om = om
+        self.ls = cmds.ls
+        self.listRelatives = cmds.listRelatives
+
+    def transforms(self, paths):
+        """(world matrix, world rotate pivot, scale, locked channels) per path,
+        None for paths that are not transforms."""
+        om = self.om
+        selection = om.MSelectionList()
+        rows = []
+        for path in paths:
+            try:
+                selection.add(path)
+                dagPath = selection.getDagPath(selection.length() - 1)
+                transform = om.MFnTransform(dagPath)
+            except RuntimeError:
+                rows.append(None)
+                continue
+            pivot = transform.rotatePivot(om.MSpace.kWorld)
+            rows.append((list(dagPath.inclusiveMatrix()),
+                         [pivot.x, pivot.y, pivot.z],
+                         list(transform.scale()),
+                         [channel for channel in CHANNELS
+                          if transform.findPlug(channel, False).isLocked]))
+        return rows
+
+
+class SceneSnapshot(object):
+    """
+    names           node strings as given to the checks
+    paths           full DAG paths
+    nodeTypes       node type of every transform
+    parents         index of the parent in the snapshot, -1 when not in it
+    parentNames     short name of the parent, None for world children
+    shapes          full paths of the shapes below every transform
+    shapeTypes      node types, parallel to shapes
+    intermediates   intermediate object flags, parallel to shapes
+
+    The transform columns, worldMatrices, rotatePivots, scales and
+    lockedChannels, are queried together on first use.
+    """
+
+    def __init__(self, names, paths, nodeTypes, shapes, shapeTypes,
+                 intermediates, backend=None):
+        self.names = names
+        self.paths = paths
+        self.nodeTypes = nodeTypes
+        self.shapes = shapes
+        self.shapeTypes = shapeTypes
+        self.intermediates = intermediates
+        self.backend = backend
+
+        index = dict((path, i) for i, path in enumerate(paths))
+        self.parents = [index.get(_parentPath(path), -1) for path in paths]
+        self.parentNames = [_shortName(_parentPath(path)) or None for path in paths]
+        self._transforms = None
+        self._columns = None
+        self._nameIndex = None
+
+    @classmethod
+    def build(cls, nodes, backend=None):
+        if backend is None:
+            backend = MayaBackend()
+        names = [node for node in nodes]
+        if not names:
+            return cls([], [], [], [], [], [], backend)
+
+        # Full paths and types of the transforms, matched back to the names
+        typed = backend.ls(names, long=True, showType=True) or []
+        longTypes = dict(zip(typed[0::2], typed[1::2]))
+        bySuffix = {}
+        for path in longTypes:
+            parts = path.split("|")
+            for i in range(1, len(parts)):
+                bySuffix.setdefault("|".join(parts[i:]), path)
+        paths = [name if name in longTypes else bySuffix.get(name.lstrip("|"), name)
+                 for name in names]
+        nodeTypes = [longTypes.get(path) for path in paths]
+
+        # Every shape below every transform in one query, grouped by parent
+        allShapes = backend.listRelatives(paths, shapes=True, fullPath=True) or []
+        typed = backend.ls(allShapes, long=True, showType=True) or []
+        shapeTypes = dict(zip(typed[0::2], typed[1::2]))
+        intermediate = set(backend.ls(allShapes, long=True, intermediateObjects=True) or [])
+        grouped = {}
+        for shape in allShapes:
+            grouped.setdefault(_parentPath(shape), []).append(shape)
+
+        shapes = [grouped.get(path, []) for path in paths]
+        return cls(names, paths, nodeTypes, shapes,
+                   [[shapeTypes.get(shape) for shape in nodeShapes] for nodeShapes in shapes],
+                   [[shape in intermediate for shape in nodeShapes] for nodeShapes in shapes],
+                   backend)
+
+    def __len__(self):
+        return len(self.names)
+
+    def covers(self, nodes):
+        """Whether this snapshot was built for exactly these nodes."""
+        return self.names == [node for node in nodes]
+
+    def indices(self, nodes):
+        """Index of every node, None when one of them is not in the snapshot."""
+        if self._nameIndex is None:
+            self._nameIndex = dict((name, i) for i, name in enumerate(self.names))
+        indices = [self._nameIndex.get(node) for node in nodes]
+        return None if None in indices else indices
+
+    def subset(self, indices):
+        """Snapshot of some of the nodes, without querying Maya again."""
+        pick = lambda column: [column[i] for i in indices]
+        subset = SceneSnapshot(pick(self.names), pick(self.paths), pick(self.nodeTypes),
+                               pick(self.shapes), pick(self.shapeTypes),
+                               pick(self.intermediates), self.backend)
+        if self._transforms is not None:
+            subset._transforms = pick(self._transforms)
+        return subset
+
+    def isMesh(self, i):
+        """Whether the first shape of node i is a mesh, like the checks test it."""
+        return bool(self.shapeTypes[i]) and self.shapeTypes[i][0] == "mesh"
+
+    def meshIndices(self):
+        return [i for i in range(len(self.names)) if self.isMesh(i)]
+
+    def hasMeshShape(self, i):
+        return "mesh" in self.shapeTypes[i]
+
+    def shapeNames(self, i):
+        """Short names of the shapes of node i."""
+        return [_shortName(shape) for shape in self.shapes[i]]
+
+    def _column(self, field):
+        if self._transforms is None:
+            self._transforms = self.backend.transforms(self.paths)
+        if self._columns is None:
+            self._columns = [[row and row[i] for row in self._transforms] for i in range(4)]
+        return self._columns[field]
+
+    @property
+    def worldMatrices(self):
+        """World matrix of every transform as 16 floats."""
+        return self._column(0)
+
+    @property
+    def rotatePivots(self):
+        """World space rotate pivot of every transform."""
+        return self._column(1)
+
+    @property
+    def scales(self):
+        """Local scale of every transform."""
+        return self._column(2)
+
+    @property
+    def lockedChannels(self):
+        """Locked channels of every transform, in CHANNELS order."""
+        return self._column(3)
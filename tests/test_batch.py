@@ -0,0 +1,158 @@
+import json
+import os
+
+import sanityChecker_batch as batch
+
+
+class FakeCmds(object):
+    """maya.cmds.file over a set of scenes that exist."""
+
+    def __init__(self, scenes):
+        self.scenes = scenes
+        self.current = None
+
+    def file(self, scene=None, open=False, new=False, force=False, prompt=True):
+        if new:
+            self.current = None
+        elif scene not in self.scenes:
+            raise RuntimeError("File not found: %s" % scene)
+        else:
+            self.current = scene
+
+
+class FakeChecker(object):
+    """The sanityChecker calls of the batch, results looked up per scene and check."""
+
+    def __init__(self, cmds, results):
+        # {scene: {check: (items, message) or an exception to raise}}
+        self.cmds = cmds
+        self.results = results
+        self.runs = []
+
+    def filterNodes(self, topNode=""):
+        if topNode and topNode != "|root":
+            return None, None
+        return ["|root|body", "|root|cup"], ["|root|body|bodyShape"]
+
+    def beginRun(self, nodes):
+        self.runs.append([])
+
+    def runCheck(self, check, nodes, SLMesh):
+        self.runs[-1].append(check)
+        result = self.results.get(self.cmds.current, {}).get(check, ([], ""))
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+SCENES = {
+    "/assets/clean.ma": {},
+    "/assets/broken.mb": {
+        "openEdges": (["|root|body.e[0:3]"], "has open edges"),
+        "triangles": (["|root|cup.f[2]"], "has triangles"),
+    },
+    "/assets/warning.ma": {
+        "ngons": (["|root|cup.f[7]"], "has ngons"),
+    },
+    "/assets/crashing.ma": {
+        "openEdges": ValueError("bad mesh"),
+    },
+}
+CHECKS = ["openEdges", "ngons", "triangles", "history"]
+
+
+def _checker():
+    cmds = FakeCmds(SCENES)
+    return cmds, FakeChecker(cmds, SCENES)
+
+
+def test_run_checks():
+    cmds, checker = _checker()
+    cmds.file("/assets/broken.mb", open=True)
+    finished = []
+    results = batch.runChecks(checker, CHECKS, callback=lambda check, result: finished.append(check))
+    assert sorted(results) == sorted(CHECKS)
+    assert finished == checker.runs[0]
+    assert results["openEdges"]["status"] == "failed"
+    assert results["openEdges"]["count"] == 1
+    assert results["openEdges"]["items"] == ["|root|body.e[0:3]"]
+    assert results["openEdges"]["message"] == "has open edges"
+    # Warning checks do not fail
+    assert results["triangles"]["status"] == "warning"
+    assert results["history"]["status"] == "passed"
+
+
+def test_run_checks_reports_exceptions():
+    cmds, checker = _checker()
+    cmds.file("/assets/crashing.ma", open=True)
+    results = batch.runChecks(checker, CHECKS)
+    assert results["openEdges"]["status"] == "error"
+    assert results["openEdges"]["error"] == "ValueError: bad mesh"
+    # The other checks still ran
+    assert sorted(checker.runs[0]) == sorted(CHECKS)
+    assert results["history"]["status"] == "passed"
+
+
+def test_check_scene_errors():
+    cmds, checker = _checker()
+    result = batch.checkScene("/assets/missing.ma", CHECKS, cmds=cmds, checker=checker)
+    assert result["error"] == "RuntimeError: File not found: /assets/missing.ma"
+    assert result["checks"] == {}
+    result = batch.checkScene("/assets/clean.ma", CHECKS, "|other", cmds=cmds, checker=checker)
+    assert result["error"] == "RuntimeError: Top node |other doesn't exist"
+
+
+def _runInProcess(command, timeout):
+    # Runs a worker chunk here, against the fake checker, instead of in mayapy
+    args = batch.parseArgs(command[2:])
+    cmds, checker = _checker()
+    for scene in args.scenes:
+        result = batch.checkScene(scene, args.checks.split(","), args.topNode, cmds, checker)
+        batch._writeJson(batch.resultPath(args.output, scene), result)
+    return 0, "ran %d scenes" % len(args.scenes)
+
+
+def test_summary_and_exit_code(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "_runWorker", _runInProcess)
+    output = str(tmp_path / "results")
+    scenes = sorted(SCENES) + ["/assets/missing.ma"]
+    summary = batch.runBatch(scenes, CHECKS, output, jobs=2, chunkSize=2)
+
+    with open(os.path.join(output, "summary.json")) as summaryFile:
+        assert json.load(summaryFile)["files"] == 5
+    assert (summary["files"], summary["passed"], summary["failed"], summary["errors"]) == \
+        (5, 2, 2, 1)
+    statuses = dict((entry["scene"], entry["status"]) for entry in summary["scenes"])
+    assert statuses == {"/assets/broken.mb": "failed", "/assets/clean.ma": "passed",
+                        "/assets/crashing.ma": "failed", "/assets/missing.ma": "error",
+                        "/assets/warning.ma": "passed"}
+    entries = dict((entry["scene"], entry) for entry in summary["scenes"])
+    assert entries["/assets/broken.mb"]["failedChecks"] == ["openEdges"]
+    assert entries["/assets/broken.mb"]["warningChecks"] == ["triangles"]
+    assert entries["/assets/warning.ma"]["warningChecks"] == ["ngons"]
+    assert summary["checks"] == {"openEdges": 2}
+
+
+def test_summary_without_result(tmp_path):
+    summary = batch.summarize(["/assets/lost.ma"], str(tmp_path), {"/assets/lost.ma": "exit code -9\n"})
+    assert summary["errors"] == 1
+    assert summary["scenes"][0]["status"] == "error"
+    assert "exit code -9" in summary["scenes"][0]["error"]
+
+
+def test_main_exit_code(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "_runWorker", _runInProcess)
+    clean = tmp_path / "clean.ma"
+    clean.write_text(u"")
+    broken = tmp_path / "broken.mb"
+    broken.write_text(u"")
+    SCENES[str(clean)] = {}
+    SCENES[str(broken)] = SCENES["/assets/broken.mb"]
+    try:
+        output = str(tmp_path / "results")
+        assert batch.main([str(clean), "--checks", ",".join(CHECKS), "--output", output]) == 0
+        assert batch.main([str(tmp_path / "*.m[ab]"), "--checks", ",".join(CHECKS),
+                           "--output", output]) == 1
+        assert batch.main([str(tmp_path / "*.obj"), "--output", output]) == 2
+    finally:
+        del SCENES[str(clean)], SCENES[str(broken)]
@@ -0,0 +1,66 @@
+import pytest
+
+from componentResult import ComponentResult, indexRanges
+
+
+def test_index_ranges():
+    starts, ends = indexRanges([1, 2, 3, 7, 9, 10])
+    assert starts.tolist() == [1, 7, 9]
+    assert ends.tolist() == [3, 7, 10]
+    starts, ends = indexRanges([1, 2, 3, 4, 5], keys=[0, 0, 1, 1, 0])
+    assert starts.tolist() == [1, 3, 5]
+    assert ends.tolist() == [2, 4, 5]
+
+
+# Consecutive flagged faces with a message per face, like crossBorder and
+# findIntersections return them
+FACES = [10, 11, 12, 13, 14, 15, 20]
+MESSAGES = {"mesh": {"f": {10: "UV's crossing Borders (1001, 1002)",
+                           11: "UV's crossing Borders (1001, 1002)",
+                           12: "UV's crossing Borders (1001, 1002)",
+                           13: "UV's crossing Borders (1002, 1003)",
+                           14: "UV's crossing Borders (1002, 1003)",
+                           15: "UV's crossing Borders (1001, 1002)",
+                           20: "UV's crossing Borders (1001, 1002)"}}}
+
+
+def _result():
+    result = ComponentResult()
+    result.add("mesh", "f", FACES)
+    return result
+
+
+def test_range_messages_split_where_the_message_changes():
+    result = _result()
+    assert result.rangeNames("mesh") == ["f[10:15]", "f[20]"]
+    assert result.rangeMessages("mesh", MESSAGES["mesh"]) == [
+        ("f[10:12]", "UV's crossing Borders (1001, 1002)"),
+        ("f[13:14]", "UV's crossing Borders (1002, 1003)"),
+        ("f[15]", "UV's crossing Borders (1001, 1002)"),
+        ("f[20]", "UV's crossing Borders (1001, 1002)")]
+
+
+def test_range_messages_without_messages():
+    result = _result()
+    result.add("mesh", "e", [3, 4])
+    assert result.rangeMessages("mesh", {"f": {11: "intersects other"}}) == [
+        ("f[10]", ""), ("f[11]", "intersects other"), ("f[12:15]", ""), ("f[20]", ""),
+        ("e[3:4]", "")]
+
+
+def test_results_model_rows():
+    pytest.importorskip("PySide2")
+    from resultsModel import ResultsModel
+
+    model = ResultsModel()
+    model.addCheck("crossBorder", "FAILED", _result(), MESSAGES)
+    check = model.index(0, 0)
+    model.fetchMore(check)
+    node = model.index(0, 0, check)
+    assert model.data(node) == "mesh"
+    assert model.data(model.index(0, 2, check)) == ""
+    model.fetchMore(node)
+    rows = [(model.data(model.index(row, 0, node)), model.data(model.index(row, 2, node)))
+            for row in range(model.rowCount(node))]
+    assert rows == _result().rangeMessages("mesh", MESSAGES["mesh"])
+    assert model.itemNames(model.index(1, 0, node)) == ["mesh.f[13:14]"]
@@ -0,0 +1,130 @@
+import os
+import sys
+import stat
+import threading
+
+import pytest
+
+import sanityChecker_daemon as daemon
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="the stub worker runs through a shebang")
+
+# Stands in for mayapy: speaks the worker protocol without Maya, scenes named
+# hang or crash misbehave
+STUB_WORKER = '''#!%s
+import json
+import os
+import sys
+import time
+
+def send(message):
+    sys.stdout.write(json.dumps(message) + "\\n")
+    sys.stdout.flush()
+
+send({"type": "ready", "pid": os.getpid()})
+for line in iter(sys.stdin.readline, ""):
+    job = json.loads(line)
+    name = os.path.basename(job["scene"])
+    if name == "hang.ma":
+        time.sleep(60)
+    if name == "crash.ma":
+        sys.exit(3)
+    checks = {}
+    for check in job["checks"]:
+        status = "failed" if name == "broken.ma" and check == "openEdges" else "passed"
+        checks[check] = {"status": status, "count": int(status == "failed"), "items": [],
+                         "message": ""}
+        send({"type": "result", "id": job["id"], "check": check, "result": checks[check]})
+    send({"type": "done", "id": job["id"],
+          "result": {"scene": job["scene"], "checks": checks, "error": None}})
+'''
+
+AUTHKEY = b"test key"
+
+
+@pytest.fixture
+def running(tmp_path):
+    mayapy = tmp_path / "mayapy"
+    mayapy.write_text(STUB_WORKER % sys.executable)
+    mayapy.chmod(mayapy.stat().st_mode | stat.S_IEXEC)
+    address = str(tmp_path / "daemon.sock")
+    checkDaemon = daemon.CheckDaemon(address, workers=2, mayapy=str(mayapy), maxJobsPerWorker=2,
+                                     authkey=AUTHKEY, jobTimeout=2.0)
+    thread = threading.Thread(target=checkDaemon.serve)
+    thread.daemon = True
+    thread.start()
+    while not os.path.exists(address):
+        thread.join(0.01)
+    yield checkDaemon, address
+    if thread.is_alive():
+        daemon.request("shutdown", address, AUTHKEY)
+        thread.join(10)
+
+
+def _submit(address, scenes, checks=("openEdges", "ngons")):
+    messages = list(daemon.submit(scenes, list(checks), address=address, authkey=AUTHKEY))
+    done = dict((message["result"]["scene"], message) for message in messages
+                if message["type"] == "done")
+    return messages, done
+
+
+def test_round_trip(running):
+    checkDaemon, address = running
+    scenes = ["/assets/clean.ma", "/assets/broken.ma", "/assets/other.ma"]
+    messages, done = _submit(address, scenes)
+    assert sorted(done) == sorted(scenes)
+    results = [message for message in messages if message["type"] == "result"]
+    assert len(results) == 2 * len(scenes)
+    # Every check result streams before the scene it belongs to is done
+    doneAt = dict((message["id"], i) for i, message in enumerate(messages)
+                  if message["type"] == "done")
+    assert all(i < doneAt[message["id"]] for i, message in enumerate(messages)
+               if message["type"] == "result")
+    assert done["/assets/broken.ma"]["result"]["checks"]["openEdges"]["status"] == "failed"
+    assert done["/assets/clean.ma"]["result"]["error"] is None
+
+    stats = daemon.request("stats", address, AUTHKEY)
+    assert (stats["submitted"], stats["completed"], stats["failed"]) == (3, 3, 1)
+    assert sum(worker["jobs"] for worker in stats["workers"].values()) == 3
+    assert all(worker["pid"] for worker in stats["workers"].values())
+
+
+def test_relative_scenes_and_wrong_key(running):
+    checkDaemon, address = running
+    messages, done = _submit(address, ["relative.ma"])
+    # submit makes paths absolute against the client's directory
+    assert list(done) == [os.path.abspath("relative.ma")]
+    with pytest.raises(daemon.AuthenticationError):
+        daemon.request("stats", address, b"wrong key")
+    # The daemon still answers after a rejected connection
+    assert daemon.request("stats", address, AUTHKEY)["completed"] == 1
+
+
+def test_timeout_and_crash_replace_the_worker(running):
+    checkDaemon, address = running
+    messages, done = _submit(address, ["/assets/hang.ma", "/assets/crash.ma",
+                                       "/assets/clean.ma"])
+    assert done["/assets/hang.ma"]["result"]["error"] == "Timed out after 2s"
+    assert done["/assets/crash.ma"]["result"]["error"] == "Worker crashed"
+    assert done["/assets/clean.ma"]["result"]["error"] is None
+
+    stats = daemon.request("stats", address, AUTHKEY)
+    assert (stats["completed"], stats["failed"], stats["timedOut"]) == (3, 2, 1)
+    # Both slots got a new worker right away
+    assert all(worker["pid"] for worker in stats["workers"].values())
+    messages, done = _submit(address, ["/assets/clean.ma"])
+    assert done["/assets/clean.ma"]["result"]["error"] is None
+
+
+def test_key_file(tmp_path, monkeypatch):
+    monkeypatch.delenv("SANITY_CHECKER_AUTHKEY", raising=False)
+    path = str(tmp_path / "keys" / "daemon.key")
+    with pytest.raises(RuntimeError):
+        daemon.loadAuthkey(path=path)
+    key = daemon.loadAuthkey(create=True, path=path)
+    assert len(key) == 64
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert daemon.loadAuthkey(create=True, path=path) == key
+    assert daemon.loadAuthkey(path=path) == key
+    monkeypatch.setenv("SANITY_CHECKER_AUTHKEY", "from env")
+    assert daemon.loadAuthkey(path=path) == b"from env"
@@ -0,0 +1,228 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import meshIntersections
+import meshKernels
+
+
+# Triangle soups: random, clustered, degenerate and hand placed cases
+def _soup(seed, count=120, spread=4.0):
+    random = np.random.RandomState(seed)
+    centers = random.uniform(0, spread, (count, 1, 3))
+    return (centers + random.uniform(-0.6, 0.6, (count, 3, 3))).reshape(-1, 3), \
+        np.arange(count * 3).reshape(-1, 3)
+
+def _sharedSoup(seed, numPoints=30, count=80):
+    # Triangles over few points, so many share vertices and edges
+    random = np.random.RandomState(seed)
+    points = random.uniform(0, 1, (numPoints, 3))
+    triangles = np.array([random.choice(numPoints, 3, replace=False) for _ in range(count)])
+    return points, triangles
+
+def _degenerate():
+    points = [(0, 0, 0), (1, 0, 0), (2, 0, 0),             # collinear
+              (0, 1, 0), (0, 1, 0), (0, 1, 0),             # one point
+              (-1, -1, 0), (3, -1, 0), (1, 3, 0),          # big flat triangle
+              (0.5, 0.5, -1), (0.6, 0.4, 1), (0.5, 0.6, 1),  # pierces it
+              (0.2, 0.2, 0), (0.8, 0.2, 0), (0.2, 0.8, 0),  # coplanar inside it
+              (3, -1, 0), (1, 3, 0), (2, 2, 1),            # shares an edge position
+              (1, 3, 0), (5, 5, 5), (5, 6, 5)]             # shares a corner position
+    return np.array(points, dtype=np.float64), np.arange(len(points)).reshape(-1, 3)
+
+def _onePoint():
+    return np.zeros((9, 3)), np.arange(9).reshape(-1, 3)
+
+SOUPS = [_soup(0), _soup(1, 37), _soup(2, 200, 10.0), _sharedSoup(3), _sharedSoup(4, 12, 40),
+         _degenerate(), _onePoint(), _soup(5, 1)]
+
+
+# Brute force references
+def _crossesStrictly(start, end, corners, tolerance=1e-12, eps=1e-9):
+    # Solves start + t * (end - start) = c0 + u * e1 + v * e2 for one pair
+    matrix = np.column_stack((start - end, corners[1] - corners[0], corners[2] - corners[0]))
+    if abs(np.linalg.det(matrix)) <= tolerance:
+        return False
+    t, u, v = np.linalg.solve(matrix, start - corners[0])
+    return eps < t < 1 - eps and u > eps and v > eps and u + v < 1 - eps
+
+def _intersect(first, second):
+    return any(_crossesStrictly(a[i], a[(i + 1) % 3], b)
+               for a, b in ((first, second), (second, first)) for i in range(3))
+
+def _boxesOverlap(minA, maxA, minB, maxB):
+    return bool(np.all((minA <= maxB) & (minB <= maxA)))
+
+def _pairSet(first, second):
+    pairs = list(zip(first.tolist(), second.tolist()))
+    assert len(pairs) == len(set(pairs))
+    return set(pairs)
+
+def _selfPairs(pairs):
+    # Self mode lists every unordered pair once
+    ordered = [tuple(sorted(pair)) for pair in pairs]
+    assert len(ordered) == len(set(ordered))
+    return set(ordered)
+
+
+def test_triangles_intersect():
+    random = np.random.RandomState(7)
+    cornersA = random.uniform(0, 1, (400, 3, 3))
+    cornersB = random.uniform(0, 1, (400, 3, 3))
+    # Crossing, coplanar overlapping, hinged on a shared edge, touching at a
+    # corner, one poking through the other with a shared corner, and a zero
+    # area one whose edges still pierce the other
+    special = [
+        ([(0, 0, 0), (2, 0, 0), (0, 2, 0)], [(0.5, 0.5, -1), (0.5, 0.5, 1), (1.5, 0.2, 0)], True),
+        ([(0, 0, 0), (2, 0, 0), (0, 2, 0)], [(0.2, 0.2, 0), (1, 0.2, 0), (0.2, 1, 0)], False),
+        ([(0, 0, 0), (1, 0, 0), (0, 1, 0)], [(0, 0, 0), (1, 0, 0), (0, 0, 1)], False),
+        ([(0, 0, 0), (1, 0, 0), (0, 1, 0)], [(0, 0, 0), (-1, 0, 0), (0, 0, 1)], False),
+        ([(0, 0, 0), (2, 0, 0), (0, 2, 0)], [(0, 0, 0), (0.5, 0.5, 1), (0.5, 0.5, -1)], True),
+        ([(0, 0, 0), (1, 0, 0), (2, 0, 0)], [(0.5, 0, -1), (0.5, 1, 1), (0.5, -1, 1)], True),
+    ]
+    for i, (a, b, expected) in enumerate(special):
+        cornersA[i], cornersB[i] = a, b
+    hit = meshIntersections.trianglesIntersect(cornersA, cornersB)
+    assert hit.tolist() == [_intersect(a, b) for a, b in zip(cornersA, cornersB)]
+    assert hit[:len(special)].tolist() == [expected for a, b, expected in special]
+    # Symmetric in its arguments
+    assert (meshIntersections.trianglesIntersect(cornersB, cornersA) == hit).all()
+
+
+@pytest.mark.parametrize("leafSize", [1, 3, 16])
+@pytest.mark.parametrize("soup", range(len(SOUPS)))
+def test_overlapping_leaves(soup, leafSize):
+    points, triangles = SOUPS[soup]
+    bvh = meshIntersections.TriangleBVH(points, triangles, leafSize)
+    assert sorted(bvh.leafTriangles[bvh.leafTriangles >= 0].tolist()) == \
+        list(range(len(triangles)))
+    leaves = range(bvh.numLeaves)
+    mins, maxs = bvh.nodeMins, bvh.nodeMaxs
+    expected = set((i, j) for i, j in itertools.combinations_with_replacement(leaves, 2)
+                   if _boxesOverlap(mins[i], maxs[i], mins[j], maxs[j]))
+    assert _selfPairs(zip(*[side.tolist() for side in
+                            meshIntersections.overlappingLeaves(bvh)])) == expected
+
+    other = meshIntersections.TriangleBVH(*SOUPS[(soup + 1) % len(SOUPS)], leafSize=leafSize)
+    expected = set((i, j) for i in leaves for j in range(other.numLeaves)
+                   if _boxesOverlap(mins[i], maxs[i], other.nodeMins[j], other.nodeMaxs[j]))
+    assert _pairSet(*meshIntersections.overlappingLeaves(bvh, other)) == expected
+
+
+@pytest.mark.parametrize("leafSize", [1, 4, 16])
+@pytest.mark.parametrize("soup", range(len(SOUPS)))
+def test_intersecting_triangles(soup, leafSize):
+    points, triangles = SOUPS[soup]
+    corners = points[triangles]
+    bvh = meshIntersections.TriangleBVH(points, triangles, leafSize)
+
+    # Self mode skips the pairs sharing a vertex
+    expected = set((i, j) for i, j in itertools.combinations(range(len(triangles)), 2)
+                   if not set(triangles[i].tolist()) & set(triangles[j].tolist()) and
+                   _intersect(corners[i], corners[j]))
+    assert _selfPairs(zip(*[side.tolist() for side in
+                            meshIntersections.intersectingTriangles(bvh, chunk=7)])) == expected
+
+    otherPoints, otherTriangles = SOUPS[(soup + 3) % len(SOUPS)]
+    otherCorners = otherPoints[otherTriangles]
+    other = meshIntersections.TriangleBVH(otherPoints, otherTriangles, leafSize)
+    expected = set((i, j) for i in range(len(triangles)) for j in range(len(otherTriangles))
+                   if _intersect(corners[i], otherCorners[j]))
+    assert _pairSet(*meshIntersections.intersectingTriangles(bvh, other, chunk=7)) == expected
+
+
+# Meshes, with faces sharing edges and vertices
+def _grid(columns, rows, height=0.0):
+    points = [(x, y, height) for y in range(rows + 1) for x in range(columns + 1)]
+    faces = []
+    for y in range(rows):
+        for x in range(columns):
+            v = y * (columns + 1) + x
+            faces.append([v, v + 1, v + columns + 2, v + columns + 1])
+    return points, faces
+
+def _folded():
+    # A grid whose last row is folded back through the first one, plus an
+    # ngon standing across it and a face touching it at a single vertex
+    points, faces = _grid(4, 3)
+    points = np.array(points, dtype=np.float64)
+    points[15:] = [(x, 0.5, z) for x, z in ((0, 1), (1, -1), (2, 1), (3, -1), (4, 1))]
+    base = len(points)
+    extra = [(1.5, 1.5, -1), (2.5, 1.5, -1), (3, 1.5, 0), (2.5, 1.5, 1), (1.5, 1.5, 1), (1, 1.5, 0),
+             (4, 0, 0), (5, 0, 1), (5, 1, 1)]
+    points = np.concatenate([points, extra])
+    faces = faces + [list(range(base, base + 6)), [19, base + 7, base + 8]]
+    return points, faces
+
+def _meshArrays(points, faces):
+    return (np.asarray(points, dtype=np.float64),
+            np.array([len(face) for face in faces], dtype=np.int64),
+            np.array([v for face in faces for v in face], dtype=np.int64))
+
+def _randomMesh(seed, numPoints=40, numFaces=50):
+    random = np.random.RandomState(seed)
+    points = random.uniform(-1, 1, (numPoints, 3))
+    faces = [list(random.choice(numPoints, random.randint(3, 6), replace=False))
+             for _ in range(numFaces)]
+    return points, faces
+
+MESHES = [_folded(), _randomMesh(0), _randomMesh(1, 25, 30), _grid(3, 3)]
+
+def _faceTriangles(points, faces):
+    points = np.asarray(points, dtype=np.float64)
+    for f, face in enumerate(faces):
+        for i in range(1, len(face) - 1):
+            yield f, (face[0], face[i], face[i + 1]), points[[face[0], face[i], face[i + 1]]]
+
+
+@pytest.mark.parametrize("mesh", range(len(MESHES)))
+def test_self_intersecting_faces(mesh):
+    points, faces = MESHES[mesh]
+    triangles = list(_faceTriangles(points, faces))
+    expected = set()
+    for (f, verticesA, a), (g, verticesB, b) in itertools.combinations(triangles, 2):
+        if f != g and not set(verticesA) & set(verticesB) and _intersect(a, b):
+            expected.add((min(f, g), max(f, g)))
+    pairs = meshIntersections.selfIntersectingFaces(*_meshArrays(points, faces))
+    assert sorted(map(tuple, pairs.tolist())) == sorted(expected)
+    assert meshIntersections.selfIntersectingFaceIds(*_meshArrays(points, faces)).tolist() == \
+        sorted(set(itertools.chain(*expected)))
+    if mesh == 0:
+        # The fold and the standing ngon, not the faces around the touching vertex
+        assert expected and all(13 not in pair for pair in expected)
+
+
+@pytest.mark.parametrize("mesh", range(len(MESHES)))
+def test_intersecting_faces(mesh):
+    pointsA, facesA = MESHES[mesh]
+    pointsB, facesB = _grid(3, 2, -0.5)
+    pointsB = np.array(pointsB, dtype=np.float64)
+    pointsB[:, 0] -= 0.5
+    # Rotated so its edges pass through faces of the other mesh
+    pointsB = pointsB.dot([[1, 0, 0], [0, 0.8, 0.6], [0, -0.6, 0.8]])
+    expected = set()
+    for (f, _, a), (g, _, b) in itertools.product(_faceTriangles(pointsA, facesA),
+                                                  _faceTriangles(pointsB, facesB)):
+        if _intersect(a, b):
+            expected.add((f, g))
+    pairs = meshIntersections.intersectingFaces(*(_meshArrays(pointsA, facesA) +
+                                                  _meshArrays(pointsB, facesB)))
+    assert sorted(map(tuple, pairs.tolist())) == sorted(expected)
+    assert expected
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_candidate_mesh_pairs(seed):
+    random = np.random.RandomState(seed)
+    mins = random.uniform(0, 20, (60, 3))
+    maxs = mins + random.uniform(0, 3, (60, 3))
+    # Touching, identical and zero size boxes
+    mins[1], maxs[1] = maxs[0], maxs[0] + 1
+    mins[2], maxs[2] = mins[3], maxs[3]
+    maxs[4] = mins[4]
+    first, second = meshIntersections.candidateMeshPairs(mins, maxs)
+    expected = [(i, j) for i, j in itertools.combinations(range(len(mins)), 2)
+                if _boxesOverlap(mins[i], maxs[i], mins[j], maxs[j])]
+    assert list(zip(first.tolist(), second.tolist())) == expected
+    assert meshKernels.sweepAndPrune(mins[:1], maxs[:1])[0].tolist() == []
@@ -0,0 +1,302 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import meshKernels
+
+
+# Generated meshes, edges listed like Maya: unique, in order of first use
+def _mesh(points, faces):
+    edges = []
+    seen = set()
+    for face in faces:
+        for a, b in zip(face, face[1:] + face[:1]):
+            key = (min(a, b), max(a, b))
+            if key not in seen:
+                seen.add(key)
+                edges.append((a, b))
+    return {"points": np.asarray(points, dtype=np.float64),
+            "faces": [list(face) for face in faces],
+            "polygonCounts": np.array([len(face) for face in faces], dtype=np.int64),
+            "polygonConnects": np.array([v for face in faces for v in face], dtype=np.int64),
+            "edges": np.array(edges, dtype=np.int64).reshape(-1, 2)}
+
+def _grid(columns, rows):
+    points = [(x, y, 0.0) for y in range(rows + 1) for x in range(columns + 1)]
+    faces = []
+    for y in range(rows):
+        for x in range(columns):
+            v = y * (columns + 1) + x
+            faces.append([v, v + 1, v + columns + 2, v + columns + 1])
+    return points, faces
+
+def _special():
+    points, faces = _grid(3, 2)
+    base = len(points)
+    points += [(0.0, -1.0, 0.0), (1.5, -1.5, 0.0), (3.0, -1.0, 0.0),  # ngon below
+               (5.0, 0.0, 0.0), (6.0, 0.0, 0.0), (7.0, 0.0, 0.0),     # collinear
+               (5.0, 2.0, 0.0), (5.0, 2.0, 0.0),                      # same point
+               (9.0, 9.0, 9.0),                                       # floating
+               (0.0, 0.0, 5.0), (1.0, 0.0, 5.0), (0.5, 1.0, 5.0),
+               (0.5, -1.0, 5.0), (0.5, 0.0, 6.0)]
+    faces += [[base, 0, 1, 2, 3, base + 2, base + 1],     # ngon on the border
+              [base + 3, base + 4, base + 5],             # zero area
+              [base + 6, base + 7, base + 3],             # zero length edge
+              [base + 9, base + 10, base + 11],           # three faces on one edge
+              [base + 10, base + 9, base + 12],
+              [base + 9, base + 10, base + 13],
+              [4, 5, 9, 8], [8, 9, 5, 4]]                 # lamina pair
+    return _mesh(points, faces)
+
+def _random(seed):
+    random = np.random.RandomState(seed)
+    numPoints = 40
+    points = random.uniform(-1, 1, (numPoints, 3))
+    faces = [list(random.choice(numPoints - 2, random.randint(3, 7), replace=False))
+             for _ in range(60)]
+    return _mesh(points, faces)
+
+MESHES = [_mesh(*_grid(4, 3)), _special(), _random(0), _random(1), _random(2)]
+
+
+@pytest.fixture(params=range(len(MESHES)))
+def mesh(request):
+    return MESHES[request.param]
+
+
+# Brute force references, one component at a time like the old loops
+def _faceEdgeKeys(mesh):
+    for face, vertices in enumerate(mesh["faces"]):
+        for a, b in zip(vertices, vertices[1:] + vertices[:1]):
+            yield face, (min(a, b), max(a, b))
+
+def _edgeIndex(mesh):
+    return dict(((min(a, b), max(a, b)), e) for e, (a, b) in enumerate(mesh["edges"].tolist()))
+
+def _edgeFaces(mesh):
+    index = _edgeIndex(mesh)
+    faces = [[] for _ in mesh["edges"]]
+    for face, key in _faceEdgeKeys(mesh):
+        faces[index[key]].append(face)
+    return faces
+
+def _polygonArea(points, vertices):
+    area = 0.0
+    for i in range(1, len(vertices) - 1):
+        a, b, c = points[vertices[0]], points[vertices[i]], points[vertices[i + 1]]
+        area += 0.5 * np.linalg.norm(np.cross(b - a, c - a))
+    return area
+
+
+def test_face_classification(mesh):
+    counts = [len(face) for face in mesh["faces"]]
+    for count in (3, 4, 5):
+        assert meshKernels.facesWithVertexCount(mesh["polygonCounts"], count).tolist() == \
+            [f for f, n in enumerate(counts) if n == count]
+    assert meshKernels.facesWithMoreVertices(mesh["polygonCounts"], 4).tolist() == \
+        [f for f, n in enumerate(counts) if n > 4]
+
+
+def test_adjacency(mesh):
+    adjacency = meshKernels.buildAdjacency(len(mesh["points"]), mesh["polygonCounts"],
+                                           mesh["polygonConnects"], mesh["edges"])
+    index = _edgeIndex(mesh)
+    assert adjacency.faceEdges.tolist() == [index[key] for face, key in _faceEdgeKeys(mesh)]
+    edgeFaces = _edgeFaces(mesh)
+    for e, faces in enumerate(edgeFaces):
+        start, stop = adjacency.edgeFaceOffsets[e], adjacency.edgeFaceOffsets[e + 1]
+        assert sorted(adjacency.edgeFaces[start:stop].tolist()) == sorted(faces)
+    for v in range(len(mesh["points"])):
+        start, stop = adjacency.vertexEdgeOffsets[v], adjacency.vertexEdgeOffsets[v + 1]
+        assert sorted(adjacency.vertexEdges[start:stop].tolist()) == \
+            [e for e, edge in enumerate(mesh["edges"].tolist()) if v in edge]
+
+    counts = adjacency.edgeFaceCounts
+    assert meshKernels.edgesWithFewerFaces(counts, 2).tolist() == \
+        [e for e, faces in enumerate(edgeFaces) if len(faces) < 2]
+    assert meshKernels.edgesWithMoreFaces(counts, 2).tolist() == \
+        [e for e, faces in enumerate(edgeFaces) if len(faces) > 2]
+    smooth = np.arange(len(counts)) % 3 != 0
+    assert meshKernels.hardInteriorEdges(smooth, counts).tolist() == \
+        [e for e, faces in enumerate(edgeFaces) if not smooth[e] and len(faces) != 1]
+
+
+def test_special_mesh_cases():
+    mesh = MESHES[1]
+    counts = meshKernels.buildAdjacency(len(mesh["points"]), mesh["polygonCounts"],
+                                        mesh["polygonConnects"], mesh["edges"]).edgeFaceCounts
+    index = _edgeIndex(mesh)
+    base = 12
+    assert counts[index[(base + 9, base + 10)]] == 3
+    # The lamina faces use the inner grid edge twice more
+    assert counts[index[(4, 5)]] == 4
+    valence = meshKernels.vertexValence(mesh["edges"], len(mesh["points"]))
+    assert base + 8 in meshKernels.verticesWithValence(valence, 0).tolist()
+    areas = meshKernels.faceAreas(mesh["points"], mesh["polygonCounts"], mesh["polygonConnects"])
+    assert 7 in meshKernels.facesBelowArea(areas, mesh["points"], 1e-7).tolist()
+    lengths = meshKernels.edgeLengths(mesh["points"], mesh["edges"])
+    assert index[(base + 6, base + 7)] in \
+        meshKernels.edgesBelowLength(lengths, mesh["points"], 1e-9).tolist()
+
+
+def test_vertex_valence(mesh):
+    numVertices = len(mesh["points"])
+    valence = meshKernels.vertexValence(mesh["edges"], numVertices)
+    expected = [sum(v in edge for edge in mesh["edges"].tolist()) for v in range(numVertices)]
+    assert valence.tolist() == expected
+    assert meshKernels.verticesWithValence(valence, 0).tolist() == \
+        [v for v, n in enumerate(expected) if n == 0]
+    assert meshKernels.poleVertices(valence, 5, 3).tolist() == \
+        [v for v, n in enumerate(expected) if n > 5 or n == 3]
+
+
+def test_measures(mesh):
+    points = mesh["points"]
+    areas = meshKernels.faceAreas(points, mesh["polygonCounts"], mesh["polygonConnects"])
+    expected = [_polygonArea(points, face) for face in mesh["faces"]]
+    assert np.allclose(areas, expected)
+    lengths = meshKernels.edgeLengths(points, mesh["edges"])
+    assert np.allclose(lengths, [np.linalg.norm(points[b] - points[a])
+                                 for a, b in mesh["edges"].tolist()])
+    diagonal = np.linalg.norm(points.max(axis=0) - points.min(axis=0))
+    assert meshKernels.facesBelowArea(areas, points, 1e-3).tolist() == \
+        [f for f, area in enumerate(expected) if area < 1e-3 * diagonal ** 2]
+    assert meshKernels.edgesBelowLength(lengths, points, 0.05).tolist() == \
+        [e for e, length in enumerate(lengths) if length < 0.05 * diagonal]
+
+
+# UVs, one UV per face-vertex with some faces left without UVs
+def _uvs(mesh, seed, scale=3.0):
+    random = np.random.RandomState(seed)
+    counts = [0 if f % 7 == 3 else len(face) for f, face in enumerate(mesh["faces"])]
+    uvIds = np.arange(sum(counts))
+    u = random.uniform(-0.5, scale, len(uvIds))
+    v = random.uniform(-0.2, scale, len(uvIds))
+    # Some faces exactly on tile borders
+    u[:4], v[:4] = [0.0, 1.0, 1.0, 0.0], [0.0, 0.0, 1.0, 1.0]
+    return u, v, np.array(counts, dtype=np.int64), uvIds
+
+def _faceUvs(u, v, uvCounts):
+    start = 0
+    for count in uvCounts.tolist():
+        yield u[start:start + count], v[start:start + count]
+        start += count
+
+def _tiles(low, high):
+    first = int(np.floor(low))
+    return range(first, max(int(np.ceil(high)) - 1, first) + 1)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_uv_kernels(mesh, seed):
+    u, v, uvCounts, uvIds = _uvs(mesh, seed)
+    bounds = meshKernels.faceUvBounds(u, v, uvCounts, uvIds)
+    faces = [f for f, count in enumerate(uvCounts.tolist()) if count]
+    assert meshKernels.facesWithoutUVs(uvCounts).tolist() == \
+        [f for f, count in enumerate(uvCounts.tolist()) if not count]
+    assert bounds[0].tolist() == faces
+
+    outside, crossing, tiles = [], [], []
+    for f, (faceU, faceV) in enumerate(_faceUvs(u, v, uvCounts)):
+        if not len(faceU):
+            continue
+        if faceU.min() < 0 or faceU.max() > 2.0 or faceV.min() < 0:
+            outside.append(f)
+        uTiles, vTiles = _tiles(faceU.min(), faceU.max()), _tiles(faceV.min(), faceV.max())
+        if len(uTiles) > 1 or len(vTiles) > 1:
+            crossing.append(f)
+        tiles.append([1001 + uTile + 10 * vTile for vTile in vTiles for uTile in uTiles])
+    assert meshKernels.facesOutsideUvRange(bounds, 2.0).tolist() == outside
+    assert meshKernels.facesCrossingTiles(bounds).tolist() == crossing
+    assert meshKernels.udimTiles(bounds, np.array(faces)) == tiles
+
+
+# Overlaps
+def _boxPairs(mins, maxs, tolerance=None):
+    pairs = []
+    for i, j in itertools.combinations(range(len(mins)), 2):
+        if tolerance is None:
+            overlap = np.all((mins[i] <= maxs[j]) & (mins[j] <= maxs[i]))
+        else:
+            overlap = np.all((mins[i] < maxs[j] - tolerance) & (mins[j] < maxs[i] - tolerance))
+        if overlap:
+            pairs.append((i, j))
+    return pairs
+
+def _pairList(pairs):
+    return sorted(zip(pairs[0].tolist(), pairs[1].tolist()))
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_box_pairs(seed):
+    random = np.random.RandomState(seed)
+    mins = random.uniform(0, 10, (150, 3))
+    maxs = mins + random.uniform(0, 1.5, (150, 3))
+    # Boxes touching exactly, and a zero size box
+    mins[1], maxs[1] = maxs[0], maxs[0] + 1
+    maxs[2] = mins[2]
+    assert _pairList(meshKernels.sweepAndPrune(mins, maxs, maxPairs=64)) == \
+        _boxPairs(mins, maxs)
+    assert _pairList(meshKernels.gridPairs(mins, maxs, maxPairs=64)) == _boxPairs(mins, maxs)
+    assert _pairList(meshKernels.gridPairs(mins, maxs, tolerance=1e-9)) == \
+        _boxPairs(mins, maxs, 1e-9)
+
+
+def _cross(o, a, b):
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+def _strictlyInside(point, triangle):
+    sides = [_cross(triangle[i], triangle[(i + 1) % 3], point) for i in range(3)]
+    return all(side > 0 for side in sides) or all(side < 0 for side in sides)
+
+def _segmentsCross(a, b, c, d):
+    return _cross(a, b, c) * _cross(a, b, d) < 0 and _cross(c, d, a) * _cross(c, d, b) < 0
+
+def _trianglesOverlap(first, second):
+    # Interiors overlap: crossing edges, a corner or the centre of one inside the other
+    if any(_segmentsCross(first[i], first[(i + 1) % 3], second[j], second[(j + 1) % 3])
+           for i in range(3) for j in range(3)):
+        return True
+    for a, b in ((first, second), (second, first)):
+        if any(_strictlyInside(point, b) for point in a) or _strictlyInside(a.mean(axis=0), b):
+            return True
+    return False
+
+
+def test_triangles_overlap():
+    random = np.random.RandomState(3)
+    triangles = random.uniform(0, 4, (80, 3, 2))
+    # Shared edge on either side, identical, corner touching, nested
+    triangles[0] = [[0, 0], [1, 0], [0, 1]]
+    triangles[1] = [[1, 0], [0, 1], [1, 1]]
+    triangles[2] = [[1, 0], [0, 1], [0.2, 0.2]]
+    triangles[3] = triangles[0]
+    triangles[4] = [[1, 0], [2, 0], [2, 1]]
+    triangles[5] = [[0.1, 0.1], [0.3, 0.1], [0.1, 0.3]]
+    first, second = [np.array(column) for column in
+                     zip(*itertools.combinations(range(len(triangles)), 2))]
+    overlap = meshKernels.trianglesOverlap2D(triangles, first, second, chunk=500)
+    expected = [_trianglesOverlap(triangles[i], triangles[j]) for i, j in zip(first, second)]
+    assert overlap.tolist() == expected
+
+
+@pytest.mark.parametrize("mode", ["all", "intra", "inter"])
+def test_overlapping_uv_faces(mesh, mode):
+    u, v, uvCounts, uvIds = _uvs(mesh, 5, scale=1.0)
+    shells = np.arange(len(u)) // 16
+    triangles, faceIds = meshKernels.fanTriangles(uvCounts, uvIds)
+    uv = np.column_stack((u, v))
+    result = meshKernels.overlappingUvFaces(u, v, uvCounts, uvIds, shells, mode)
+
+    expected = set()
+    for i, j in itertools.combinations(range(len(triangles)), 2):
+        a, b = uv[triangles[i]], uv[triangles[j]]
+        if faceIds[i] == faceIds[j] or abs(_cross(*a)) <= 1e-9 or abs(_cross(*b)) <= 1e-9:
+            continue
+        sameShell = shells[triangles[i][0]] == shells[triangles[j][0]]
+        if mode == "intra" and not sameShell or mode == "inter" and sameShell:
+            continue
+        if _trianglesOverlap(a, b):
+            expected.update((faceIds[i], faceIds[j]))
+    assert result.tolist() == sorted(expected)
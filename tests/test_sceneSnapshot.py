@@ -0,0 +1,108 @@
+import pytest
+
+from sceneSnapshot import SceneSnapshot, IDENTITY_MATRIX
+
+
+class FakeBackend(object):
+    """The maya.cmds calls SceneSnapshot makes, over a dict scene."""
+
+    def __init__(self, nodes):
+        # {full path: (type, intermediate, (world matrix, pivot, scale, locks))}
+        self.nodes = nodes
+        self.transformCalls = 0
+
+    def _long(self, name):
+        if name in self.nodes:
+            return name
+        matches = [path for path in self.nodes if path.endswith("|" + name.lstrip("|"))]
+        return matches[0] if len(matches) == 1 else None
+
+    def ls(self, names, long=False, showType=False, intermediateObjects=False):
+        paths = [path for path in (self._long(name) for name in names) if path]
+        if intermediateObjects:
+            return [path for path in paths if self.nodes[path][1]]
+        if showType:
+            result = []
+            for path in paths:
+                result.extend([path, self.nodes[path][0]])
+            return result
+        return paths
+
+    def listRelatives(self, paths, shapes=False, fullPath=False):
+        return [path for path in self.nodes
+                if path.rpartition("|")[0] in paths and self.nodes[path][0] != "transform"]
+
+    def transforms(self, paths):
+        self.transformCalls += 1
+        return [self.nodes[path][2] if path in self.nodes else None for path in paths]
+
+
+MOVED = IDENTITY_MATRIX[:12] + [1.0, 2.0, 3.0, 1.0]
+CLEAN = (IDENTITY_MATRIX, [0.0, 0.0, 0.0], [1.0, 1.0, 1.0], [])
+CUP = (MOVED, [1.0, 2.0, 3.0], [1.0, -1.0, 1.0], ["tx", "v"])
+
+SCENE = {
+    "|root": ("transform", False, CLEAN),
+    "|root|low": ("transform", False, CLEAN),
+    "|root|low|body": ("transform", False, CLEAN),
+    "|root|low|body|bodyShape": ("mesh", False, None),
+    "|root|low|body|bodyShapeOrig": ("mesh", True, None),
+    "|root|props": ("transform", False, CLEAN),
+    "|root|props|cup": ("transform", False, CUP),
+    "|root|props|cup|cupShape": ("mesh", False, None),
+    "|root|props|cup|cupShape1": ("mesh", False, None),
+    "|root|cam": ("transform", False, CLEAN),
+    "|root|cam|camShape": ("camera", False, None),
+}
+
+NAMES = ["root", "low", "body", "props", "cup", "cam"]
+
+
+@pytest.fixture
+def snapshot():
+    return SceneSnapshot.build(NAMES, FakeBackend(SCENE))
+
+
+def test_build_columns(snapshot):
+    assert snapshot.names == NAMES
+    assert snapshot.paths == ["|root", "|root|low", "|root|low|body", "|root|props",
+                              "|root|props|cup", "|root|cam"]
+    assert snapshot.nodeTypes == ["transform"] * 6
+    assert snapshot.parents == [-1, 0, 1, 0, 3, 0]
+    assert snapshot.parentNames == [None, "root", "low", "root", "props", "root"]
+    assert snapshot.shapeNames(2) == ["bodyShape", "bodyShapeOrig"]
+    assert snapshot.intermediates[2] == [False, True]
+    assert snapshot.meshIndices() == [2, 4]
+    assert not snapshot.isMesh(5) and not snapshot.hasMeshShape(5)
+
+
+def test_subset_keeps_columns_without_querying(snapshot):
+    backend = snapshot.backend
+    snapshot.worldMatrices
+    snapshot.scales
+    calls = backend.transformCalls
+    assert calls == 1
+    subset = snapshot.subset(snapshot.indices(["cup", "body"]))
+    assert subset.names == ["cup", "body"]
+    assert subset.shapeNames(0) == ["cupShape", "cupShape1"]
+    assert subset.worldMatrices == [MOVED, IDENTITY_MATRIX]
+    assert subset.rotatePivots == [[1.0, 2.0, 3.0], [0.0, 0.0, 0.0]]
+    assert subset.lockedChannels == [["tx", "v"], []]
+    assert backend.transformCalls == calls
+    assert snapshot.indices(["cup", "missing"]) is None
+    assert snapshot.covers(NAMES) and not snapshot.covers(["cup"])
+
+
+def test_ported_checks_on_fake_snapshot(snapshot, monkeypatch):
+    # These ports only read the snapshot, importing sanityChecker needs Maya
+    pytest.importorskip("maya.cmds")
+    import sanityChecker
+    monkeypatch.setattr(sanityChecker, "snapshot", snapshot)
+    assert sanityChecker.intermediateObjects(NAMES, None)[0] == ["body"]
+    # Intermediate shapes count, like listRelatives(shapes=True) returns them
+    assert sanityChecker.multipleShapes(NAMES, None)[0] == ["body", "cup"]
+    assert sanityChecker.modelHierarchy(NAMES, None)[0] == ["cup"]
+    assert sanityChecker.unfrozenTransforms(NAMES, None)[0] == ["cup"]
+    assert sanityChecker.uncenteredPivots(NAMES, None)[0] == ["cup"]
+    assert sanityChecker.negativeScale(NAMES, None)[0] == ["cup"]
+    assert sanityChecker.lockedChannels(NAMES, None)[0] == ["cup.tx", "cup.v"]
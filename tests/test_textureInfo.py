@@ -0,0 +1,155 @@
+import struct
+
+import pytest
+
+import textureInfo
+
+
+# Headers built byte by byte, with what inspectTexture has to read from them
+def _png(width=640, height=480, bitDepth=16, colorType=6):
+    return (b"\x89PNG\r\n\x1a\n" + struct.pack(">I4s", 13, b"IHDR") +
+            struct.pack(">IIBBBBB", width, height, bitDepth, colorType, 0, 0, 0) +
+            b"\0\0\0\0" + struct.pack(">I4s", 0, b"IEND"))
+
+def _segment(code, payload):
+    return struct.pack(">BBH", 0xFF, code, len(payload) + 2) + payload
+
+def _jpeg(width=1024, height=768, code=0xC2):
+    frame = struct.pack(">BHHB", 8, height, width, 3) + b"\x01\x22\x00\x02\x11\x01\x03\x11\x01"
+    return (b"\xff\xd8" + _segment(0xE0, b"JFIF\0\x01\x01\0\0\x01\0\x01\0\0") +
+            b"\xff\xff" + _segment(0xDB, b"\0" * 65) + _segment(code, frame) +
+            _segment(0xDA, b"\0" * 10) + b"\xff\xd9")
+
+def _tiffEntry(endian, tag, fieldType, count, value):
+    if isinstance(value, bytes):
+        return struct.pack(endian + "HHI", tag, fieldType, count) + value
+    packed = struct.pack(endian + {3: "H", 4: "I"}[fieldType], value)
+    return struct.pack(endian + "HHI", tag, fieldType, count) + packed.ljust(4, b"\0")
+
+def _tiff(endian="<", width=300, height=200):
+    # Bits per sample are three shorts, too many to fit the entry, so they live
+    # after the directory
+    order = b"II" if endian == "<" else b"MM"
+    entries = [(256, 4, 1, width), (257, 3, 1, height), (258, 3, 3, None),
+               (259, 3, 1, 5), (277, 3, 1, 3), (262, 3, 1, 2)]
+    directoryEnd = 8 + 2 + len(entries) * 12 + 4
+    data = order + struct.pack(endian + "HI", 42, 8) + struct.pack(endian + "H", len(entries))
+    for tag, fieldType, count, value in entries:
+        if value is None:
+            value = struct.pack(endian + "I", directoryEnd)
+        data += _tiffEntry(endian, tag, fieldType, count, value)
+    return data + b"\0\0\0\0" + struct.pack(endian + "HHH", 16, 16, 16)
+
+def _bigTiff(width=70000, height=50):
+    entries = [(256, 4, 1, width), (257, 4, 1, height), (258, 3, 1, 8), (277, 3, 1, 1)]
+    data = b"II" + struct.pack("<HHHQ", 43, 8, 0, 16) + struct.pack("<Q", len(entries))
+    for tag, fieldType, count, value in entries:
+        packed = struct.pack("<" + {3: "H", 4: "I"}[fieldType], value).ljust(8, b"\0")
+        data += struct.pack("<HHQ", tag, fieldType, count) + packed
+    return data + b"\0" * 8
+
+def _tga(width=512, height=256, imageType=10, depth=32, descriptor=8):
+    return struct.pack("<BBB5sHHHHBB", 0, 0, imageType, b"\0" * 5, 0, 0, width, height,
+                       depth, descriptor) + b"\0" * 32
+
+def _attribute(name, attributeType, value):
+    return name + b"\0" + attributeType + b"\0" + struct.pack("<i", len(value)) + value
+
+def _exr(xMax=2047, yMax=1023, channels=(b"A", b"B", b"G", b"R"), pixelType=1, compression=3):
+    chlist = b"".join(name + b"\0" + struct.pack("<iB3xii", pixelType, 0, 1, 1)
+                      for name in channels) + b"\0"
+    return (b"\x76\x2f\x31\x01" + struct.pack("<I", 2) +
+            _attribute(b"channels", b"chlist", chlist) +
+            _attribute(b"comments", b"string", b"made in a test") +
+            _attribute(b"compression", b"compression", struct.pack("<B", compression)) +
+            _attribute(b"dataWindow", b"box2i", struct.pack("<iiii", 0, 0, xMax, yMax)) +
+            _attribute(b"displayWindow", b"box2i", struct.pack("<iiii", 0, 0, xMax, yMax)) +
+            b"\0" + b"\0" * 64)
+
+FIXTURES = [
+    ("texture.png", _png(), ("png", 640, 480, 4, 16, "deflate")),
+    ("palette.png", _png(64, 32, 4, 3), ("png", 64, 32, 3, 8, "deflate")),
+    ("texture.jpg", _jpeg(), ("jpeg", 1024, 768, 3, 8, "progressive")),
+    ("little.tif", _tiff("<"), ("tiff", 300, 200, 3, 16, "lzw")),
+    ("big.tif", _tiff(">"), ("tiff", 300, 200, 3, 16, "lzw")),
+    ("huge.tif", _bigTiff(), ("tiff", 70000, 50, 1, 8, "none")),
+    ("texture.tga", _tga(), ("tga", 512, 256, 4, 8, "rle")),
+    ("gray.tga", _tga(imageType=3, depth=8, descriptor=0), ("tga", 512, 256, 1, 8, "none")),
+    ("texture.exr", _exr(), ("exr", 2048, 1024, 4, 16, "zip")),
+    ("float.exr", _exr(99, 49, (b"Y",), 2, 0), ("exr", 100, 50, 1, 32, "none")),
+]
+
+
+def _fields(info):
+    return (info.format, info.width, info.height, info.channels, info.bitDepth, info.compression)
+
+
+@pytest.mark.parametrize("name, data, expected", FIXTURES, ids=[f[0] for f in FIXTURES])
+def test_headers(tmp_path, name, data, expected):
+    path = tmp_path / name
+    path.write_bytes(data)
+    info = textureInfo.inspectTexture(str(path))
+    assert info.error is None
+    assert _fields(info) == expected
+
+
+@pytest.mark.parametrize("name, data, expected", FIXTURES, ids=[f[0] for f in FIXTURES])
+def test_truncated_headers(tmp_path, name, data, expected):
+    # Every cut either still reaches the fields or gives an error, never raises
+    path = tmp_path / name
+    errors = 0
+    for size in range(len(data)):
+        path.write_bytes(data[:size])
+        info = textureInfo.inspectTexture(str(path))
+        if info.error is None:
+            assert _fields(info) == expected
+        else:
+            errors += 1
+            assert info.width is None or info.format is None
+    assert errors
+    path.write_bytes(data[:8])
+    assert textureInfo.inspectTexture(str(path)).error
+
+
+CORRUPT = [
+    ("no_ihdr.png", _png().replace(b"IHDR", b"IDAT")),
+    ("no_frame.jpg", b"\xff\xd8" + _segment(0xE0, b"JFIF\0") + b"\xff\xd9"),
+    ("zero_length.jpg", b"\xff\xd8\xff\xe0\x00\x00" + b"\0" * 32),
+    ("short_length.jpg", b"\xff\xd8\xff\xe0\x00\x01" + b"\0" * 32),
+    ("bad_offset.tif", b"II*\0" + struct.pack("<I", 1 << 30)),
+    ("no_size.tif", b"II*\0" + struct.pack("<IH", 8, 1) + _tiffEntry("<", 259, 3, 1, 1) + b"\0" * 4),
+    ("bad_type.tga", _tga(imageType=7)),
+    ("empty.tga", _tga(width=0)),
+    ("bad_size.exr", b"\x76\x2f\x31\x01\x02\0\0\0" + b"channels\0chlist\0" +
+     struct.pack("<i", -5) + b"\0" * 32),
+    ("long_name.exr", b"\x76\x2f\x31\x01\x02\0\0\0" + b"a" * 400),
+    ("no_window.exr", b"\x76\x2f\x31\x01\x02\0\0\0" + b"\0" * 16),
+    ("open_chlist.exr", b"\x76\x2f\x31\x01\x02\0\0\0" +
+     _attribute(b"channels", b"chlist", b"RGB") +
+     _attribute(b"dataWindow", b"box2i", struct.pack("<iiii", 0, 0, 1, 1)) + b"\0"),
+    ("unknown.bmp", b"BM" + b"\0" * 64),
+    ("empty.png", b""),
+]
+
+
+@pytest.mark.parametrize("name, data", CORRUPT, ids=[c[0] for c in CORRUPT])
+def test_corrupt_headers(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    info = textureInfo.inspectTexture(str(path))
+    assert info.error
+    assert info.error.startswith(("Invalid header", "Cannot read file"))
+
+
+def test_inspect_textures(tmp_path):
+    paths = []
+    for name, data, expected in FIXTURES:
+        path = tmp_path / name
+        path.write_bytes(data)
+        paths.append(str(path))
+    missing = str(tmp_path / "missing.png")
+    infos = textureInfo.inspectTextures(paths + [missing, paths[0], None], workers=4)
+    assert sorted(infos) == sorted(paths + [missing])
+    for path, (name, data, expected) in zip(paths, FIXTURES):
+        assert _fields(infos[path]) == expected
+    assert infos[missing].error.startswith("Cannot read file")
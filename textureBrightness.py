@@ -0,0 +1,218 @@
+"""
+Texture Brightness
+
+Streaming constant colour analysis behind the imageBrightness check. Images
+are compared strip by strip against their first pixel and the analysis stops
+at the first pixel that differs. EXR files are read in scanline strips
+through OpenEXR, so at most one strip is in memory and a regular texture is
+usually settled within its first rows without reading the rest. Other formats
+are decoded whole by PIL, JPEGs at 1/8 resolution unless exact extrema are
+asked for, and copied out of the decoded image one strip at a time, so the
+decode is the only full copy in memory and stopping early saves the copies
+and comparisons of the remaining strips. A MemoryBudget shared by the worker
+threads caps the pixels in flight at once.
+
+OpenEXR and PIL are both optional, files whose reader is missing get an error.
+"""
+
+import threading
+
+import numpy as np
+
+import textureInfo
+
+try:
+    import OpenEXR
+    import Imath
+except ImportError:
+    OpenEXR = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Errors of one image that must not end the whole pool, like textures larger
+# than PIL's decompression bomb limit
+_PIL_ERRORS = (Image.DecompressionBombError,) if Image is not None else ()
+
+# Bytes of one EXR strip and of all the pixels decoded at once by default
+STRIP_BYTES = 16 * 1024 * 1024
+MAX_BYTES = 1024 * 1024 * 1024
+
+# Sample types of the PIL modes that are not 8 bit, as tobytes returns them.
+# "I" holds 16 bit images as 32 bit integers
+_MODE_DTYPES = {"I": "=i4", "F": "=f4", "I;16": "<u2", "I;16L": "<u2", "I;16B": ">u2",
+                "I;16N": "=u2"}
+
+# Modes whose values are no colour, converted strip by strip
+_MODE_CONVERSIONS = {"P": "RGB", "PA": "RGBA", "1": "L"}
+
+
+class BrightnessResult(object):
+    """
+    constant is True when every pixel has the colour of the first one,
+    color holds that colour without alpha; black and white tell whether it is
+    0 or the largest value of the format (255, 65535 or 1.0 for floats).
+    """
+
+    __slots__ = ("path", "constant", "color", "black", "white", "isFloat", "error")
+
+    def __init__(self, path, error=None):
+        self.path = path
+        self.constant = False
+        self.color = None
+        self.black = False
+        self.white = False
+        self.isFloat = False
+        self.error = error
+
+
+class MemoryBudget(object):
+    """Byte budget shared by threads; a request larger than the whole budget
+    waits until it runs alone."""
+
+    def __init__(self, maxBytes=MAX_BYTES):
+        self.maxBytes = maxBytes
+        self.used = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size):
+        with self._condition:
+            while self.used and self.used + size > self.maxBytes:
+                self._condition.wait()
+            self.used += size
+
+    def release(self, size):
+        with self._condition:
+            self.used -= size
+            self._condition.notify_all()
+
+
+class _ConstantTracker(object):
+    # Compares strips of (pixels, channels) against the first pixel
+
+    def __init__(self, colorChannels):
+        self.colorChannels = colorChannels
+        self.first = None
+        self.varied = False
+
+    def feed(self, pixels):
+        """Returns True once a pixel differs, the caller can stop reading."""
+        if not len(pixels):
+            return self.varied
+        if self.first is None:
+            self.first = pixels[0].copy()
+        self.varied = not (pixels == self.first).all()
+        return self.varied
+
+    def result(self, result, whiteValue):
+        result.constant = self.first is not None and not self.varied
+        if result.constant:
+            color = self.first[self.colorChannels]
+            result.color = tuple(color.tolist())
+            result.black = bool((color == 0).all())
+            result.white = bool((color >= whiteValue).all())
+        return result
+
+
+def _analyzeExr(path, result, stripBytes, budget):
+    if OpenEXR is None:
+        result.error = "Module OpenEXR not found"
+        return result
+    exr = OpenEXR.InputFile(path)
+    try:
+        header = exr.header()
+        dataWindow = header["dataWindow"]
+        width = dataWindow.max.x - dataWindow.min.x + 1
+        channels = sorted(header["channels"].keys())
+        colorChannels = [i for i, name in enumerate(channels)
+                         if name.split(".")[-1] not in ("A", "a", "alpha")] or \
+            list(range(len(channels)))
+        rows = max(1, stripBytes // max(1, width * len(channels) * 4))
+        floatType = Imath.PixelType(Imath.PixelType.FLOAT)
+        tracker = _ConstantTracker(colorChannels)
+        size = rows * width * len(channels) * 4
+        budget.acquire(size)
+        try:
+            for first in range(dataWindow.min.y, dataWindow.max.y + 1, rows):
+                last = min(first + rows - 1, dataWindow.max.y)
+                planes = exr.channels(channels, floatType, first, last)
+                pixels = np.stack([np.frombuffer(plane, dtype=np.float32) for plane in planes],
+                                  axis=-1)
+                if tracker.feed(pixels):
+                    break
+        finally:
+            budget.release(size)
+    finally:
+        exr.close()
+    result.isFloat = True
+    return tracker.result(result, 1.0)
+
+
+def _analyzePil(path, result, exact, stripBytes, budget):
+    if Image is None:
+        result.error = "Module Image from PIL not found"
+        return result
+    info = textureInfo.inspectTexture(path)
+    image = Image.open(path)
+    try:
+        if not exact and image.format == "JPEG":
+            # Block averages are enough to tell a flat image from a textured one,
+            # draft shrinks the size the image reports as well
+            image.draft(image.mode, (max(1, image.width // 8), max(1, image.height // 8)))
+        mode = _MODE_CONVERSIONS.get(image.mode, image.mode)
+        dtype = np.dtype(_MODE_DTYPES.get(mode, np.uint8))
+        bands = Image.getmodebands(mode)
+        rowBytes = image.width * bands * dtype.itemsize
+        rows = max(1, min(image.height, stripBytes // max(1, rowBytes)))
+        # The decoded image plus the strip copied out of it
+        size = image.width * image.height * len(image.getbands()) * \
+            np.dtype(_MODE_DTYPES.get(image.mode, np.uint8)).itemsize + rows * rowBytes
+        budget.acquire(size)
+        try:
+            colorChannels = [i for i, band in enumerate(Image.getmodebandnames(mode))
+                             if band != "A"] or [0]
+            if dtype == np.uint8:
+                whiteValue = 255
+            elif dtype.kind == "f":
+                whiteValue = 1.0
+                result.isFloat = True
+            else:
+                # 16 bit images are exposed as 32 bit integers by PIL
+                whiteValue = 65535 if (info.bitDepth or 16) > 8 else 255
+            tracker = _ConstantTracker(colorChannels)
+            for first in range(0, image.height, rows):
+                strip = image.crop((0, first, image.width, min(first + rows, image.height)))
+                if strip.mode != mode:
+                    strip = strip.convert(mode)
+                pixels = np.frombuffer(strip.tobytes(), dtype=dtype).reshape(-1, bands)
+                if tracker.feed(pixels):
+                    break
+        finally:
+            budget.release(size)
+    finally:
+        image.close()
+    return tracker.result(result, whiteValue)
+
+
+def analyzeTexture(path, exact=False, stripBytes=STRIP_BYTES, budget=None):
+    """BrightnessResult of one image file."""
+    result = BrightnessResult(path)
+    budget = budget or MemoryBudget()
+    try:
+        with open(path, "rb") as stream:
+            isExr = stream.read(4) == b"\x76\x2f\x31\x01"
+        if isExr:
+            return _analyzeExr(path, result, stripBytes, budget)
+        return _analyzePil(path, result, exact, stripBytes, budget)
+    except (IOError, OSError, ValueError, SyntaxError) + _PIL_ERRORS as error:
+        result.error = "cannot be read: %s" % error
+        return result
+
+
+def analyzeTextures(paths, exact=False, workers=8, maxBytes=MAX_BYTES):
+    """{path: BrightnessResult} for every distinct path, over a thread pool."""
+    budget = MemoryBudget(maxBytes)
+    return textureInfo.mapTextures(
+        lambda path: analyzeTexture(path, exact, budget=budget), paths, workers)
@@ -0,0 +1,203 @@
+"""
+Texture Cache
+
+Persistent texture metadata (header info, brightness, content hash) in a
+local SQLite database shared by Maya sessions and batch workers. Entries are
+keyed by the absolute path and only trusted while the file keeps the same
+modification time and size. Those come from the directory listings of the
+run's DirectoryCache, the ones the path checks read as well, so a warm run
+over a network share costs a handful of round-trips.
+"""
+
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+
+import textureInfo
+import textureBrightness
+from texturePaths import DirectoryCache
+
+FIELDS = ("info", "brightness", "brightnessExact", "hash")
+
+
+def resolvePath(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def statFiles(paths, directories=None):
+    """
+    {path: (mtime, size)} of the paths that exist, from the listings of
+    directories, the DirectoryCache of the run.
+    """
+    return (directories or DirectoryCache()).stats(paths)
+
+
+def fileHash(path, blockSize=1024 * 1024):
+    sha = hashlib.sha1()
+    with open(path, "rb") as stream:
+        for block in iter(lambda: stream.read(blockSize), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _infoToJson(info):
+    return dict((name, getattr(info, name)) for name in info.__slots__)
+
+def _infoFromJson(data):
+    return textureInfo.TextureInfo(**data)
+
+def _brightnessToJson(result):
+    if result.error and result.error.startswith("Module "):
+        # The reader may be installed by the next session
+        return None
+    return dict((name, getattr(result, name)) for name in result.__slots__)
+
+def _brightnessFromJson(data):
+    result = textureBrightness.BrightnessResult(data["path"])
+    for name, value in data.items():
+        setattr(result, name, tuple(value) if name == "color" and value else value)
+    return result
+
+
+class TextureCache(object):
+    """
+    Texture metadata in one SQLite table:
+    path, mtime, size and a JSON column per field.
+    """
+
+    def __init__(self, path, directories=None):
+        self.path = path
+        self.directories = directories
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            try:
+                # Concurrent readers while a batch worker writes
+                connection.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.DatabaseError:
+                pass
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS textures (path TEXT PRIMARY KEY, mtime REAL, "
+                "size INTEGER, %s)" % ", ".join("%s TEXT" % field for field in FIELDS))
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def lookup(self, stats, field):
+        """{path: json value} of the entries still matching their stats."""
+        values = {}
+        if not self.enabled or not stats:
+            return values
+        paths = sorted(stats)
+        with self._lock:
+            for i in range(0, len(paths), 500):
+                chunk = paths[i:i + 500]
+                rows = self.connection.execute(
+                    "SELECT path, mtime, size, %s FROM textures WHERE path IN (%s)"
+                    % (field, ",".join("?" * len(chunk))), chunk).fetchall()
+                for path, mtime, size, value in rows:
+                    if value is not None and (mtime, size) == stats[path]:
+                        values[path] = json.loads(value)
+        self.hits += len(values)
+        self.misses += len(stats) - len(values)
+        return values
+
+    def store(self, stats, field, values):
+        """Stores {path: json value}; entries whose file changed lose their other fields."""
+        if not self.enabled or not values:
+            return
+        paths = sorted(values)
+        with self._lock:
+            connection = self.connection
+            current = {}
+            for i in range(0, len(paths), 500):
+                chunk = paths[i:i + 500]
+                for path, mtime, size in connection.execute(
+                        "SELECT path, mtime, size FROM textures WHERE path IN (%s)"
+                        % ",".join("?" * len(chunk)), chunk):
+                    current[path] = (mtime, size)
+            updates = []
+            inserts = []
+            for path in paths:
+                value = json.dumps(values[path])
+                if current.get(path) == stats[path]:
+                    updates.append((value, path))
+                else:
+                    inserts.append((path, stats[path][0], stats[path][1], value))
+            connection.executemany("UPDATE textures SET %s = ? WHERE path = ?" % field, updates)
+            connection.executemany(
+                "INSERT OR REPLACE INTO textures (path, mtime, size, %s) VALUES (?, ?, ?, ?)"
+                % field, inserts)
+            connection.commit()
+
+    def _cached(self, paths, field, compute, toJson, fromJson):
+        # {path: value} from the cache, computing and storing the missing ones
+        resolved = dict((path, resolvePath(path)) for path in set(paths) if path)
+        stats = statFiles(set(resolved.values()), self.directories)
+        cached = self.lookup(stats, field)
+        missing = [path for path in resolved if resolved[path] not in cached]
+        computed = compute(missing)
+        values = {}
+        for path, value in computed.items():
+            if resolved[path] in stats and value is not None:
+                value = toJson(value)
+                if value is not None:
+                    values[resolved[path]] = value
+        self.store(stats, field, values)
+        results = {}
+        for path in resolved:
+            if path in computed:
+                results[path] = computed[path]
+            else:
+                results[path] = fromJson(cached[resolved[path]])
+        return results
+
+    def infos(self, paths):
+        """{path: TextureInfo}, see textureInfo.inspectTextures."""
+        return self._cached(paths, "info", textureInfo.inspectTextures,
+                            _infoToJson, _infoFromJson)
+
+    def brightness(self, paths, exact=False):
+        """{path: BrightnessResult}, see textureBrightness.analyzeTextures."""
+        return self._cached(paths, "brightnessExact" if exact else "brightness",
+                            lambda missing: textureBrightness.analyzeTextures(missing, exact),
+                            _brightnessToJson, _brightnessFromJson)
+
+    def hashes(self, paths):
+        """{path: sha1 of the file content}, None for unreadable files."""
+        def compute(missing):
+            def hashOrNone(path):
+                try:
+                    return fileHash(path)
+                except (IOError, OSError):
+                    return None
+            return textureInfo.mapTextures(hashOrNone, missing)
+        return self._cached(paths, "hash", compute, lambda value: value, lambda value: value)
+
+    def resetStats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def report(self):
+        lookups = self.hits + self.misses
+        if not lookups:
+            return ""
+        return "Texture cache: %d/%d hits (%d%%)" % (
+            self.hits, lookups, round(100.0 * self.hits / lookups))
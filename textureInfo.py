@@ -0,0 +1,261 @@
+"""
+Texture Info
+
+Reads texture dimensions, channel count, bit depth and compression straight
+from the file headers of EXR, PNG, TIFF, JPEG and TGA images, with a few small
+bounded reads per file and without decoding any pixel. inspectTextures runs
+the reads over a thread pool, so network storage latency overlaps instead of
+adding up.
+"""
+
+import os
+import struct
+from multiprocessing.pool import ThreadPool
+
+# Largest header read before giving up on a file
+MAX_HEADER_BYTES = 1024 * 1024
+
+EXR_COMPRESSION = ["none", "rle", "zips", "zip", "piz", "pxr24", "b44", "b44a", "dwaa", "dwab"]
+TIFF_COMPRESSION = {1: "none", 2: "ccittrle", 3: "ccittfax3", 4: "ccittfax4", 5: "lzw",
+                    6: "ojpeg", 7: "jpeg", 8: "deflate", 32773: "packbits", 32946: "deflate",
+                    34925: "lzma", 50000: "zstd"}
+TGA_COMPRESSION = {1: "none", 2: "none", 3: "none", 9: "rle", 10: "rle", 11: "rle"}
+PNG_CHANNELS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+JPEG_SOF = {0xC0: "baseline", 0xC1: "extended", 0xC2: "progressive", 0xC3: "lossless",
+            0xC5: "differential", 0xC6: "differential progressive",
+            0xC7: "differential lossless", 0xC9: "arithmetic", 0xCA: "arithmetic progressive",
+            0xCB: "arithmetic lossless", 0xCD: "arithmetic differential",
+            0xCE: "arithmetic differential progressive",
+            0xCF: "arithmetic differential lossless"}
+
+
+class TextureInfo(object):
+    """Header fields of one texture, error is set when they could not be read."""
+
+    __slots__ = ("path", "format", "width", "height", "channels", "bitDepth",
+                 "compression", "error")
+
+    def __init__(self, path, format=None, width=None, height=None, channels=None,
+                 bitDepth=None, compression=None, error=None):
+        self.path = path
+        self.format = format
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.bitDepth = bitDepth
+        self.compression = compression
+        self.error = error
+
+    def __repr__(self):
+        if self.error:
+            return "TextureInfo(%r, error=%r)" % (self.path, self.error)
+        return "TextureInfo(%r, %s %dx%d, %d channels, %d bits, %s)" % (
+            self.path, self.format, self.width, self.height, self.channels,
+            self.bitDepth, self.compression)
+
+    @property
+    def size(self):
+        return (self.width, self.height)
+
+
+def _read(stream, size):
+    data = stream.read(size)
+    if len(data) < size:
+        raise ValueError("Truncated header")
+    return data
+
+
+def _readPng(stream, info):
+    # Signature, then the IHDR chunk is always first
+    _read(stream, 8)
+    length, chunk = struct.unpack(">I4s", _read(stream, 8))
+    if chunk != b"IHDR":
+        raise ValueError("Missing IHDR chunk")
+    width, height, bitDepth, colorType, compression = struct.unpack(">IIBBB", _read(stream, 11))
+    info.format = "png"
+    info.width, info.height = width, height
+    info.channels = PNG_CHANNELS.get(colorType)
+    # Palette images store 8 bit colours whatever the index depth
+    info.bitDepth = 8 if colorType == 3 else bitDepth
+    info.compression = "deflate"
+
+
+def _readJpeg(stream, info):
+    # Walks the marker segments up to the first start of frame
+    _read(stream, 2)
+    while True:
+        marker = _read(stream, 2)
+        while marker[0:1] != b"\xff" or marker[1:2] == b"\xff":
+            marker = marker[1:2] + _read(stream, 1)
+        code = ord(marker[1:2])
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+            continue
+        length = struct.unpack(">H", _read(stream, 2))[0]
+        if code in JPEG_SOF:
+            precision, height, width, components = struct.unpack(">BHHB", _read(stream, 6))
+            info.format = "jpeg"
+            info.width, info.height = width, height
+            info.channels = components
+            info.bitDepth = precision
+            info.compression = JPEG_SOF[code]
+            return
+        if code == 0xD9:
+            raise ValueError("No frame header")
+        stream.seek(length - 2, os.SEEK_CUR)
+
+
+def _readTiff(stream, info):
+    order = _read(stream, 2)
+    endian = "<" if order == b"II" else ">"
+    version = struct.unpack(endian + "H", _read(stream, 2))[0]
+    if version == 43:
+        # BigTIFF, 8 byte offsets and 20 byte entries
+        _read(stream, 4)
+        offset = struct.unpack(endian + "Q", _read(stream, 8))[0]
+        countFormat, entryFormat, entrySize, inline = "Q", "HHQ", 20, 8
+    else:
+        offset = struct.unpack(endian + "I", _read(stream, 4))[0]
+        countFormat, entryFormat, entrySize, inline = "H", "HHI", 12, 4
+    stream.seek(offset)
+    count = struct.unpack(endian + countFormat, _read(stream, struct.calcsize(countFormat)))[0]
+    data = _read(stream, count * entrySize)
+    tags = {}
+    for i in range(count):
+        entry = data[i * entrySize:(i + 1) * entrySize]
+        tag, fieldType, valueCount = struct.unpack(endian + entryFormat, entry[:entrySize - inline])
+        value = entry[entrySize - inline:]
+        if tag not in (256, 257, 258, 259, 277):
+            continue
+        valueFormat = {3: "H", 4: "I", 16: "Q"}.get(fieldType)
+        if valueFormat is None:
+            continue
+        if valueCount * struct.calcsize(valueFormat) > inline:
+            # Values stored elsewhere, only the first one is needed
+            position = stream.tell()
+            stream.seek(struct.unpack(endian + ("Q" if inline == 8 else "I"), value)[0])
+            value = _read(stream, struct.calcsize(valueFormat))
+            stream.seek(position)
+        tags[tag] = struct.unpack(endian + valueFormat, value[:struct.calcsize(valueFormat)])[0]
+    if 256 not in tags or 257 not in tags:
+        raise ValueError("Missing image size")
+    info.format = "tiff"
+    info.width, info.height = tags[256], tags[257]
+    info.channels = tags.get(277, 1)
+    info.bitDepth = tags.get(258, 1)
+    info.compression = TIFF_COMPRESSION.get(tags.get(259, 1), str(tags.get(259)))
+
+
+def _readTga(stream, info):
+    header = _read(stream, 18)
+    imageType = ord(header[2:3])
+    width, height, depth, descriptor = struct.unpack("<HHBB", header[12:18])
+    if imageType not in TGA_COMPRESSION or not width or not height:
+        raise ValueError("Not a TGA image")
+    alpha = descriptor & 0x0F
+    info.format = "tga"
+    info.width, info.height = width, height
+    if imageType in (3, 11):
+        info.channels = 1
+    else:
+        info.channels = 4 if alpha or depth == 32 else 3
+    info.bitDepth = 8 if depth in (8, 24, 32) else 5
+    info.compression = TGA_COMPRESSION[imageType]
+
+
+def _cString(stream):
+    characters = []
+    while True:
+        character = _read(stream, 1)
+        if character == b"\0":
+            return b"".join(characters).decode("latin-1")
+        characters.append(character)
+        if len(characters) > 255:
+            raise ValueError("Attribute name too long")
+
+
+def _readExr(stream, info):
+    # Magic and version, then name/type/size/value attributes up to an empty name
+    _read(stream, 8)
+    attributes = {}
+    wanted = ("channels", "compression", "dataWindow")
+    while not all(key in attributes for key in wanted):
+        name = _cString(stream)
+        if not name:
+            break
+        _cString(stream)
+        size = struct.unpack("<i", _read(stream, 4))[0]
+        if not 0 <= size <= MAX_HEADER_BYTES:
+            raise ValueError("Invalid attribute size")
+        if name in wanted:
+            attributes[name] = _read(stream, size)
+        else:
+            stream.seek(size, os.SEEK_CUR)
+
+    if "dataWindow" not in attributes or "channels" not in attributes:
+        raise ValueError("Missing dataWindow or channels")
+    xMin, yMin, xMax, yMax = struct.unpack("<iiii", attributes["dataWindow"][:16])
+    channels = 0
+    bitDepth = 0
+    data = attributes["channels"]
+    while data[:1] not in (b"\0", b""):
+        end = data.index(b"\0")
+        pixelType = struct.unpack("<i", data[end + 1:end + 5])[0]
+        bitDepth = max(bitDepth, 16 if pixelType == 1 else 32)
+        channels += 1
+        data = data[end + 17:]
+    compression = ord(attributes.get("compression", b"\0")[:1])
+    info.format = "exr"
+    info.width, info.height = xMax - xMin + 1, yMax - yMin + 1
+    info.channels = channels
+    info.bitDepth = bitDepth
+    info.compression = EXR_COMPRESSION[compression] \
+        if compression < len(EXR_COMPRESSION) else str(compression)
+
+
+def _reader(magic):
+    if magic.startswith(b"\x89PNG\r\n\x1a\n"):
+        return _readPng
+    if magic.startswith(b"\xff\xd8"):
+        return _readJpeg
+    if magic[:4] in (b"II*\0", b"MM\0*", b"II+\0", b"MM\0+"):
+        return _readTiff
+    if magic.startswith(b"\x76\x2f\x31\x01"):
+        return _readExr
+    return None
+
+
+def inspectTexture(path):
+    """TextureInfo of one file, read from its header only."""
+    info = TextureInfo(path)
+    try:
+        with open(path, "rb") as stream:
+            reader = _reader(stream.read(8))
+            if reader is None and path.lower().endswith((".tga", ".targa")):
+                reader = _readTga
+            if reader is None:
+                raise ValueError("Unsupported image format")
+            stream.seek(0)
+            reader(stream, info)
+    except (IOError, OSError) as error:
+        info.error = "Cannot read file: %s" % (error.strerror or error)
+    except (ValueError, struct.error, IndexError) as error:
+        info.error = "Invalid header: %s" % error
+    return info
+
+
+def mapTextures(function, paths, workers=16):
+    """{path: function(path)} for every distinct path, over a thread pool."""
+    paths = sorted(set(path for path in paths if path))
+    if not paths:
+        return {}
+    pool = ThreadPool(min(workers, len(paths)))
+    try:
+        return dict(zip(paths, pool.map(function, paths, chunksize=1)))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def inspectTextures(paths, workers=16):
+    """{path: TextureInfo} for every distinct path."""
+    return mapTextures(inspectTexture, paths, workers)
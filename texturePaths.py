@@ -0,0 +1,138 @@
+"""
+Texture Paths
+
+Resolves texture paths the way Maya does (environment variables, ~, paths
+relative to the project or its source images directory) and answers
+existence questions from directory listings instead of stat calls. Every
+directory is listed once per run, the missing listings of a batch of paths
+being read together over a thread pool, so a scene with thousands of file
+nodes costs one round-trip per texture directory. The texture cache reads
+modification times and sizes from the same listings: free on Windows, where
+scandir returns them, and one stat per existing file over the pool elsewhere.
+"""
+
+import os
+import re
+
+import textureInfo
+
+VARIABLE = re.compile(r"\$\{?\w+\}?|%\w+%")
+
+
+def candidatePaths(path, projectRoot="", sourceImages=""):
+    """Absolute paths a file node path may point at, in the order Maya tries them."""
+    path = os.path.expanduser(os.path.expandvars(path))
+    if os.path.isabs(path):
+        return [os.path.normpath(path)]
+    candidates = []
+    if projectRoot:
+        candidates.append(os.path.normpath(os.path.join(projectRoot, path)))
+        if sourceImages:
+            candidates.append(os.path.normpath(os.path.join(
+                projectRoot, sourceImages, os.path.basename(path))))
+    candidates.append(os.path.abspath(path))
+    return candidates
+
+
+def unresolvedVariables(path):
+    """Environment variables left in a path after expansion."""
+    return VARIABLE.findall(os.path.expandvars(path))
+
+
+class DirectoryCache(object):
+    """
+    Directory listings of the current run, {directory: {name: DirEntry}}
+    with None for directories that cannot be listed. clear() at the start of
+    every run.
+    """
+
+    def __init__(self, workers=16):
+        self.workers = workers
+        self.listings = {}
+
+    def clear(self):
+        self.listings.clear()
+
+    def list(self, directories):
+        """Reads the listings not cached yet, all at once."""
+        missing = set(directory for directory in directories if directory not in self.listings)
+        self.listings.update(textureInfo.mapTextures(_listDirectory, missing, self.workers))
+
+    def names(self, directory):
+        if directory not in self.listings:
+            self.list([directory])
+        return self.listings.get(directory)
+
+    def exists(self, path):
+        directory, name = os.path.split(path)
+        names = self.names(directory)
+        return names is not None and name in names
+
+    def onDisk(self, path):
+        """Name of the file differing from path by case only, None if there is none."""
+        directory, name = os.path.split(path)
+        lower = name.lower()
+        for entry in self.names(directory) or []:
+            if entry != name and entry.lower() == lower:
+                return entry
+        return None
+
+    def stats(self, paths):
+        """{path: (mtime, size)} of the paths that are files, from the listings."""
+        paths = set(path for path in paths if path)
+        self.list(os.path.dirname(path) for path in paths)
+        entries = {}
+        foldCase = os.path.normcase("A") == "a"
+        folded = {}
+        for path in paths:
+            directory, name = os.path.split(path)
+            listing = self.names(directory)
+            if not listing:
+                continue
+            if foldCase:
+                # Resolved paths are normcased, the listings are not
+                if directory not in folded:
+                    folded[directory] = dict((os.path.normcase(entry), entry)
+                                             for entry in listing)
+                name = folded[directory].get(os.path.normcase(name))
+            if name in listing:
+                entries[path] = listing[name]
+
+        def stat(path):
+            entry = entries[path]
+            try:
+                if entry is None:
+                    if not os.path.isfile(path):
+                        return None
+                    result = os.stat(path)
+                elif entry.is_file():
+                    result = entry.stat()
+                else:
+                    return None
+            except OSError:
+                return None
+            return (result.st_mtime, result.st_size)
+        stats = textureInfo.mapTextures(stat, list(entries), self.workers)
+        return dict((path, value) for path, value in stats.items() if value is not None)
+
+    def resolve(self, paths, projectRoot="", sourceImages=""):
+        """{path: resolved path}, the first candidate that exists or the first one."""
+        candidates = dict((path, candidatePaths(path, projectRoot, sourceImages))
+                          for path in set(paths) if path)
+        self.list(os.path.dirname(candidate)
+                  for pathCandidates in candidates.values() for candidate in pathCandidates)
+        resolved = {}
+        for path, pathCandidates in candidates.items():
+            resolved[path] = next((candidate for candidate in pathCandidates
+                                   if self.exists(candidate)), pathCandidates[0])
+        return resolved
+
+
+def _listDirectory(directory):
+    # Entries keep the stat data scandir read with the listing
+    try:
+        if hasattr(os, "scandir"):
+            return dict((entry.name, entry) for entry in os.scandir(directory or "."))
+        return dict.fromkeys(os.listdir(directory or "."))
+    except OSError:
+        return None
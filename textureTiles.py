@@ -0,0 +1,100 @@
+"""
+Texture Tiles
+
+Expands tiled texture paths (<UDIM>, <UVTILE>, <u>/<v> and <U>/<V> tokens) to
+the files of every tile. Tiles are found by matching the names of one
+directory listing per directory against the pattern, the listings of all
+directories being read over a thread pool. Every tile is labelled with its
+UDIM number whatever the token, so tiles of every convention sort and report
+the same way.
+"""
+
+import os
+import re
+
+from texturePaths import DirectoryCache, candidatePaths
+
+TOKEN = re.compile(r"<(UDIM|UVTILE|u|v|U|V)>", re.IGNORECASE)
+
+
+def tilePattern(path, tilingMode=0, computedPattern=""):
+    """
+    Tokenized pattern of a file node or None when it is not tiled.
+    Maya keeps the pattern of nodes whose path names a single tile in
+    computedFileTextureNamePattern.
+    """
+    if path and TOKEN.search(path):
+        return path
+    if tilingMode and computedPattern and TOKEN.search(computedPattern):
+        return computedPattern
+    return None
+
+
+def _tokenRegex(name):
+    # Regex matching the tile names of a pattern name
+    parts = []
+    position = 0
+    for match in TOKEN.finditer(name):
+        parts.append(re.escape(name[position:match.start()]))
+        token = match.group(1)
+        if token.upper() == "UDIM":
+            parts.append(r"(?P<udim>\d{4})")
+        elif token.upper() == "UVTILE":
+            parts.append(r"u(?P<U>\d+)_v(?P<V>\d+)")
+        elif token in ("u", "v", "U", "V"):
+            parts.append(r"(?P<%s>\d+)" % token)
+        position = match.end()
+    parts.append(re.escape(name[position:]))
+    flags = re.IGNORECASE if os.path.normcase("A") == "a" else 0
+    return re.compile("".join(parts) + "$", flags)
+
+
+def _udim(match):
+    # UDIM number of a matched tile name, <u>/<v> count from 0 and <U>/<V> from 1
+    groups = match.groupdict()
+    if groups.get("udim"):
+        return int(groups["udim"])
+    if groups.get("u") is not None and groups.get("v") is not None:
+        return 1001 + int(groups["u"]) + 10 * int(groups["v"])
+    return 1000 + int(groups["U"]) + 10 * (int(groups["V"]) - 1)
+
+
+def expandTiles(patterns, directories=None):
+    """
+    {pattern: [(udim, path)] sorted by udim} of every distinct pattern,
+    directories is the DirectoryCache to read the listings from.
+    """
+    directories = directories or DirectoryCache()
+    patterns = set(pattern for pattern in patterns if pattern)
+    directories.list(os.path.dirname(pattern) for pattern in patterns)
+    tiles = {}
+    for pattern in patterns:
+        directory, name = os.path.split(pattern)
+        regex = _tokenRegex(name)
+        matches = []
+        for entry in directories.names(directory) or []:
+            match = regex.match(entry)
+            if match:
+                matches.append((_udim(match), os.path.join(directory, entry)))
+        tiles[pattern] = sorted(matches)
+    return tiles
+
+
+def resolveTiles(patterns, projectRoot="", sourceImages="", directories=None):
+    """
+    {pattern: (resolved pattern, [(udim, path)])} of file node patterns. A
+    relative pattern resolves like an untiled path, to the first candidate
+    root holding tiles, or to the first candidate when none does.
+    """
+    directories = directories or DirectoryCache()
+    candidates = dict((pattern, candidatePaths(pattern, projectRoot, sourceImages))
+                      for pattern in set(patterns) if pattern)
+    # Every candidate directory is listed in the same batch
+    tiles = expandTiles([candidate for patternCandidates in candidates.values()
+                         for candidate in patternCandidates], directories)
+    resolved = {}
+    for pattern, patternCandidates in candidates.items():
+        candidate = next((candidate for candidate in patternCandidates if tiles[candidate]),
+                         patternCandidates[0])
+        resolved[pattern] = (candidate, tiles[candidate])
+    return resolved